@@ -0,0 +1,139 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import ingestion
+import instrumentation
+
+# Artifacts kept in memory across reruns and sessions (least recently used are evicted first)
+MAX_CACHE_BYTES = 32 * 2 ** 20
+
+
+# Approximate in-memory size of an artifact (dicts of arrays/DataFrames/scalars)
+def artifact_nbytes(artifact):
+    if isinstance(artifact, np.ndarray):
+        return artifact.nbytes
+    if isinstance(artifact, pd.DataFrame):
+        return int(artifact.memory_usage(deep=True).sum())
+    if isinstance(artifact, dict):
+        return sum(artifact_nbytes(value) for value in artifact.values())
+    return 64
+
+
+# LRU cache of analysis artifacts with a total size cap. Keys include the hash of every
+# dataset an artifact was computed from, so a changed CSV never serves a stale artifact.
+class ArtifactCache:
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                instrumentation.cache_event("analysis_artifacts", hit=True)
+                return self._entries[key][0]
+            self.misses += 1
+        instrumentation.cache_event("analysis_artifacts", hit=False)
+
+        artifact = compute()
+        size = artifact_nbytes(artifact)
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = (artifact, size)
+                self.total_bytes += size
+                while self.total_bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self.total_bytes -= evicted_size
+        return artifact
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+_cache = ArtifactCache()
+
+def artifact_cache():
+    return _cache
+
+# Histogram counts plus a Gaussian KDE (Scott's bandwidth) evaluated on a grid and scaled to
+# the histogram's counts, which is what seaborn's histplot(kde=True) draws
+def histogram_artifact(values, bins=20, kde_points=200):
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    counts, edges = np.histogram(values, bins=bins)
+    grid = np.linspace(edges[0], edges[-1], kde_points)
+    bandwidth = values.std(ddof=1) * len(values) ** (-1 / 5)
+    density = np.zeros(kde_points)
+    # Evaluate the KDE in blocks so large inputs never build a full (points x values) matrix
+    for start in range(0, len(values), 8192):
+        block = values[start:start + 8192]
+        density += np.exp(-0.5 * ((grid[:, None] - block[None, :]) / bandwidth) ** 2).sum(axis=1)
+    density /= len(values) * bandwidth * np.sqrt(2 * np.pi)
+    return {
+        "edges": edges,
+        "counts": counts,
+        "kde_x": grid,
+        "kde_y": density * len(values) * (edges[1] - edges[0]),
+    }
+
+# 2-D binned point counts per category (x/y bin centers and counts of non-empty bins), used
+# instead of plotting every point of a scatter
+def binned_scatter_artifact(df, x, y, color, bins=60):
+    x_values = np.asarray(df[x], dtype=np.float64)
+    y_values = np.asarray(df[y], dtype=np.float64)
+    x_edges = np.linspace(np.nanmin(x_values), np.nanmax(x_values), bins + 1)
+    y_edges = np.linspace(np.nanmin(y_values), np.nanmax(y_values), bins + 1)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+
+    categories = pd.Categorical(df[color])
+    frames = []
+    for code, category in enumerate(categories.categories):
+        selected = categories.codes == code
+        counts, _, _ = np.histogram2d(x_values[selected], y_values[selected], bins=[x_edges, y_edges])
+        x_bins, y_bins = np.nonzero(counts)
+        frames.append(pd.DataFrame({
+            x: x_centers[x_bins],
+            y: y_centers[y_bins],
+            "Objects": counts[x_bins, y_bins].astype(int),
+            color: category,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+# Mean of selected columns from each frame, as one row
+def means_artifact(columns_by_frame):
+    means = {}
+    for df, columns in columns_by_frame:
+        for column in columns:
+            means[column] = float(np.nanmean(np.asarray(df[column], dtype=np.float64)))
+    return pd.DataFrame(means, index=[0])
+
+# Cached artifacts for the "Detailed Analysis" selector, keyed by dataset hash, ingestion
+# snapshot version and parameters
+def magnitude_histogram(impacts_path, bins=20):
+    key = ("magnitude_histogram", ingestion.dataset_key(impacts_path), bins)
+    return _cache.get_or_compute(key, lambda: histogram_artifact(
+        ingestion.open_columns(impacts_path)["Asteroid Magnitude"], bins=bins))
+
+def eccentricity_inclination_bins(orbits_path, bins=60):
+    key = ("eccentricity_inclination_bins", ingestion.dataset_key(orbits_path), bins)
+    return _cache.get_or_compute(key, lambda: binned_scatter_artifact(
+        ingestion.open_columns(orbits_path),
+        "Orbit Eccentricity", "Orbit Inclination (deg)", "Object Classification", bins=bins))
+
+def orbits_vs_impacts_means(orbits_path, impacts_path):
+    key = ("orbits_vs_impacts_means", ingestion.dataset_key(orbits_path), ingestion.dataset_key(impacts_path))
+    return _cache.get_or_compute(key, lambda: means_artifact([
+        (ingestion.open_columns(orbits_path), ["Orbit Eccentricity", "Orbit Inclination (deg)"]),
+        (ingestion.open_columns(impacts_path), ["Asteroid Magnitude"]),
+    ]))
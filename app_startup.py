@@ -0,0 +1,138 @@
+import importlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+import pandas as pd
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "finalApp.py")
+
+# Libraries finalApp.py only imports on the pages that need them
+HEAVY_MODULES = ["plotly.express", "matplotlib.pyplot", "sklearn", "tensorflow"]
+
+# Set COSMIC_WARM_UP=1 to import these in a background thread after the first page is drawn
+# (TensorFlow is left out: the prediction engine runs on the NumPy runtime, and only training
+# and the Keras model loader need it)
+WARM_UP_ENV = "COSMIC_WARM_UP"
+WARM_UP_MODULES = ["plotly.express", "matplotlib.pyplot", "sklearn"]
+
+
+def warm_up_enabled():
+    return os.environ.get(WARM_UP_ENV, "") == "1"
+
+_warm_up_thread = None
+_warm_up_lock = threading.Lock()
+# Seconds each module took to import during warm-up
+warm_up_times = {}
+
+def _warm_up(modules, load_engine):
+    for name in modules:
+        started = time.perf_counter()
+        importlib.import_module(name)
+        warm_up_times[name] = time.perf_counter() - started
+    if load_engine:
+        import prediction_engine
+
+        started = time.perf_counter()
+        prediction_engine.get_engine()
+        warm_up_times["prediction_engine"] = time.perf_counter() - started
+
+# Start the background warm-up once per process (later calls return the same thread)
+def start_warm_up(modules=WARM_UP_MODULES, load_engine=True):
+    global _warm_up_thread
+    with _warm_up_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=_warm_up, args=(modules, load_engine), name="warm-up", daemon=True)
+            _warm_up_thread.start()
+        return _warm_up_thread
+
+
+# Page paths of the app, as the AppTest steps that reach them. Official pages start logged in.
+PAGES = {
+    "landing": [],
+    "public_calendar": [("role", "Public User")],
+    "public_learn": [("role", "Public User"), ("sidebar_button", "Learn")],
+    "public_predict": [("role", "Public User"), ("button", "Predict Collision")],
+    "official_login": [("role", "Official User")],
+    "official_home": [("login",), ("role", "Official User")],
+    "official_orbits_analysis": [("login",), ("role", "Official User"), ("selectbox", "Choose Analysis", "Orbits Analysis")],
+}
+
+# Cold-start budget per page: heavy libraries the page must not load, and peak RSS (MB).
+# `python app_startup.py` exits with an error when a page goes over its budget.
+BUDGETS = {
+    "landing": {"forbidden": HEAVY_MODULES, "max_rss_mb": 250},
+    "public_calendar": {"forbidden": HEAVY_MODULES, "max_rss_mb": 250},
+    "public_learn": {"forbidden": HEAVY_MODULES, "max_rss_mb": 250},
+    "public_predict": {"forbidden": ["plotly.express", "matplotlib.pyplot", "tensorflow"], "max_rss_mb": 300},
+    "official_login": {"forbidden": HEAVY_MODULES, "max_rss_mb": 250},
+    "official_home": {"forbidden": ["plotly.express", "tensorflow"], "max_rss_mb": 350},
+    "official_orbits_analysis": {"forbidden": ["tensorflow"], "max_rss_mb": 400},
+}
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+# Open one page path in this (fresh) process and report timings, peak RSS and heavy modules
+def measure_page(page):
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    streamlit_seconds = time.perf_counter() - started
+    streamlit_rss_mb = _peak_rss_mb()
+    app = AppTest.from_file(APP_PATH, default_timeout=600)
+    app.run()
+    for step in PAGES[page]:
+        if step[0] == "login":
+            app.session_state["logged_in"] = True
+            app.session_state["username"] = "benchmark"
+        elif step[0] == "role":
+            app.sidebar.selectbox[0].set_value(step[1]).run()
+        elif step[0] == "sidebar_button":
+            next(button for button in app.sidebar.button if button.label == step[1]).click().run()
+        elif step[0] == "button":
+            next(button for button in app.button if button.label == step[1]).click().run()
+        elif step[0] == "selectbox":
+            next(box for box in app.selectbox if box.label == step[1]).set_value(step[2]).run()
+    if app.exception:
+        raise RuntimeError(f"{page}: {app.exception[0].value}")
+    return {
+        "page": page,
+        "seconds": time.perf_counter() - started,
+        "streamlit_seconds": streamlit_seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+        "streamlit_rss_mb": streamlit_rss_mb,
+        "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+# Measure every page path in its own interpreter (so each one is a true cold start) and check
+# the results against BUDGETS
+def benchmark(pages=None):
+    results = []
+    for page in pages or PAGES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--page", page],
+            cwd=os.path.dirname(APP_PATH), capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        budget = BUDGETS[page]
+        over = [name for name in result["heavy_modules"] if name in budget["forbidden"]]
+        if result["peak_rss_mb"] > budget["max_rss_mb"]:
+            over.append(f"rss>{budget['max_rss_mb']}MB")
+        result["heavy_modules"] = ",".join(result["heavy_modules"]) or "-"
+        result["over_budget"] = ",".join(over) or "-"
+        results.append(result)
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--page"]:
+        print(json.dumps(measure_page(sys.argv[2])))
+    else:
+        report = benchmark(sys.argv[1:] or None)
+        print(report.to_string(index=False, float_format="%.2f"))
+        sys.exit(1 if (report["over_budget"] != "-").any() else 0)
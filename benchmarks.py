@@ -0,0 +1,265 @@
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import analysis_artifacts
+import dataset_cache
+import ingestion
+import instrumentation
+import numpy_runtime
+import prediction_engine
+import preprocessing
+from data_view import DataView
+from orbit_index import synthetic_catalog
+
+# Benchmark suite for the app's data and model paths, on the shipped datasets and on synthetic
+# catalogs SCALES times their size. Every case is timed with an instrumentation.Instrumentation,
+# so the results have the same columns as the diagnostics panel.
+SCALES = (1, 10, 100, 1000)
+REPEAT = 5
+PAGE_SIZE = 50
+SINGLE_ROW_REQUESTS = 200
+INFERENCE_CHUNK_ROWS = 250_000
+MOID = "Minimum Orbit Intersection Distance (AU)"
+
+# A case is skipped at a scale when its estimated working set (COPIES times the in-memory size
+# of its frame) is over MEMORY_SHARE of the memory available on this machine
+MEMORY_SHARE = 0.5
+COPIES = 4
+
+
+def available_mb():
+    try:
+        with open("/proc/meminfo") as file:
+            for line in file:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return float("inf")
+
+# Estimated working set (MB) of a case over n_rows rows of a frame like `sample`
+def working_set_mb(sample, n_rows):
+    return sample.memory_usage(deep=True).sum() / len(sample) * n_rows * COPIES / 2 ** 20
+
+# Arrow payload of a frame, as st.dataframe sends it to the browser
+def arrow_bytes(df):
+    from streamlit import dataframe_util
+
+    return dataframe_util.convert_pandas_df_to_arrow_bytes(df)
+
+# The "Detailed Analysis" figures as finalApp.py draws them, from freshly computed artifacts (no
+# artifact cache), rendered to the payload Streamlit sends. Each returns the payload size.
+def impact_analysis_figure(impacts):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    histogram = analysis_artifacts.histogram_artifact(impacts["Asteroid Magnitude"], bins=20)
+    fig, ax = plt.subplots()
+    ax.stairs(histogram["counts"], histogram["edges"], fill=True, alpha=0.5)
+    ax.plot(histogram["kde_x"], histogram["kde_y"])
+    ax.set_title("Asteroid Magnitude Distribution")
+    ax.set_xlabel("Asteroid Magnitude")
+    ax.set_ylabel("Count")
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    plt.close(fig)
+    return buffer.tell()
+
+def orbits_analysis_figure(orbits):
+    import plotly.express as px
+
+    bins_df = analysis_artifacts.binned_scatter_artifact(
+        orbits, "Orbit Eccentricity", "Orbit Inclination (deg)", "Object Classification")
+    fig = px.scatter(bins_df, x="Orbit Eccentricity", y="Orbit Inclination (deg)", color="Object Classification",
+                     size="Objects", title="Orbit Eccentricity vs Inclination")
+    return len(fig.to_json())
+
+def orbits_vs_impacts_figure(orbits, impacts):
+    import plotly.express as px
+
+    comparison_df = analysis_artifacts.means_artifact([
+        (orbits, ["Orbit Eccentricity", "Orbit Inclination (deg)"]),
+        (impacts, ["Asteroid Magnitude"]),
+    ])
+    fig = px.bar(comparison_df, barmode="group", title="Orbits vs Impacts Data Comparison")
+    return len(fig.to_json())
+
+
+# Synthetic copies of the shipped CSVs with `scale` times the rows, written to `folder`
+def write_datasets(folder, orbits, impacts, scale, write_orbits=True):
+    if scale == 1:
+        for filename in ["orbits.csv", "cleaned_Asteroid_orbit.csv", "impacts.csv"]:
+            shutil.copy(os.path.join("Original_Datasets", filename), folder)
+        return
+    if write_orbits:
+        raw_path = os.path.join(folder, "orbits.csv")
+        cleaned_path = os.path.join(folder, "cleaned_Asteroid_orbit.csv")
+        n_rows = len(orbits) * scale
+        for start in range(0, n_rows, 500_000):
+            records = ingestion.synthetic_orbits(orbits, min(500_000, n_rows - start), seed=start)
+            records.to_csv(raw_path, mode="a", header=start == 0, index=False)
+            preprocessing.clean_orbits(records).to_csv(cleaned_path, mode="a", header=start == 0, index=False)
+    synthetic_catalog(impacts, len(impacts) * scale).to_csv(os.path.join(folder, "impacts.csv"), index=False)
+
+def _repeat(tracker, stage, function, repeat):
+    for _ in range(repeat):
+        with tracker.timer(stage):
+            result = function()
+    return result
+
+# CSV load: plain read_csv (the app's original load), the columnar build, a warm columnar open
+# and the app's load_csv_data path (ingestion store over the columnar copy)
+def csv_cases(tracker, folder, repeat):
+    raw_path = os.path.join(folder, "orbits.csv")
+    _repeat(tracker, "csv.read_csv", lambda: pd.read_csv(raw_path), repeat)
+    with tracker.timer("csv.build_columnar"):
+        dataset_cache.build_columnar(raw_path)
+    _repeat(tracker, "csv.open_columnar", lambda: dataset_cache.load_frame(raw_path), repeat)
+    dataset_cache.build_columnar(os.path.join(folder, "cleaned_Asteroid_orbit.csv"))  # the store opens both tables
+
+    def load_csv_data():
+        ingestion._stores.clear()
+        return ingestion.load_frame(raw_path)
+
+    return _repeat(tracker, "csv.load_csv_data", load_csv_data, repeat)
+
+# DataFrame rendering: building the paged view, the first and next page of a sorted and
+# filtered table, and the Arrow payload of one page against the whole frame
+def render_cases(tracker, frame, repeat):
+    options = {"sort_by": MOID, "filters": {"Asteroid Magnitude": (20.0, 25.0)}}
+
+    def build_view():
+        view = DataView(frame)
+        view.sorted_index(MOID)
+        return view
+
+    view = _repeat(tracker, "render.view_build", build_view, repeat)
+    with tracker.timer("render.first_page"):
+        page, _ = view.page(1, PAGE_SIZE, **options)
+    _repeat(tracker, "render.next_page", lambda: view.page(2, PAGE_SIZE, **options), repeat)
+    arrow_bytes(page.head(1))  # imports the serializer outside the timing
+    page_bytes = len(_repeat(tracker, "render.page_arrow", lambda: arrow_bytes(page), repeat))
+    with tracker.timer("render.full_frame_arrow"):
+        frame_bytes = len(arrow_bytes(frame))
+    return {"render.page_arrow": page_bytes, "render.full_frame_arrow": frame_bytes}
+
+def figure_cases(tracker, orbits, impacts, repeat):
+    payloads = {}
+    if impacts is not None:
+        payloads["figure.impact_analysis"] = _repeat(tracker, "figure.impact_analysis", lambda: impact_analysis_figure(impacts), repeat)
+    if orbits is not None:
+        payloads["figure.orbits_analysis"] = _repeat(tracker, "figure.orbits_analysis", lambda: orbits_analysis_figure(orbits), repeat)
+    if orbits is not None and impacts is not None:
+        payloads["figure.orbits_vs_impacts"] = _repeat(
+            tracker, "figure.orbits_vs_impacts", lambda: orbits_vs_impacts_figure(orbits, impacts), repeat)
+    return payloads
+
+# Model load (NumPy runtime, then Keras, which imports TensorFlow) and single-row latency through
+# the prediction engine. Run last, so TensorFlow's memory is not in the other cases' RSS.
+def model_cases(tracker, matrix, repeat):
+    model = _repeat(tracker, "model.load_runtime", lambda: numpy_runtime.load_runtime(prediction_engine.MODEL_PATH), repeat)
+    engine = prediction_engine.PredictionEngine(model, matrix.pipeline)
+    for row in np.asarray(matrix.raw[:SINGLE_ROW_REQUESTS]):
+        with tracker.timer("model.single_row"):
+            engine.predict(row)
+    engine.close()
+    with tracker.timer("model.load_keras"):
+        prediction_engine.load_keras_model()
+
+# Batch inference over n_rows resampled feature rows, scaled and scored in chunks
+def batch_inference_case(tracker, model, matrix, n_rows):
+    rng = np.random.default_rng(0)
+    raw = np.asarray(matrix.raw)
+    for start in range(0, n_rows, INFERENCE_CHUNK_ROWS):
+        chunk = raw[rng.integers(0, len(raw), min(INFERENCE_CHUNK_ROWS, n_rows - start))]
+        with tracker.timer("model.batch"):
+            model.predict_on_batch(matrix.pipeline.scale_features(chunk))
+
+
+# Run every case at every scale. Returns one row per (scale, stage) with p50/p99 time,
+# rows/sec at the median, payload size where there is one, RSS high-water mark, and the
+# cases skipped for lack of memory.
+def run_suite(scales=SCALES, repeat=REPEAT):
+    orbits = pd.read_csv(os.path.join("Original_Datasets", "orbits.csv"))
+    impacts = pd.read_csv(os.path.join("Original_Datasets", "impacts.csv"))
+    matrix = preprocessing.feature_matrix()
+    model = numpy_runtime.load_runtime(prediction_engine.MODEL_PATH)
+    tracker = instrumentation.Instrumentation(profiling=False)
+    results = []
+
+    def collect(scale, rows_by_stage, payloads=None):
+        for stage, stats in tracker.stages().items():
+            n_rows = rows_by_stage.get(stage)
+            results.append({
+                "scale": scale,
+                "stage": stage,
+                "rows": n_rows,
+                "calls": stats["calls"],
+                "p50_ms": stats["p50_ms"],
+                "p99_ms": stats["p99_ms"],
+                "rows_per_sec": n_rows / stats["p50_ms"] * 1000.0 if n_rows else None,
+                "payload_kb": (payloads or {}).get(stage, 0) / 1024 or None,
+                "rss_high_water_mb": stats["rss_high_water_mb"],
+                "note": "",
+            })
+        tracker.reset()
+
+    for scale in scales:
+        n_orbits = len(orbits) * scale
+        n_impacts = len(impacts) * scale
+        orbits_fit = working_set_mb(orbits, n_orbits) <= available_mb() * MEMORY_SHARE
+        impacts_fit = working_set_mb(impacts, n_impacts) <= available_mb() * MEMORY_SHARE
+        case_repeat = repeat if scale <= 10 else 1
+        folder = tempfile.mkdtemp(prefix="benchmarks-")
+        try:
+            payloads = {}
+            write_datasets(folder, orbits, impacts, scale, write_orbits=orbits_fit)
+            scaled_orbits = scaled_impacts = None
+            if orbits_fit:
+                scaled_orbits = csv_cases(tracker, folder, case_repeat)
+                payloads.update(render_cases(tracker, scaled_orbits, case_repeat))
+            if impacts_fit:
+                scaled_impacts = dataset_cache.load_frame(os.path.join(folder, "impacts.csv"))
+            payloads.update(figure_cases(tracker, scaled_orbits, scaled_impacts, case_repeat))
+            batch_inference_case(tracker, model, matrix, len(matrix.raw) * scale)
+            rows_by_stage = {stage: n_orbits for stage in ["csv.read_csv", "csv.build_columnar", "csv.open_columnar",
+                                                           "csv.load_csv_data", "render.view_build", "render.full_frame_arrow",
+                                                           "figure.orbits_analysis"]}
+            rows_by_stage.update({"render.page_arrow": PAGE_SIZE, "figure.impact_analysis": n_impacts,
+                                  "figure.orbits_vs_impacts": n_orbits + n_impacts,
+                                  "model.batch": min(INFERENCE_CHUNK_ROWS, len(matrix.raw) * scale)})
+            collect(scale, rows_by_stage, payloads)
+            if not orbits_fit:
+                results.append({"scale": scale, "stage": "csv.*, render.*, figure.orbits_*", "rows": n_orbits,
+                                "note": f"skipped: needs ~{working_set_mb(orbits, n_orbits):.0f} MB, {available_mb():.0f} MB available"})
+        finally:
+            ingestion._stores.clear()
+            shutil.rmtree(folder, ignore_errors=True)
+
+    model_cases(tracker, matrix, repeat)
+    collect("-", {"model.single_row": 1})
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    # python benchmarks.py [scale ...] [--json results.json]
+    arguments = sys.argv[1:]
+    json_path = None
+    if "--json" in arguments:
+        json_path = arguments[arguments.index("--json") + 1]
+        del arguments[arguments.index("--json"):arguments.index("--json") + 2]
+    report = run_suite(tuple(int(scale) for scale in arguments) or SCALES)
+    print(f"{os.cpu_count()} CPU core(s), {available_mb():.0f} MB available")
+    print(report.to_string(index=False, float_format="%.2f"))
+    if json_path:
+        with open(json_path, "w") as file:
+            json.dump(json.loads(report.to_json(orient="records")), file, indent=2)
@@ -0,0 +1,356 @@
+import calendar
+import copy
+import os
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import dataset_cache
+import instrumentation
+
+IMPACTS_PATH = os.path.join("Original_Datasets", "impacts.csv")
+PROBABILITY_COLUMN = "Cumulative Impact Probability"
+TORINO_COLUMN = "Maximum Torino Scale"
+
+# Tree nodes with at most this many windows are leaves, scanned with one vectorized compare
+LEAF_SIZE = 64
+# Ranked queries enumerate the matching windows through the tree when there are at most this
+# many; above it, scanning the windows in probability order finds the top ones sooner
+ENUMERATE_LIMIT = 4096
+# Appended windows go into a delta tree until they outnumber this fraction of the indexed
+# ones; then the whole tree is rebuilt
+DELTA_FRACTION = 0.25
+
+
+# Risk windows of impacts.csv as inclusive day ordinals: the whole of Period Start's year to
+# the end of Period End's year
+def impact_windows(df):
+    starts = np.array([date(int(year), 1, 1).toordinal() for year in df["Period Start"]], dtype=np.int64)
+    ends = np.array([date(int(year), 12, 31).toordinal() for year in df["Period End"]], dtype=np.int64)
+    return starts, ends
+
+def to_ordinal(value):
+    return value if isinstance(value, (int, np.integer)) else value.toordinal()
+
+# Merge two id orders, each sorted by its keys, into the order a stable argsort of the
+# concatenated keys would give (on equal keys the old ids come first)
+def merge_orders(old_keys, old_order, new_keys, new_order):
+    positions = np.searchsorted(old_keys, new_keys, side="right") + np.arange(len(new_keys))
+    merged = np.empty(len(old_order) + len(new_order), dtype=np.int64)
+    is_new = np.zeros(len(merged), dtype=bool)
+    is_new[positions] = True
+    merged[positions] = new_order
+    merged[~is_new] = old_order
+    return merged
+
+
+# Static centered interval tree over [start, end] windows, stored as flat arrays. Each node
+# keeps the windows that contain its center twice: sorted by start (a stab left of the center
+# matches a prefix) and by end (a stab right of it matches a suffix). Stab and range queries
+# walk O(log n) nodes and return window ids; counts come from the sorted endpoints alone.
+# Windows appended later are kept in a small delta tree (ids continue after the indexed ones).
+class IntervalTree:
+    def __init__(self, starts, ends, leaf_size=LEAF_SIZE):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.sorted_starts = np.sort(self.starts)
+        self.sorted_ends = np.sort(self.ends)
+        self.leaf_size = leaf_size
+        self.n_indexed = len(self.starts)
+        self.delta = None
+        self._build(leaf_size)
+
+    # Tree over these windows plus the given ones. The node arrays are shared with this tree,
+    # the sorted endpoints are merged, and only the appended windows get a new (delta) tree.
+    def extended(self, starts, ends):
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        all_starts = np.concatenate([self.starts, starts])
+        all_ends = np.concatenate([self.ends, ends])
+        if len(all_starts) - self.n_indexed > DELTA_FRACTION * self.n_indexed:
+            return IntervalTree(all_starts, all_ends, self.leaf_size)
+        tree = copy.copy(self)
+        tree.starts, tree.ends = all_starts, all_ends
+        tree.sorted_starts = np.sort(np.concatenate([self.sorted_starts, starts]), kind="stable")
+        tree.sorted_ends = np.sort(np.concatenate([self.sorted_ends, ends]), kind="stable")
+        tree.delta = IntervalTree(all_starts[self.n_indexed:], all_ends[self.n_indexed:], self.leaf_size)
+        return tree
+
+    def _build(self, leaf_size):
+        centers, lefts, rights, offsets, counts, leaves = [], [], [], [], [], []
+        by_start, by_end = [], []
+        position = 0
+        stack = [(np.arange(len(self.starts)), None, None)]
+        while stack:
+            ids, parent, side = stack.pop()
+            node = len(centers)
+            if parent is not None:
+                (lefts if side == "left" else rights)[parent] = node
+            lefts.append(-1)
+            rights.append(-1)
+            starts, ends = self.starts[ids], self.ends[ids]
+            if len(ids) <= leaf_size:
+                centers.append(0)
+                leaves.append(True)
+                here = ids
+            else:
+                # Median endpoint: the window it belongs to contains it, so every node keeps at
+                # least one window and the recursion always shrinks
+                endpoints = np.concatenate([starts, ends])
+                center = int(np.partition(endpoints, len(endpoints) // 2)[len(endpoints) // 2])
+                centers.append(center)
+                leaves.append(False)
+                here = ids[(starts <= center) & (ends >= center)]
+                stack.append((ids[ends < center], node, "left"))
+                stack.append((ids[starts > center], node, "right"))
+            start_order = here[np.argsort(self.starts[here], kind="stable")]
+            end_order = here[np.argsort(self.ends[here], kind="stable")]
+            by_start.append(start_order)
+            by_end.append(end_order)
+            offsets.append(position)
+            counts.append(len(here))
+            position += len(here)
+
+        self.centers = np.array(centers, dtype=np.int64)
+        self.lefts = np.array(lefts, dtype=np.int64)
+        self.rights = np.array(rights, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.counts = np.array(counts, dtype=np.int64)
+        self.leaves = np.array(leaves, dtype=bool)
+        self.by_start = np.concatenate(by_start) if by_start else np.empty(0, dtype=np.int64)
+        self.by_end = np.concatenate(by_end) if by_end else np.empty(0, dtype=np.int64)
+        self.node_starts = self.starts[self.by_start]
+        self.node_ends = self.ends[self.by_end]
+
+    @property
+    def n_nodes(self):
+        return len(self.centers) + (self.delta.n_nodes if self.delta is not None else 0)
+
+    # Number of windows overlapping [low, high]: all but those ending before low or starting after high
+    def count_overlapping(self, low, high):
+        return (len(self.starts) - np.searchsorted(self.sorted_ends, low, side="left")
+                - (len(self.starts) - np.searchsorted(self.sorted_starts, high, side="right")))
+
+    # Ids of the windows overlapping [low, high] (a stab when low == high), in no particular order
+    def overlapping(self, low, high=None):
+        high = low if high is None else high
+        found = []
+        node = 0 if len(self.centers) else -1
+        pending = [node] if node >= 0 else []
+        while pending:
+            node = pending.pop()
+            begin, end = self.offsets[node], self.offsets[node] + self.counts[node]
+            if self.leaves[node]:
+                ids = self.by_start[begin:end]
+                found.append(ids[(self.starts[ids] <= high) & (self.ends[ids] >= low)])
+                continue
+            center = self.centers[node]
+            if high < center:
+                # Windows here end at or after the center, so they overlap iff they start by high
+                stop = np.searchsorted(self.node_starts[begin:end], high, side="right")
+                found.append(self.by_start[begin:begin + stop])
+            elif low > center:
+                first = np.searchsorted(self.node_ends[begin:end], low, side="left")
+                found.append(self.by_end[begin + first:end])
+            else:
+                found.append(self.by_start[begin:end])
+            if low < center and self.lefts[node] >= 0:
+                pending.append(self.lefts[node])
+            if high > center and self.rights[node] >= 0:
+                pending.append(self.rights[node])
+        if self.delta is not None:
+            found.append(self.delta.overlapping(low, high) + self.n_indexed)
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+
+# Calendar of impact risk windows: the interval tree plus the windows' probabilities, with
+# ranked queries and per-day counts and probability sums for month heat maps
+class CollisionCalendar:
+    def __init__(self, starts, ends, probabilities, names=None, torino=None):
+        self.tree = IntervalTree(starts, ends)
+        self.probabilities = np.asarray(probabilities, dtype=np.float64)
+        self.names = np.asarray(names, dtype=object) if names is not None else None
+        self.torino = np.asarray(torino) if torino is not None else None
+        # Window ids from most to least probable, for top-k scans
+        self.by_probability = np.argsort(-self.probabilities, kind="stable")
+        self._start_order = np.argsort(self.tree.starts, kind="stable")
+        self._end_order = np.argsort(self.tree.ends, kind="stable")
+        self._derive()
+
+    # Arrays that follow from the orders: the endpoints in probability order and the
+    # probability prefix sums in start and end order (the summed probability of the windows
+    # active on a day is then also two binary searches)
+    def _derive(self):
+        self._ranked_starts = self.tree.starts[self.by_probability]
+        self._ranked_ends = self.tree.ends[self.by_probability]
+        self._start_cumsum = np.concatenate([[0.0], np.cumsum(self.probabilities[self._start_order])])
+        self._end_cumsum = np.concatenate([[0.0], np.cumsum(self.probabilities[self._end_order])])
+
+    @classmethod
+    def from_frame(cls, df):
+        starts, ends = impact_windows(df)
+        return cls(starts, ends, df[PROBABILITY_COLUMN], df["Object Name"], df[TORINO_COLUMN])
+
+    # Calendar over `df`, which is this calendar's frame with rows appended. Only the new rows
+    # are turned into windows; they are merged into the probability, start and end orders and
+    # indexed by the tree's delta. The gathers and prefix sums are redone in O(n) numpy.
+    def extended(self, df):
+        new_rows = df.iloc[len(self.probabilities):]
+        starts, ends = impact_windows(new_rows)
+        probabilities = new_rows[PROBABILITY_COLUMN].to_numpy(dtype=np.float64)
+        ids = len(self.probabilities) + np.arange(len(new_rows))
+        risk_calendar = CollisionCalendar.__new__(CollisionCalendar)
+        risk_calendar.tree = self.tree.extended(starts, ends)
+        risk_calendar.probabilities = np.concatenate([self.probabilities, probabilities])
+        risk_calendar.names = (np.concatenate([self.names, np.asarray(new_rows["Object Name"], dtype=object)])
+                               if self.names is not None else None)
+        risk_calendar.torino = (np.concatenate([self.torino, np.asarray(new_rows[TORINO_COLUMN])])
+                                if self.torino is not None else None)
+        order = np.argsort(-probabilities, kind="stable")
+        risk_calendar.by_probability = merge_orders(
+            -self.probabilities[self.by_probability], self.by_probability, -probabilities[order], ids[order])
+        order = np.argsort(starts, kind="stable")
+        risk_calendar._start_order = merge_orders(self.tree.sorted_starts, self._start_order, starts[order], ids[order])
+        order = np.argsort(ends, kind="stable")
+        risk_calendar._end_order = merge_orders(self.tree.sorted_ends, self._end_order, ends[order], ids[order])
+        risk_calendar._derive()
+        return risk_calendar
+
+    @property
+    def first_day(self):
+        return date.fromordinal(int(self.tree.sorted_starts[0]))
+
+    @property
+    def last_day(self):
+        return date.fromordinal(int(self.tree.sorted_ends[-1]))
+
+    # Up to `limit` ids of the windows overlapping [low, high], most probable first. Small
+    # result sets are enumerated through the tree; large ones are found by scanning windows in
+    # probability order, where about limit * n / matches windows have to be checked.
+    def ranked(self, low, high=None, limit=10):
+        low = to_ordinal(low)
+        high = low if high is None else to_ordinal(high)
+        matches = int(self.tree.count_overlapping(low, high))
+        if matches == 0:
+            return np.empty(0, dtype=np.int64)
+        limit = min(limit or matches, matches)
+        if matches <= ENUMERATE_LIMIT:
+            ids = self.tree.overlapping(low, high)
+            order = np.lexsort((ids, -self.probabilities[ids]))
+            return ids[order[:limit]]
+
+        block = max(1024, 2 * limit * len(self.probabilities) // matches)
+        found = []
+        for start in range(0, len(self.probabilities), block):
+            hit = (self._ranked_starts[start:start + block] <= high) & (self._ranked_ends[start:start + block] >= low)
+            found.append(self.by_probability[start:start + block][hit])
+            if sum(len(ids) for ids in found) >= limit:
+                break
+        return np.concatenate(found)[:limit]
+
+    # Objects at risk on a day or in a date range, most probable first
+    def at_risk(self, low, high=None, limit=10):
+        return self.windows(self.ranked(low, high, limit))
+
+    # Name, window years, probability and Torino scale of the given window ids, in that order
+    def windows(self, ids):
+        return pd.DataFrame({
+            "Object Name": self.names[ids] if self.names is not None else ids,
+            "Period Start": [date.fromordinal(int(day)).year for day in self.tree.starts[ids]],
+            "Period End": [date.fromordinal(int(day)).year for day in self.tree.ends[ids]],
+            PROBABILITY_COLUMN: self.probabilities[ids],
+            TORINO_COLUMN: self.torino[ids] if self.torino is not None else np.nan,
+        })
+
+    def count(self, low, high=None):
+        low = to_ordinal(low)
+        return int(self.tree.count_overlapping(low, low if high is None else to_ordinal(high)))
+
+    # Per-day number of active windows and their summed probability for one month
+    def month_heatmap(self, year, month):
+        days = np.arange(date(year, month, 1).toordinal(), date(year, month, calendar.monthrange(year, month)[1]).toordinal() + 1)
+        started = np.searchsorted(self.tree.sorted_starts, days, side="right")
+        ended = np.searchsorted(self.tree.sorted_ends, days, side="left")
+        return pd.DataFrame({
+            "date": [date.fromordinal(int(day)) for day in days],
+            "windows": started - ended,
+            "probability_sum": self._start_cumsum[started] - self._end_cumsum[ended],
+        })
+
+
+_calendars = {}
+
+# Calendar of an impacts CSV, built once per content hash
+def load_calendar(path=IMPACTS_PATH):
+    data_hash = dataset_cache.dataset_hash(path)
+    instrumentation.cache_event("collision_calendar", hit=data_hash in _calendars)
+    if data_hash not in _calendars:
+        with instrumentation.timer("collision_calendar.build"):
+            _calendars[data_hash] = CollisionCalendar.from_frame(dataset_cache.load_frame(path))
+    return _calendars[data_hash]
+
+
+# n random day-level windows (up to ~100 years long) with log-uniform probabilities
+def synthetic_windows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    first = date(2017, 1, 1).toordinal()
+    starts = first + rng.integers(0, 365 * 800, n)
+    ends = starts + rng.integers(0, 365 * 100, n)
+    return starts, ends, 10.0 ** rng.uniform(-10, -2, n)
+
+def _timed(function, repeat=200):
+    best = np.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000.0, result
+
+# Build time and best-of query latency on the real windows and on synthetic ones, checked
+# against a full linear scan
+def benchmark(sizes=(100_000, 1_000_000), n_queries=20, seed=1):
+    rng = np.random.default_rng(seed)
+    real = dataset_cache.load_frame(IMPACTS_PATH)
+    datasets = [("impacts.csv", *impact_windows(real), real[PROBABILITY_COLUMN].to_numpy())]
+    datasets += [(f"synthetic {n}", *synthetic_windows(n)) for n in sizes]
+    results = []
+    for name, starts, ends, probabilities in datasets:
+        started = time.perf_counter()
+        risk_calendar = CollisionCalendar(starts, ends, probabilities)
+        build_ms = (time.perf_counter() - started) * 1000.0
+        days = rng.integers(int(starts.min()), int(ends.max()), n_queries)
+        timings = {"stab_count_ms": [], "stab_top10_ms": [], "range_top10_ms": [], "narrow_stab_ms": [], "scan_top10_ms": []}
+        for day in days:
+            day = int(day)
+            timings["stab_count_ms"].append(_timed(lambda: risk_calendar.count(day))[0])
+            ms, found = _timed(lambda: risk_calendar.ranked(day, limit=10))
+            timings["stab_top10_ms"].append(ms)
+            scan_ms, _ = _timed(lambda: np.argsort(-np.where((starts <= day) & (ends >= day), probabilities, -1.0))[:10], repeat=3)
+            timings["scan_top10_ms"].append(scan_ms)
+            mask = (starts <= day) & (ends >= day)
+            expected = np.sort(probabilities[mask])[::-1][:10]
+            assert np.array_equal(probabilities[found], expected)
+            ms, found = _timed(lambda: risk_calendar.ranked(day, day + 30, limit=10))
+            timings["range_top10_ms"].append(ms)
+            mask = (starts <= day + 30) & (ends >= day)
+            assert np.array_equal(probabilities[found], np.sort(probabilities[mask])[::-1][:10])
+        # Enumerate every match on the day the earliest window ends (a small result set)
+        narrow_day = int(risk_calendar.tree.sorted_ends[0])
+        ms, found = _timed(lambda: risk_calendar.tree.overlapping(narrow_day))
+        assert len(found) == risk_calendar.count(narrow_day)
+        timings["narrow_stab_ms"].append(ms)
+        results.append(dict(
+            {"windows": name, "build_ms": build_ms, "tree_nodes": risk_calendar.tree.n_nodes},
+            **{f"max_{key}": max(values) for key, values in timings.items()},
+        ))
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    risk_calendar = load_calendar()
+    today = date.today()
+    print(f"{len(risk_calendar.probabilities)} impact windows, {risk_calendar.first_day} to {risk_calendar.last_day}")
+    print(risk_calendar.at_risk(today).to_string(index=False))
+    print(benchmark().to_string(index=False, float_format="%.3f"))
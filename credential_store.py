@@ -0,0 +1,262 @@
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# SQLite database holding the official users (replaces the whole-file Users.json rewrites)
+DB_PATH = "users.db"
+LEGACY_CREDENTIALS_FILE = "Users.json"
+
+# Salted PBKDF2-SHA256; hashes are stored as "pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>".
+# Users.json entries were unsalted SHA-256 and are stored as "sha256$<hex>" until their next login.
+PBKDF2_ITERATIONS = 200_000
+HASH_WORKERS = 2
+MAX_PENDING_HASHES = 64
+
+
+def hash_password(password, salt=None, iterations=None):
+    salt = salt or secrets.token_bytes(16)
+    iterations = iterations or PBKDF2_ITERATIONS
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${salt.hex()}${digest.hex()}"
+
+# Check a password against a stored hash: (matches, should be rehashed with the current settings)
+def verify_password(password, stored):
+    scheme, _, rest = stored.partition("$")
+    if scheme == "sha256":
+        candidate = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(candidate, rest), True
+    if scheme == "pbkdf2_sha256":
+        iterations, salt, _ = rest.split("$")
+        candidate = hash_password(password, bytes.fromhex(salt), int(iterations))
+        return hmac.compare_digest(candidate, stored), int(iterations) != PBKDF2_ITERATIONS
+    return False, False
+
+
+# Username-indexed credential store on SQLite in WAL mode (readers never wait for writers,
+# and concurrent signups are serialized by the database, not lost).
+# Password hashing runs on a small thread pool (PBKDF2 releases the GIL) with at most
+# max_pending hashes queued, so a burst of logins cannot pile up unbounded work.
+# Stored hashes are cached per process; entries are only ever added or upgraded, so a cached
+# hash is always one that still verifies the user's current password.
+class CredentialStore:
+    def __init__(self, path=DB_PATH, hash_workers=HASH_WORKERS, max_pending=MAX_PENDING_HASHES, cache_size=4096):
+        self.path = path
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(hash_workers, thread_name_prefix="password-hash")
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password_hash TEXT NOT NULL, created_at TEXT NOT NULL)"
+            )
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    # One connection per thread (sqlite3 connections must not be shared between threads)
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    # Run a hashing function on the executor; blocks while max_pending hashes are already queued
+    def _hash(self, function, *args):
+        self._pending.acquire()
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future.result()
+
+    def _cached_hash(self, username):
+        with self._cache_lock:
+            if username in self._cache:
+                self._cache.move_to_end(username)
+                return self._cache[username]
+        row = self._connection().execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            return None
+        self._remember(username, row[0])
+        return row[0]
+
+    def _remember(self, username, stored):
+        with self._cache_lock:
+            self._cache[username] = stored
+            self._cache.move_to_end(username)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def exists(self, username):
+        return self._cached_hash(username) is not None
+
+    # Add a user; False if the username is already taken (checked atomically by the primary key)
+    def create_user(self, username, password):
+        if self.exists(username):
+            return False
+        stored = self._hash(hash_password, password)
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, datetime('now'))",
+                    (username, stored),
+                )
+        except sqlite3.IntegrityError:
+            return False
+        self._remember(username, stored)
+        return True
+
+    # Check a login; legacy or outdated hashes are replaced with a fresh salted hash on success
+    def verify(self, username, password):
+        stored = self._cached_hash(username)
+        if stored is None:
+            # Hash anyway, so unknown usernames take as long as wrong passwords
+            self._hash(hash_password, password)
+            return False
+        matches, upgrade = self._hash(verify_password, password, stored)
+        if matches and upgrade:
+            upgraded = self._hash(hash_password, password)
+            with self._connection() as connection:
+                connection.execute(
+                    "UPDATE users SET password_hash = ? WHERE username = ? AND password_hash = ?",
+                    (upgraded, username, stored),
+                )
+            self._remember(username, upgraded)
+        return matches
+
+    def user_count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    # One-time import of the SHA-256 entries of a Users.json file ({"username": "<sha256 hex>"}).
+    # The file's hash is recorded, so the import only runs again if the file changes; a file
+    # that is not such a JSON object is recorded as imported with no users.
+    def migrate_users_json(self, path=LEGACY_CREDENTIALS_FILE):
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as file:
+            content = file.read()
+        file_hash = hashlib.sha256(content).hexdigest()
+        connection = self._connection()
+        done = connection.execute("SELECT value FROM meta WHERE key = 'users_json_sha256'").fetchone()
+        if done is not None and done[0] == file_hash:
+            return 0
+
+        try:
+            legacy = json.loads(content)
+        except ValueError:
+            legacy = {}
+        if not isinstance(legacy, dict):
+            legacy = {}
+        entries = [
+            (username, f"sha256${digest.lower()}")
+            for username, digest in legacy.items()
+            if isinstance(digest, str) and len(digest) == 64 and all(c in "0123456789abcdefABCDEF" for c in digest)
+        ]
+        with connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO users (username, password_hash, created_at) VALUES (?, ?, datetime('now'))",
+                entries,
+            )
+            imported = connection.total_changes - before
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('users_json_sha256', ?)", (file_hash,))
+        return imported
+
+    def close(self):
+        self._executor.shutdown()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+# Process-wide store, with Users.json migrated on first use
+def get_store(path=DB_PATH, legacy_path=LEGACY_CREDENTIALS_FILE):
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CredentialStore(path)
+            _store.migrate_users_json(legacy_path)
+        return _store
+
+
+# The Users.json approach this store replaces: read, modify and rewrite the whole file
+def _json_signup(path, username, password):
+    try:
+        with open(path) as file:
+            credentials = json.load(file)
+    except (FileNotFoundError, ValueError):
+        credentials = {}
+    if username in credentials:
+        return False
+    credentials[username] = hashlib.sha256(password.encode()).hexdigest()
+    with open(path, "w") as file:
+        json.dump(credentials, file)
+    return True
+
+def _run_concurrently(function, jobs, threads):
+    with ThreadPoolExecutor(threads) as pool:
+        started = time.perf_counter()
+        results = list(pool.map(lambda job: function(*job), jobs))
+        return results, time.perf_counter() - started
+
+# Concurrent signups (each username attempted twice) and logins (half with a wrong password)
+# against the store, checking every result; the old whole-file JSON approach is run with the
+# same signups to show how many of them it loses
+def load_test(n_users=200, n_logins=1000, threads=16, iterations=PBKDF2_ITERATIONS):
+    global PBKDF2_ITERATIONS
+    saved_iterations, PBKDF2_ITERATIONS = PBKDF2_ITERATIONS, iterations
+    workdir = tempfile.mkdtemp(prefix="credentials-")
+    try:
+        users = [(f"user{i}", f"password-{i}") for i in range(n_users)]
+        signups = users + users
+        store = CredentialStore(os.path.join(workdir, "users.db"))
+        created, signup_seconds = _run_concurrently(store.create_user, signups, threads)
+        assert sum(created) == n_users and store.user_count() == n_users
+
+        logins = [(users[i % n_users][0], users[i % n_users][1] + ("" if i % 2 == 0 else "x")) for i in range(n_logins)]
+        accepted, login_seconds = _run_concurrently(store.verify, logins, threads)
+        assert accepted == [i % 2 == 0 for i in range(n_logins)]
+        store_users = store.user_count()
+        store.close()
+
+        json_path = os.path.join(workdir, "Users.json")
+        _, json_seconds = _run_concurrently(lambda username, password: _json_signup(json_path, username, password), signups, threads)
+        try:
+            with open(json_path) as file:
+                json_users = len(json.load(file))
+        except ValueError:
+            json_users = 0  # the file itself was left torn by overlapping writes
+    finally:
+        PBKDF2_ITERATIONS = saved_iterations
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return pd.DataFrame([{
+        "users": n_users,
+        "threads": threads,
+        "pbkdf2_iterations": iterations,
+        "signups_per_sec": len(signups) / signup_seconds,
+        "logins_per_sec": n_logins / login_seconds,
+        "store_users_kept": store_users,
+        "json_file_users_kept": json_users,
+        "json_signups_per_sec": len(signups) / json_seconds,
+    }])
+
+
+if __name__ == "__main__":
+    print(load_test().to_string(index=False, float_format="%.1f"))
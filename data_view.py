@@ -0,0 +1,127 @@
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import dataset_cache
+from orbit_index import SortedIndex, synthetic_catalog
+
+
+# Server-side paging over a DataFrame: sorting uses precomputed sort permutations, filters
+# use binary searches on them, and only the requested page of rows is ever materialized.
+# Row counts and summary statistics are computed once when the view is built.
+# Summary statistics can be passed in when they are maintained elsewhere (see ingestion.py).
+class DataView:
+    def __init__(self, df, max_cached_orders=8, summary=None):
+        self.df = df
+        self.n_rows = len(df)
+        self.numeric_columns = [column for column in df.columns if pd.api.types.is_numeric_dtype(df[column])]
+        if summary is None:
+            summary = df[self.numeric_columns].describe().T if self.numeric_columns else pd.DataFrame()
+        self.summary = summary
+        self._indexes = {}
+        self._orders = OrderedDict()
+        self.max_cached_orders = max_cached_orders
+
+    # Sorted index of a column, built on first use (text columns sort alphabetically)
+    def sorted_index(self, column):
+        if column not in self._indexes:
+            values = self.df[column]
+            if not pd.api.types.is_numeric_dtype(values):
+                # Sort text by category value, not by the order categories were encoded in
+                categorical = pd.Categorical(values)
+                rank = np.argsort(np.argsort(np.asarray(categorical.categories, dtype=str)))
+                values = np.where(categorical.codes < 0, np.nan, rank[categorical.codes])
+            self._indexes[column] = SortedIndex(values)
+        return self._indexes[column]
+
+    # View over `df`, which is this view's frame with rows appended. Numeric sorted indexes
+    # already built are merged with the new rows; text indexes (whose category ranks can
+    # change) and cached orders are rebuilt on use.
+    def extended(self, df, summary=None):
+        view = DataView(df, self.max_cached_orders, summary)
+        for column, index in self._indexes.items():
+            if pd.api.types.is_numeric_dtype(df[column]):
+                view._indexes[column] = index.extended(np.asarray(df[column])[self.n_rows:])
+        return view
+
+    # Row ids passing every (low, high) range filter, ascending; None means no filter
+    def filter_rows(self, filters):
+        if not filters:
+            return None
+        ranges = sorted(filters.items(), key=lambda item: self.sorted_index(item[0]).count(*item[1]))
+        column, (low, high) = ranges[0]
+        rows = np.sort(self.sorted_index(column).range(low, high))
+        for column, (low, high) in ranges[1:]:
+            rows = rows[self.sorted_index(column).contains(rows, low, high)]
+        return rows
+
+    # Ordered row ids for a sort/filter combination; the last few combinations are cached so
+    # paging through results never re-sorts or re-filters
+    def ordered_rows(self, sort_by=None, ascending=True, filters=None):
+        key = (sort_by, ascending, tuple(sorted((filters or {}).items())))
+        if key in self._orders:
+            self._orders.move_to_end(key)
+            return self._orders[key]
+
+        rows = self.filter_rows(filters)
+        if sort_by is None:
+            order = np.arange(self.n_rows) if rows is None else rows
+        else:
+            index = self.sorted_index(sort_by)
+            order = index.order if ascending else index.descending_order()
+            if rows is not None:
+                selected = np.zeros(self.n_rows, dtype=bool)
+                selected[rows] = True
+                order = order[selected[order]]
+
+        self._orders[key] = order
+        if len(self._orders) > self.max_cached_orders:
+            self._orders.popitem(last=False)
+        return order
+
+    def page_count(self, page_size, **options):
+        return max(1, -(-len(self.ordered_rows(**options)) // page_size))
+
+    # One page of rows (page numbers start at 1) and the total number of matching rows. Text
+    # columns keep only the categories on the page, or every page would carry the dictionary of
+    # the whole column to the browser.
+    def page(self, page, page_size, sort_by=None, ascending=True, filters=None):
+        order = self.ordered_rows(sort_by, ascending, filters)
+        start = (page - 1) * page_size
+        rows = self.df.take(order[start:start + page_size])
+        for column in rows.columns:
+            if isinstance(rows[column].dtype, pd.CategoricalDtype):
+                rows[column] = rows[column].cat.remove_unused_categories()
+        return rows, len(order)
+
+
+# Time and payload of one page as the catalog grows (views are built outside the timing,
+# as they are cached once per process in the app)
+def benchmark(sizes=(15_634, 100_000, 1_000_000), page_size=50):
+    base = dataset_cache.load_frame(os.path.join("Original_Datasets", "orbits.csv"))
+    options = {"sort_by": "Minimum Orbit Intersection Distance (AU)", "filters": {"Asteroid Magnitude": (20.0, 25.0)}}
+    results = []
+    for n_rows in sizes:
+        view = DataView(base if n_rows == len(base) else synthetic_catalog(base, n_rows))
+        started = time.perf_counter()
+        view.page(1, page_size, **options)
+        first_ms = (time.perf_counter() - started) * 1000.0
+        started = time.perf_counter()
+        page, total = view.page(2, page_size, **options)
+        next_ms = (time.perf_counter() - started) * 1000.0
+        results.append({
+            "rows": n_rows,
+            "matching_rows": total,
+            "first_page_ms": first_ms,
+            "next_page_ms": next_ms,
+            "page_payload_kb": len(page.to_json(orient="split")) / 1024,
+            "full_payload_kb": len(view.df.head(100_000).to_json(orient="split")) / 1024 * n_rows / min(n_rows, 100_000),
+        })
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    print(benchmark().to_string(index=False, float_format="%.2f"))
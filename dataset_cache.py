@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+
+# Columnar copies of the CSVs live next to them; the CSVs stay the source of truth
+CACHE_DIR_NAME = ".columnar"
+MANIFEST_FILE = "manifest.json"
+
+# SHA-256 of a file, read in 1 MB blocks
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Directory holding the columnar copy of one CSV
+def cache_dir_for(csv_path):
+    folder, filename = os.path.split(csv_path)
+    return os.path.join(folder, CACHE_DIR_NAME, os.path.splitext(filename)[0])
+
+# Smallest signed integer type that can hold the dictionary codes (-1 marks missing values)
+def _code_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+# One lock per CSV path so concurrent sessions do not rebuild the same cache twice
+_build_locks = {}
+_build_locks_lock = threading.Lock()
+
+def _build_lock(csv_path):
+    with _build_locks_lock:
+        return _build_locks.setdefault(os.path.abspath(csv_path), threading.RLock())
+
+# Convert one CSV into a directory of .npy files (one per column) plus a manifest.
+# Text columns are dictionary-encoded: the codes go into the .npy file and the
+# categories into the manifest. The columns go into a version directory named after
+# the CSV hash; a published version is never modified, only the manifest moves on.
+def build_columnar(csv_path, source_hash=None):
+    with _build_lock(csv_path):
+        return _build_columnar(csv_path, source_hash)
+
+def _build_columnar(csv_path, source_hash):
+    source_hash = source_hash or file_sha256(csv_path)
+    target_dir = cache_dir_for(csv_path)
+    os.makedirs(target_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=target_dir, prefix=".tmp-")
+
+    try:
+        df = pd.read_csv(csv_path)
+        columns = []
+        for i, name in enumerate(df.columns):
+            series = df[name]
+            filename = f"{i:03d}.npy"
+            if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                np.save(os.path.join(tmp_dir, filename), series.to_numpy())
+                columns.append({"name": name, "file": filename, "kind": "numeric"})
+            else:
+                codes, categories = pd.factorize(series, sort=True)
+                np.save(os.path.join(tmp_dir, filename), codes.astype(_code_dtype(len(categories))))
+                columns.append({"name": name, "file": filename, "kind": "categorical", "categories": categories.tolist()})
+
+        # Publish the finished version directory; if another process already published
+        # the same content, keep theirs
+        version = source_hash[:16]
+        try:
+            os.rename(tmp_dir, os.path.join(target_dir, version))
+        except OSError:
+            if not os.path.isdir(os.path.join(target_dir, version)):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    stat = os.stat(csv_path)
+    manifest = {
+        "source_sha256": source_hash,
+        "source_size": stat.st_size,
+        "source_mtime": stat.st_mtime,
+        "version": version,
+        "rows": len(df),
+        "columns": columns,
+    }
+    previous = _read_manifest(csv_path)
+    _write_manifest(csv_path, manifest)
+
+    # Drop everything but the current and the previous version; readers that opened the
+    # previous manifest just before the swap can still load its files. Staging entries
+    # (".tmp-*") may belong to another process that is still building.
+    keep = {MANIFEST_FILE, version, previous and previous.get("version")}
+    for entry in os.listdir(target_dir):
+        if entry not in keep and not entry.startswith(".tmp-"):
+            path = os.path.join(target_dir, entry)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+    return manifest
+
+def _read_manifest(csv_path):
+    try:
+        with open(os.path.join(cache_dir_for(csv_path), MANIFEST_FILE)) as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    # Manifests from before version directories point at files that are no longer there
+    return manifest if "version" in manifest else None
+
+# Atomically replace the manifest (the temp name is unique per process and thread)
+def _write_manifest(csv_path, manifest):
+    manifest_path = os.path.join(cache_dir_for(csv_path), MANIFEST_FILE)
+    tmp_path = os.path.join(os.path.dirname(manifest_path), f".tmp-manifest-{os.getpid()}-{threading.get_ident()}")
+    with open(tmp_path, "w") as file:
+        json.dump(manifest, file)
+    os.replace(tmp_path, manifest_path)
+
+# Manifests already read by this process, keyed by CSV path
+_manifests = {}
+
+def _is_current(manifest, stat):
+    return manifest is not None and manifest["source_size"] == stat.st_size and manifest["source_mtime"] == stat.st_mtime
+
+# Return an up-to-date manifest, rebuilding the columnar copy when the CSV hash changed.
+# Size and mtime are checked first so an unchanged CSV is not re-hashed on every open.
+def ensure_columnar(csv_path):
+    stat = os.stat(csv_path)
+    manifest = _manifests.get(csv_path)
+    if _is_current(manifest, stat):
+        instrumentation.cache_event("columnar", hit=True)
+        return manifest
+    with _build_lock(csv_path):
+        # Another thread may have rebuilt it while this one waited
+        stat = os.stat(csv_path)
+        manifest = _manifests.get(csv_path)
+        if not _is_current(manifest, stat):
+            manifest = _load_manifest(csv_path, stat)
+            _manifests[csv_path] = manifest
+        else:
+            instrumentation.cache_event("columnar", hit=True)
+    return manifest
+
+def _load_manifest(csv_path, stat):
+    manifest = _read_manifest(csv_path)
+    if _is_current(manifest, stat):
+        instrumentation.cache_event("columnar", hit=True)
+        return manifest
+
+    source_hash = file_sha256(csv_path)
+    if manifest is not None and manifest["source_sha256"] == source_hash:
+        manifest["source_size"] = stat.st_size
+        manifest["source_mtime"] = stat.st_mtime
+        _write_manifest(csv_path, manifest)
+        instrumentation.cache_event("columnar", hit=True)
+        return manifest
+    instrumentation.cache_event("columnar", hit=False)
+    with instrumentation.timer("dataset_cache.build_columnar"):
+        return build_columnar(csv_path, source_hash)
+
+# Memory-mapped, read-only column arrays of a CSV (categorical columns as pandas Categoricals
+# built on top of the memory-mapped codes). Nothing is copied into the process.
+def open_columns(csv_path):
+    try:
+        return _open_version(ensure_columnar(csv_path), csv_path)
+    except FileNotFoundError:
+        # The CSV was rebuilt twice while this manifest was held; its version is gone
+        _manifests.pop(csv_path, None)
+        return _open_version(ensure_columnar(csv_path), csv_path)
+
+def _open_version(manifest, csv_path):
+    cache_dir = os.path.join(cache_dir_for(csv_path), manifest["version"])
+    columns = {}
+    for column in manifest["columns"]:
+        values = np.load(os.path.join(cache_dir, column["file"]), mmap_mode="r")
+        if column["kind"] == "categorical":
+            values = pd.Categorical.from_codes(values, categories=column["categories"])
+        columns[column["name"]] = values
+    return columns
+
+# DataFrame view over the memory-mapped columns
+def load_frame(csv_path):
+    return pd.DataFrame(open_columns(csv_path), copy=False)
+
+# Content hash of the CSV behind a columnar cache (used as a cache key elsewhere)
+def dataset_hash(csv_path):
+    return ensure_columnar(csv_path)["source_sha256"]
+
+
+if __name__ == "__main__":
+    # One-time conversion of every CSV in Original_Datasets
+    for filename in sorted(os.listdir("Original_Datasets")):
+        if filename.endswith(".csv"):
+            manifest = ensure_columnar(os.path.join("Original_Datasets", filename))
+            print(f"{filename}: {manifest['rows']} rows, {len(manifest['columns'])} columns")
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Where datasets are looked for, in order: the local folder, the on-disk download cache, GitHub
+LOCAL_DATA_DIR = "Original_Datasets"
+CACHE_DIR = ".dataset_cache"
+REMOTE_BASE_URL = "https://raw.githubusercontent.com/AbBasitMSU/Cosmic-Collision-Predictor/main/Original_Datasets"
+
+# Downloaded copies are trusted for this long before the remote is asked again (with a
+# conditional request, so an unchanged file is not downloaded twice)
+CACHE_LIFETIME = 24 * 60 * 60
+REQUEST_TIMEOUT = (3.05, 30)
+
+
+class DatasetNotFoundError(Exception):
+    pass
+
+
+# Files already present in a local directory
+class LocalDirectoryResolver:
+    def __init__(self, directory=LOCAL_DATA_DIR):
+        self.directory = directory
+
+    def resolve(self, name):
+        path = os.path.join(self.directory, name)
+        return path if os.path.exists(path) else None
+
+
+# Content-addressed download cache: blobs are stored under their SHA-256 and an index maps
+# dataset names to the blob plus the ETag/Last-Modified headers it was downloaded with
+class ContentCache:
+    def __init__(self, directory=CACHE_DIR, lifetime=CACHE_LIFETIME):
+        self.directory = directory
+        self.lifetime = lifetime
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_index(self, index):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, "w") as file:
+            json.dump(index, file, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def blob_path(self, digest, name):
+        return os.path.join(self.directory, "blobs", digest + os.path.splitext(name)[1])
+
+    # Index entry for a dataset whose blob is still on disk (fresh or not)
+    def entry(self, name):
+        entry = self._read_index().get(name)
+        if entry is None or not os.path.exists(self.blob_path(entry["sha256"], name)):
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry["checked_at"] < self.lifetime
+
+    def resolve(self, name):
+        entry = self.entry(name)
+        if entry is not None and self.is_fresh(entry):
+            return self.blob_path(entry["sha256"], name)
+        return None
+
+    # Store downloaded content; identical content is only written once
+    def store(self, name, content, url, etag=None, last_modified=None):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.blob_path(digest, name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp_path, "wb") as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        self._update(name, {
+            "sha256": digest,
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "checked_at": time.time(),
+        })
+        return path
+
+    # The remote answered 304 Not Modified: the cached blob is good for another lifetime
+    def touch(self, name):
+        with self._lock:
+            index = self._read_index()
+            index[name]["checked_at"] = time.time()
+            self._write_index(index)
+
+    def _update(self, name, entry):
+        with self._lock:
+            index = self._read_index()
+            index[name] = entry
+            self._write_index(index)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+# One shared HTTP session so connections to the remote are reused
+def shared_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+
+            _session = requests.Session()
+        return _session
+
+
+# Remote source fetched with a timeout and conditional headers. The result goes into the
+# content cache; if the remote is unreachable a stale cached copy is used instead.
+class RemoteResolver:
+    def __init__(self, cache, base_url=REMOTE_BASE_URL, session=None, timeout=REQUEST_TIMEOUT):
+        self.cache = cache
+        self.base_url = base_url.rstrip("/")
+        self.session = session
+        self.timeout = timeout
+        self.fetch_count = 0
+
+    def resolve(self, name):
+        import requests
+
+        url = f"{self.base_url}/{requests.utils.quote(name)}"
+        entry = self.cache.entry(name)
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        session = self.session or shared_session()
+        try:
+            self.fetch_count += 1
+            response = session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and entry is not None:
+                self.cache.touch(name)
+                return self.cache.blob_path(entry["sha256"], name)
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            if entry is not None:
+                return self.cache.blob_path(entry["sha256"], name)
+            return None
+
+        return self.cache.store(
+            name,
+            response.content,
+            url,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
+
+# Tries each resolver in order and returns the first local path found.
+# Lookups of the same dataset are serialized so concurrent callers share one fetch.
+class DatasetResolver:
+    def __init__(self, resolvers):
+        self.resolvers = resolvers
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock_for(self, name):
+        with self._locks_lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def resolve(self, name):
+        with self._lock_for(name):
+            for resolver in self.resolvers:
+                path = resolver.resolve(name)
+                if path is not None:
+                    return path
+        raise DatasetNotFoundError(f"File not found: {name}")
+
+
+# Local folder, then the download cache, then GitHub
+def build_resolver(local_dir=LOCAL_DATA_DIR, cache_dir=CACHE_DIR, base_url=REMOTE_BASE_URL,
+                   lifetime=CACHE_LIFETIME, session=None, timeout=REQUEST_TIMEOUT):
+    cache = ContentCache(cache_dir, lifetime)
+    return DatasetResolver([
+        LocalDirectoryResolver(local_dir),
+        cache,
+        RemoteResolver(cache, base_url, session, timeout),
+    ])
+
+
+_default_resolver = None
+_resolver_lock = threading.Lock()
+
+def default_resolver():
+    global _default_resolver
+    with _resolver_lock:
+        if _default_resolver is None:
+            _default_resolver = build_resolver()
+        return _default_resolver
@@ -0,0 +1,258 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import dataset_cache
+import ingestion
+import model_registry
+import numpy_runtime
+import preprocessing
+import training
+
+# Test-split scores of each model are saved under <data folder>/.evaluation/, keyed by the model
+# file hash and the dataset (CSV hash plus ingested records); models are only run on a miss
+PREDICTIONS_DIR_NAME = ".evaluation"
+CALIBRATION_BINS = 10
+TARGET_CLASSES = ["Not Hazardous", "Hazardous"]
+
+
+# Models that can be evaluated: the registry's versions (shipped .h5 models and every trained
+# version), as {name: (h5 path, pipeline or None)}
+def available_models(models_dir=training.TRAINED_MODELS_DIR):
+    return model_registry.discover_models(models_dir)
+
+# File hashes already computed by this process, keyed by (path, size, mtime)
+_file_hashes = {}
+
+def model_hash(path):
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime)
+    if key not in _file_hashes:
+        _file_hashes[key] = dataset_cache.file_sha256(path)
+    return _file_hashes[key]
+
+def predictions_path(data_path, data_key, model_key):
+    data_hash, n_ingested = data_key
+    folder = os.path.join(os.path.dirname(data_path), PREDICTIONS_DIR_NAME, f"{data_hash[:16]}-{n_ingested}")
+    return os.path.join(folder, f"{model_key[:16]}.npy")
+
+# Predictions already loaded by this process, keyed by (model hash, dataset key)
+_predictions = {}
+
+# Hazard probability of every held-out row for one model: from memory, then disk, and only
+# otherwise from one batched pass of the model (NumPy runtime) over the test split
+def test_predictions(h5_path, pipeline=None, data_path=preprocessing.CLEANED_ORBITS_PATH):
+    data_key = ingestion.dataset_key(data_path)
+    key = (model_hash(h5_path), data_key)
+    if key in _predictions:
+        return _predictions[key]
+    path = predictions_path(data_path, data_key, key[0])
+    if os.path.exists(path):
+        scores = np.load(path)
+    else:
+        matrix = ingestion.feature_matrix(data_path)
+        pipeline = pipeline or matrix.pipeline
+        X_test = pipeline.scale_features(matrix.raw[matrix.test_rows])
+        scores = numpy_runtime.load_runtime(h5_path).predict_on_batch(X_test).reshape(-1).astype(np.float64)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.save(path + ".tmp.npy", scores)
+        os.replace(path + ".tmp.npy", path)
+    _predictions[key] = scores
+    return scores
+
+# Target and Object Classification of every held-out row
+def test_labels(data_path=preprocessing.CLEANED_ORBITS_PATH):
+    matrix = ingestion.feature_matrix(data_path)
+    n_classes = len(matrix.pipeline.classifications)
+    groups = np.argmax(matrix.raw[matrix.test_rows, :n_classes], axis=1)
+    return np.asarray(matrix.y[matrix.test_rows], dtype=np.int64), groups, matrix.pipeline.classifications
+
+
+# Binary classification metrics of one model, computed from its cached scores. Scores are
+# sorted once, with cumulative true/false positive counts at every distinct threshold: the ROC
+# and PR curves come straight from those counts, and the confusion matrix at any threshold is
+# one binary search, so moving the threshold never touches the model or rescans the rows.
+class Evaluation:
+    def __init__(self, y, scores, groups=None, group_names=None):
+        self.y = np.asarray(y, dtype=np.int64)
+        self.scores = np.asarray(scores, dtype=np.float64)
+        self.groups = np.zeros(len(self.y), dtype=np.int64) if groups is None else np.asarray(groups)
+        self.group_names = list(group_names) if group_names is not None else ["All"]
+        self.n_positive = int(self.y.sum())
+        self.n_negative = len(self.y) - self.n_positive
+
+        order = np.argsort(-self.scores, kind="stable")
+        self._sorted_scores = self.scores[order]
+        self._tp = np.cumsum(self.y[order])
+        self._fp = np.arange(1, len(order) + 1) - self._tp
+        # Last position of each run of equal scores: one point per distinct threshold
+        ends = np.r_[np.flatnonzero(np.diff(self._sorted_scores)), len(order) - 1]
+        self.thresholds = self._sorted_scores[ends]
+        self._curve_tp = self._tp[ends]
+        self._curve_fp = self._fp[ends]
+        self._threshold_free = None
+
+    # TP, FP, FN, TN when every score >= threshold is called hazardous
+    def confusion(self, threshold=0.5):
+        k = int(np.searchsorted(-self._sorted_scores, -threshold, side="right"))
+        tp = int(self._tp[k - 1]) if k else 0
+        fp = k - tp
+        return tp, fp, self.n_positive - tp, self.n_negative - fp
+
+    def confusion_matrix(self, threshold=0.5):
+        tp, fp, fn, tn = self.confusion(threshold)
+        return pd.DataFrame([[tn, fp], [fn, tp]], index=[f"Actual {name}" for name in TARGET_CLASSES],
+                            columns=[f"Predicted {name}" for name in TARGET_CLASSES])
+
+    def roc_curve(self):
+        fpr = np.r_[0.0, self._curve_fp / max(self.n_negative, 1)]
+        tpr = np.r_[0.0, self._curve_tp / max(self.n_positive, 1)]
+        return pd.DataFrame({"False Positive Rate": fpr, "True Positive Rate": tpr, "threshold": np.r_[np.inf, self.thresholds]})
+
+    def pr_curve(self):
+        precision = self._curve_tp / (self._curve_tp + self._curve_fp)
+        recall = self._curve_tp / max(self.n_positive, 1)
+        return pd.DataFrame({"Recall": recall, "Precision": precision, "threshold": self.thresholds})
+
+    def roc_auc(self):
+        roc = self.roc_curve()
+        return float(np.trapezoid(roc["True Positive Rate"], roc["False Positive Rate"]))
+
+    # Average precision: precision at each threshold weighted by the recall it adds
+    def average_precision(self):
+        pr = self.pr_curve()
+        return float(np.sum(np.diff(np.r_[0.0, pr["Recall"]]) * pr["Precision"]))
+
+    # Mean score against observed hazard rate in equal-width score bins, plus the Brier score
+    # and expected calibration error
+    def calibration(self, bins=CALIBRATION_BINS):
+        index = np.minimum((self.scores * bins).astype(np.int64), bins - 1)
+        counts = np.bincount(index, minlength=bins)
+        predicted = np.bincount(index, weights=self.scores, minlength=bins)
+        observed = np.bincount(index, weights=self.y, minlength=bins)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            table = pd.DataFrame({
+                "bin": [f"{i / bins:.1f}-{(i + 1) / bins:.1f}" for i in range(bins)],
+                "rows": counts,
+                "mean_predicted": predicted / counts,
+                "observed_rate": observed / counts,
+            })
+        filled = counts > 0
+        ece = float(np.sum(counts[filled] / len(self.y) * np.abs(predicted[filled] / counts[filled] - observed[filled] / counts[filled])))
+        brier = float(np.mean((self.scores - self.y) ** 2))
+        return table, brier, ece
+
+    # Precision, recall, F1 and support of each target class (as sklearn's classification_report)
+    def class_report(self, threshold=0.5):
+        tp, fp, fn, tn = self.confusion(threshold)
+        rows = []
+        for name, (hits, false_alarms, misses) in zip(TARGET_CLASSES, [(tn, fn, fp), (tp, fp, fn)]):
+            precision = hits / (hits + false_alarms) if hits + false_alarms else 0.0
+            recall = hits / (hits + misses) if hits + misses else 0.0
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+            rows.append({"class": name, "precision": precision, "recall": recall, "f1": f1, "support": hits + misses})
+        return pd.DataFrame(rows)
+
+    # Hazard detection per Object Classification at a threshold (one bincount per count)
+    def group_report(self, threshold=0.5):
+        predicted = self.scores >= threshold
+        n_groups = len(self.group_names)
+        counts = {name: np.bincount(self.groups, weights=mask, minlength=n_groups) for name, mask in [
+            ("tp", predicted & (self.y == 1)), ("fp", predicted & (self.y == 0)), ("fn", ~predicted & (self.y == 1)),
+            ("rows", np.ones(len(self.y), dtype=bool))]}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            precision = counts["tp"] / (counts["tp"] + counts["fp"])
+            recall = counts["tp"] / (counts["tp"] + counts["fn"])
+            accuracy = 1.0 - (counts["fp"] + counts["fn"]) / counts["rows"]
+        return pd.DataFrame({"Object Classification": self.group_names, "rows": counts["rows"].astype(int),
+                             "hazardous": (counts["tp"] + counts["fn"]).astype(int), "accuracy": accuracy,
+                             "precision": precision, "recall": recall})
+
+    # Headline numbers at a threshold (the threshold-free ones are computed once)
+    def summary(self, threshold=0.5):
+        if self._threshold_free is None:
+            _, brier, ece = self.calibration()
+            self._threshold_free = {"roc_auc": self.roc_auc(), "average_precision": self.average_precision(), "brier": brier, "ece": ece}
+        tp, fp, fn, tn = self.confusion(threshold)
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        return {
+            "accuracy": (tp + tn) / len(self.y),
+            "precision": precision,
+            "recall": recall,
+            "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+            **self._threshold_free,
+        }
+
+
+# Evaluation of every available model on the held-out split (models run only on a cache miss)
+def evaluate_models(data_path=preprocessing.CLEANED_ORBITS_PATH, models=None):
+    y, groups, group_names = test_labels(data_path)
+    evaluations = {}
+    for name, (h5_path, pipeline) in (models or available_models()).items():
+        evaluations[name] = Evaluation(y, test_predictions(h5_path, pipeline, data_path), groups, group_names)
+    return evaluations
+
+# Metrics of every model side by side at one threshold
+def compare(evaluations, threshold=0.5):
+    return pd.DataFrame({name: evaluation.summary(threshold) for name, evaluation in evaluations.items()}).T
+
+
+# Time of a cold evaluation (model passes), a warm one (cached scores from disk and from memory)
+# and a threshold switch, against recomputing the same metrics with scikit-learn at every switch
+def benchmark(thresholds=np.linspace(0.05, 0.95, 19)):
+    from sklearn import metrics
+
+    results = []
+
+    def timed(case, function, n=1):
+        started = time.perf_counter()
+        for _ in range(n):
+            value = function()
+        results.append({"case": case, "ms": (time.perf_counter() - started) / n * 1000.0})
+        return value
+
+    models = available_models()
+    data_key = ingestion.dataset_key(preprocessing.CLEANED_ORBITS_PATH)
+    for h5_path, _ in models.values():
+        path = predictions_path(preprocessing.CLEANED_ORBITS_PATH, data_key, model_hash(h5_path))
+        if os.path.exists(path):
+            os.remove(path)
+    _predictions.clear()
+    evaluations = timed("evaluate (model passes)", lambda: evaluate_models(models=models))
+    _predictions.clear()
+    timed("evaluate (scores from disk)", lambda: evaluate_models(models=models))
+    timed("evaluate (scores in memory)", lambda: evaluate_models(models=models))
+
+    evaluation = next(iter(evaluations.values()))
+    timed("threshold switch (cached curves)", lambda: [(evaluation.summary(t), evaluation.class_report(t), evaluation.group_report(t))
+                                                       for t in thresholds], n=3)
+
+    def sklearn_switch():
+        for t in thresholds:
+            predicted = evaluation.scores >= t
+            metrics.confusion_matrix(evaluation.y, predicted)
+            metrics.classification_report(evaluation.y, predicted, zero_division=0, output_dict=True)
+            metrics.roc_auc_score(evaluation.y, evaluation.scores)
+            metrics.average_precision_score(evaluation.y, evaluation.scores)
+            metrics.brier_score_loss(evaluation.y, evaluation.scores)
+
+    timed("threshold switch (scikit-learn)", sklearn_switch, n=3)
+    report = pd.DataFrame(results)
+    report.loc[report["case"].str.startswith("threshold"), "case"] += f" x{len(thresholds)}"
+    return report
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["benchmark"]:
+        print(benchmark().to_string(index=False, float_format="%.2f"))
+    else:
+        evaluations = evaluate_models()
+        print(compare(evaluations).to_string(float_format="%.4f"))
+        for name, evaluation in evaluations.items():
+            print(f"\n{name}")
+            print(evaluation.confusion_matrix().to_string())
+            print(evaluation.class_report().to_string(index=False, float_format="%.4f"))
@@ -1,20 +1,23 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import tensorflow as tf
-import hashlib
-import json
-import random
 from datetime import datetime
 import os
-import h5py
-import requests
-import plotly.express as px
-import seaborn as sns
-import matplotlib.pyplot as plt
-import time
-
-# File to store user credentials
+import prediction_engine
+import model_registry
+import preprocessing
+import dataset_resolver
+import analysis_artifacts
+import training
+import evaluation
+import credential_store
+import app_startup
+import collision_calendar
+import impact_footprint
+import ingestion
+import instrumentation
+
+# Legacy credentials file (imported into the credential store on first use)
 CREDENTIALS_FILE = "Users.json"
 
 # Background Image Function
@@ -43,21 +46,10 @@ def set_background(image_url):
         unsafe_allow_html=True
     )
 
-# Password hashing function
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-# Load and save credentials
-def load_credentials():
-    try:
-        with open(CREDENTIALS_FILE, "r") as file:
-            return json.load(file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
-    
-def save_credentials(credentials):
-    with open(CREDENTIALS_FILE, "w") as file:
-        json.dump(credentials, file)
+# Credential store (SQLite, indexed by username); existing Users.json entries are imported once
+@st.cache_resource
+def load_credential_store():
+    return credential_store.get_store(legacy_path=CREDENTIALS_FILE)
 
 # Login functionality
 def login():
@@ -66,10 +58,7 @@ def login():
     password = st.text_input("Password", type="password")
 
     if st.button("Log In"):
-        credentials = load_credentials()
-        hashed_password = hash_password(password)
-
-        if username in credentials and credentials[username] == hashed_password:
+        if load_credential_store().verify(username, password):
             st.success(f"Welcome, {username}!")
             st.session_state["logged_in"] = True
             st.session_state["username"] = username
@@ -87,46 +76,189 @@ def signup():
         if password != confirm_password:
             st.error("Passwords do not match.")
         else:
-            credentials = load_credentials()
-            if username in credentials:
+            if not load_credential_store().create_user(username, password):
                 st.error("Username already exists.")
             else:
-                credentials[username] = hash_password(password)
-                save_credentials(credentials)
                 st.success("Sign up successful! You can now log in.")
 
-# Function to Load CSV Data
-@st.cache_data
-def load_csv_data(filename):
-    # Attempt to load from the local folder
-    file_path = os.path.join("Original_Datasets", filename)
-    if os.path.exists(file_path):
-        return pd.read_csv(file_path)
-    
-    # If the local file does not exist, try loading from GitHub
-    github_url = f"https://raw.githubusercontent.com/AbBasitMSU/Cosmic-Collision-Predictor/main/Original_Datasets/{filename}"
+# Function to Locate a Dataset File
+def dataset_path(filename):
+    # Resolve the file offline-first: local folder, then the download cache, then GitHub (fetched once)
     try:
-        response = requests.get(github_url)
-        response.raise_for_status()  # Check if the request was successful
-        return pd.read_csv(github_url)
-    except requests.exceptions.RequestException as e:
+        return dataset_resolver.default_resolver().resolve(filename)
+    except dataset_resolver.DatasetNotFoundError:
         st.error(f"File not found: {filename}. Please ensure that the file exists locally or on GitHub.")
+        return None
+
+# Function to Load CSV Data (not cached here: the ingestion store keeps the current
+# snapshot, so ingested records show up on the next rerun)
+@instrumentation.timed("app.load_csv_data")
+def load_csv_data(filename):
+    file_path = dataset_path(filename)
+    if file_path is None:
         return pd.DataFrame()  # Return an empty DataFrame if the file is not found
+    # Memory-mapped columnar copy, rebuilt when the CSV changes, plus the ingested records
+    return ingestion.load_frame(file_path)
+
+# Function to Load Model: the live version (or `version`) from the process-wide model registry,
+# with its model and pipeline shared by every session instead of being copied into each one
+def load_model(version=None):
+    registry = model_registry.get_registry()
+    try:
+        return registry.get(version) if version else registry.live()
+    except (OSError, KeyError) as e:
+        st.error(f"Model could not be loaded: {e}. Ensure the file exists in 'h5_Files'.")
+        st.stop()
 
-# Random Location Generator
-def generate_random_location():
-    latitude = round(random.uniform(-90, 90), 6)
-    longitude = round(random.uniform(-180, 180), 6)
-    return latitude, longitude
+# Function to Load the Prediction Engine (model and feature pipeline are loaded once per process)
+@st.cache_resource
+@instrumentation.timed("app.load_prediction_engine")
+def load_prediction_engine():
+    load_model()  # the engine serves the registry's live version
+    return prediction_engine.get_engine()
 
-# Function to Load Model
+# Function to Load the default values for the prediction form
 @st.cache_data
-def load_model():
-    model_path = os.path.join("h5_Files", "Asteroid_Impact_Model.h5")
-    if not os.path.exists(model_path):
-        st.error(f"Model file not found at {model_path}. Ensure the file exists in 'h5_Files'.")
+def load_feature_defaults():
+    return preprocessing.feature_defaults()
+
+# New Asteroid Prediction Section
+def predict_collision_section():
+    st.subheader("Enter New Asteroid Details")
+    defaults = load_feature_defaults()
+    record = {}
+    record["Object Classification"] = st.selectbox(
+        "Object Classification",
+        preprocessing.CLASSIFICATIONS,
+        index=preprocessing.CLASSIFICATIONS.index(defaults["Object Classification"]),
+    )
+    for column in preprocessing.NUMERIC_COLUMNS:
+        record[column] = st.number_input(column, value=float(defaults[column]))
+
+    if st.button("Predict Collision"):
+        engine = load_prediction_engine()
+        with instrumentation.timer("app.predict_collision"):
+            probability = float(engine.predict(engine.pipeline.record_features(record))[0])
+        if probability >= 0.5:
+            # Date, likely impact latitudes and damage radii follow from the entered orbit and magnitude
+            with instrumentation.timer("app.impact_footprint"):
+                footprint, geometry, encounter = impact_footprint.record_footprint(record, datetime.now().date())
+                layer = impact_footprint.MapLayer.for_geometry(geometry, "impact")
+                raster, lats, lons = impact_footprint.get_tile_cache().global_map(layer, zoom=1)
+                south, north = impact_footprint.latitude_band(raster, lats)
+            st.write("**Possible Collision Detected!**")
+            st.write(f"Hazard Probability: {probability:.1%}")
+            st.write(f"Date: {encounter} (next crossing of Earth's orbit)")
+            st.write(f"Location: half of the possible impact points lie between latitudes {south:.0f}° and {north:.0f}° (any longitude, as the time of day is unknown)")
+            st.image(impact_footprint.render_raster(raster, lats, lons), caption="Impact point probability (darker is more likely)")
+            crater = "airburst, no crater" if footprint["Airburst"] else f"crater radius {footprint['Crater Radius (km)']:.2f} km"
+            st.write(
+                f"Impact Area: {footprint['Energy (Mt TNT)']:.3g} Mt TNT at {footprint['Impact Velocity (km/s)']:.1f} km/s ({crater}); "
+                f"severe blast damage within {footprint['Severe Blast Damage (20 psi) Radius (km)']:.1f} km, "
+                f"moderate within {footprint['Moderate Blast Damage (5 psi) Radius (km)']:.1f} km, "
+                f"broken windows within {footprint['Window Breakage (1 psi) Radius (km)']:.1f} km"
+            )
+            st.subheader("Precautions")
+            st.write("1. Stay indoors and away from windows.\n2. Stock up on food, water, and essentials.\n3. Follow local government advisories.")
+        else:
+            st.write(f"No significant collision risk detected based on the provided parameters (hazard probability {probability:.1%}).")
+
+# Function to Load the paged view of a dataset (sort permutations and summary stats are built
+# once per snapshot, and extended rather than rebuilt when records are ingested)
+@instrumentation.timed("app.load_data_view")
+def load_data_view(filename):
+    return ingestion.data_view(dataset_path(filename))
+
+# Function to Load the Collision Calendar (interval index over the impacts.csv risk windows and
+# any ingested impact records, built once per snapshot)
+@instrumentation.timed("app.load_collision_calendar")
+def load_collision_calendar():
+    file_path = dataset_path("impacts.csv")
+    if file_path is None:
+        st.stop()
+    return ingestion.load_calendar(file_path)
+
+# Function to Load the impact footprints of impacts.csv (energy and damage radii of every object,
+# built once per snapshot; the map tiles drawn from them share one LRU cache)
+@instrumentation.timed("app.load_footprint_maps")
+def load_footprint_maps():
+    file_path = dataset_path("impacts.csv")
+    if file_path is None:
         st.stop()
-    return tf.keras.models.load_model(model_path)
+    return impact_footprint.load_maps(file_path)
+
+# Global Risk Map: expected share of each area within the chosen damage radius of an impact by the
+# objects at risk in the selected year
+def risk_map_section(selected_date):
+    footprint_maps = load_footprint_maps()
+    level = st.selectbox(
+        "Damage Level",
+        list(impact_footprint.DAMAGE_LEVELS) + ["crater"],
+        index=1,
+        format_func=lambda level: impact_footprint.DAMAGE_LEVELS[level][0] if level in impact_footprint.DAMAGE_LEVELS else "Crater",
+    )
+    first_day, last_day = selected_date.replace(month=1, day=1), selected_date.replace(month=12, day=31)
+    with instrumentation.timer("app.figure.risk_map"):
+        layer = footprint_maps.catalog_layer("damage", level, first_day, last_day)
+        raster, lats, lons = footprint_maps.global_map(layer, zoom=1)
+    if raster.max() <= 0:
+        st.write(f"No damage footprint from the objects at risk in {selected_date.year}.")
+        return
+    st.image(
+        impact_footprint.render_raster(raster, lats, lons),
+        caption=f"Expected share of each area affected in {selected_date.year} (peak {raster.max():.2g}, 30° grid)",
+    )
+
+# Month Heat Map: one cell per day, shaded by the number of risk windows open that day
+def collision_heatmap(risk_calendar, selected_date):
+    heatmap = risk_calendar.month_heatmap(selected_date.year, selected_date.month)
+    most = max(int(heatmap["windows"].max()), 1)
+    cells = ["<td></td>"] * heatmap["date"].iloc[0].weekday()
+    for day, windows in zip(heatmap["date"], heatmap["windows"]):
+        alpha = 0.15 + 0.85 * windows / most if windows else 0.0
+        border = "2px solid black" if day == selected_date else "1px solid #ddd"
+        cells.append(
+            f"<td title='{windows} risk windows' style='background-color:rgba(220,20,60,{alpha:.2f}); border:{border};"
+            f" text-align:center; padding:4px;'>{day.day}<br><small>{windows}</small></td>"
+        )
+    rows = ["<tr>" + "".join(cells[start:start + 7]) + "</tr>" for start in range(0, len(cells), 7)]
+    header = "".join(f"<th>{name}</th>" for name in ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"])
+    st.markdown(
+        f"<b>{selected_date:%B %Y}</b><table style='width:100%;'><tr>{header}</tr>{''.join(rows)}</table>",
+        unsafe_allow_html=True,
+    )
+
+# Paged Data Table: sorting and filtering run on the server and only the visible page is sent to the browser
+def paged_data_section(filename):
+    df = load_csv_data(filename)
+    if df.empty:
+        st.error("No data available to display.")
+        return
+    view = load_data_view(filename)
+    st.write(f"**{view.n_rows} rows, {len(df.columns)} columns**")
+    with st.expander("Summary Statistics"):
+        st.dataframe(view.summary)
+
+    sort_by = st.selectbox("Sort By", ["(none)"] + list(df.columns), key=f"{filename}_sort")
+    ascending = st.checkbox("Ascending", value=True, key=f"{filename}_ascending")
+    filter_column = st.selectbox("Filter Column", ["(none)"] + view.numeric_columns, key=f"{filename}_filter")
+    filters = None
+    if filter_column != "(none)":
+        low = st.number_input("Minimum", value=float(view.summary.loc[filter_column, "min"]), key=f"{filename}_{filter_column}_min")
+        high = st.number_input("Maximum", value=float(view.summary.loc[filter_column, "max"]), key=f"{filename}_{filter_column}_max")
+        filters = {filter_column: (low, high)}
+    page_size = st.selectbox("Rows per Page", [25, 50, 100, 250], key=f"{filename}_page_size")
+
+    options = {"sort_by": None if sort_by == "(none)" else sort_by, "ascending": ascending, "filters": filters}
+    page_count = view.page_count(page_size, **options)
+    # The page number starts over whenever the sort, filter or page size changes
+    page = st.number_input(f"Page (1-{page_count})", min_value=1, max_value=page_count, value=1, step=1,
+                           key=f"{filename}_page_{options}_{page_size}")
+    with instrumentation.timer("app.render_page"):
+        page_df, total = view.page(page, page_size, **options)
+        st.dataframe(page_df)
+    first_row = (page - 1) * page_size + 1 if total else 0
+    st.caption(f"Showing rows {first_row}-{first_row + len(page_df) - 1 if total else 0} of {total}")
 
 # Public User Section
 def public_user_section():
@@ -200,27 +332,33 @@ def public_user_section():
     else:
         st.header("Future Collisions Calendar")
 
-        # Define collision prediction dates
-        collision_dates = [datetime(2024, 12, 10).date(), datetime(2024, 12, 15).date()]  # Add more collision dates as needed
+        # Impact risk windows from impacts.csv, indexed by date
+        risk_calendar = load_collision_calendar()
 
         # Dropdown Calendar
-        selected_date = st.date_input("Choose a Date")
-
-        # Display collision dates
-        st.write("**Collision Prediction Dates:**")
-        for date in collision_dates:
-            st.markdown(f"<span style='color:red; font-weight:bold;'>{date}</span>", unsafe_allow_html=True)
-
-        # Check if the selected date is a collision date
-        if selected_date in collision_dates:
+        today = datetime.now().date()
+        selected_date = st.date_input(
+            "Choose a Date",
+            value=min(max(today, risk_calendar.first_day), risk_calendar.last_day),
+            min_value=risk_calendar.first_day,
+            max_value=risk_calendar.last_day,
+        )
+
+        # Risk windows open on each day of the selected month
+        collision_heatmap(risk_calendar, selected_date)
+
+        # Objects whose risk window covers the selected date, most probable first
+        at_risk_ids = risk_calendar.ranked(selected_date, limit=10)
+        at_risk = risk_calendar.windows(at_risk_ids)
+        if len(at_risk):
+            top = at_risk.iloc[0]
             st.markdown(
                 f"""
                 <div style='background-color:#ffcccc; padding:10px; border-radius:5px;'>
                     <h4 style='color:red;'>**Collision Alert!**</h4>
                     <p><b>Date:</b> {selected_date}</p>
-                    <p><b>Location:</b> Latitude 23.5, Longitude 78.9</p>
-                    <p><b>Impact Time:</b> 14:30 UTC</p>
-                    <p><b>Impact Area:</b> 100 km radius</p>
+                    <p><b>Objects at risk:</b> {risk_calendar.count(selected_date)}</p>
+                    <p><b>Highest risk:</b> {top['Object Name']} (cumulative impact probability {top[collision_calendar.PROBABILITY_COLUMN]:.2g}, {top['Period Start']}-{top['Period End']})</p>
                     <h4 style='color:darkred;'>Precautions:</h4>
                     <ol>
                         <li>Stay indoors and away from windows.</li>
@@ -231,6 +369,9 @@ def public_user_section():
                 """,
                 unsafe_allow_html=True,
             )
+            # Impact energy and damage radii of the listed objects
+            footprints = load_footprint_maps().model.summary(at_risk_ids)
+            st.dataframe(at_risk.join(footprints), hide_index=True)
         else:
             st.markdown(
                 f"""
@@ -240,25 +381,153 @@ def public_user_section():
                 """,
                 unsafe_allow_html=True,
             )
+
+        st.subheader("Global Risk Map")
+        risk_map_section(selected_date)
         
-        st.subheader("Enter New Asteroid Details")
-        velocity = st.number_input("Velocity (km/s)", min_value=0.0, value=0.0, step=1.0)
-        distance = st.number_input("Distance from Earth (AU)", min_value=0.0, value=0.0, step=1.0)
-        angle = st.number_input("Angle (degrees)", min_value=0.0, value=0.0, step=1.0)
-        size = st.number_input("Size (km)", min_value=0.0, value=0.0, step=1.0)
-
-        if st.button("Predict Collision"):
-            if velocity > 1.0 and distance < 2000.0 and angle < 70.0 and size > 01.0:
-                latitude, longitude = generate_random_location()
-                possible_date = datetime(2024, 12, random.randint(1, 28)).date()
-                st.write("**Possible Collision Detected!**")
-                st.write(f"Date: {possible_date}")
-                st.write(f"Location: Latitude {latitude}, Longitude {longitude}")
-                st.write("Impact Area: High Risk")
-                st.subheader("Precautions")
-                st.write("1. Stay indoors and away from windows.\n2. Stock up on food, water, and essentials.\n3. Follow local government advisories.")
-            else:
-                st.write("No significant collision risk detected based on the provided parameters.")
+        predict_collision_section()
+
+# Live progress of the background training job (refreshed every second while it runs)
+@st.fragment(run_every=1.0)
+def training_progress_section(job):
+    if job.is_running():
+        if job.resumed_from:
+            st.write(f"Training model (resumed from epoch {job.resumed_from})...")
+        else:
+            st.write("Training model started...")
+        st.progress(job.epoch / job.epochs, text=f"Epoch {job.epoch}/{job.epochs}")
+        if job.history:
+            logs = job.history[-1]
+            st.text(f"loss {logs['loss']:.4f} - accuracy {logs['accuracy']:.4f} - val_loss {logs['val_loss']:.4f} - val_accuracy {logs['val_accuracy']:.4f}")
+    else:
+        # Training ended: rerun the whole page so the results replace the progress view
+        st.rerun(scope="app")
+
+# Training Status and Results Section
+def training_section():
+    job = training.current_job()
+    if job is None:
+        return
+    if job.is_running():
+        training_progress_section(job)
+    elif job.status == "finished":
+        st.write("Model Training Completed!")
+        st.write(f"Result: saved as {training.version_dir(job.version)}")
+        col1, col2 = st.columns(2)
+        col1.metric("Test Accuracy", f"{job.metrics['test_accuracy']:.2%}")
+        col2.metric("Epochs", job.metrics["epochs_run"])
+        history_df = pd.DataFrame(job.history, index=range(1, len(job.history) + 1))
+        st.line_chart(history_df[["loss", "val_loss"]])
+        st.line_chart(history_df[["accuracy", "val_accuracy"]])
+    elif job.status == "failed":
+        st.error(f"Model training failed: {job.error}")
+
+# Ingest New Records Section: validated batches are appended in chunks and each chunk is
+# visible in the tables, index, calendar and features as soon as it is written
+def ingest_section():
+    st.sidebar.header("Ingest New Records")
+    dataset = st.sidebar.selectbox("Dataset", list(ingestion.DATASETS), key="ingest_dataset")
+    uploaded_file = st.sidebar.file_uploader("CSV or JSON Lines batch", type=["csv", "jsonl", "json"], key="ingest_file")
+    if uploaded_file is not None and st.sidebar.button("Ingest Records"):
+        store = ingestion.get_store(dataset, os.path.dirname(dataset_path(ingestion.DATASETS[dataset]["raw"])))
+        progress_placeholder = st.empty()
+        try:
+            reports, rejected = store.ingest(uploaded_file, on_chunk=lambda report: progress_placeholder.text(
+                f"Chunk {report['chunk'] + 1}: {report['accepted']} accepted, {report['rejected']} rejected"))
+        except ingestion.IngestError as error:
+            st.error(str(error))
+            return
+        progress_placeholder.empty()
+        st.success(f"Ingested {reports['accepted'].sum()} of {reports['rows'].sum()} {dataset} records")
+        if len(rejected):
+            st.warning(f"{len(rejected)} rows were rejected")
+            st.dataframe(rejected, hide_index=True)
+
+# Diagnostics Panel: stage timings, cache hit rates and memory of this app process, with a JSON export
+def diagnostics_section():
+    st.sidebar.header("Diagnostics")
+    tracker = instrumentation.get_instrumentation()
+    tracker.set_profiling(st.sidebar.checkbox("Profile Instrumented Stages", value=tracker.profiling))
+    if not st.sidebar.checkbox("Show Diagnostics"):
+        return
+    st.subheader("Diagnostics")
+    snapshot = tracker.snapshot()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Memory (RSS)", f"{snapshot['memory']['rss_mb']:.0f} MB")
+    col2.metric("Peak Memory", f"{snapshot['memory']['peak_rss_mb']:.0f} MB")
+    col3.metric("Instrumented Stages", len(snapshot["stages"]))
+    st.write("**Stage Timings**")
+    st.dataframe(pd.DataFrame.from_dict(snapshot["stages"], orient="index"))
+    st.write("**Caches**")
+    st.dataframe(pd.DataFrame.from_dict(snapshot["caches"], orient="index"))
+    for stage, report in snapshot["profiles"].items():
+        with st.expander(f"Profile: {stage}"):
+            st.text(report)
+    col1, col2 = st.columns(2)
+    col1.download_button("Export Diagnostics (JSON)", tracker.to_json(), file_name="diagnostics.json", mime="application/json")
+    if col2.button("Reset Diagnostics"):
+        tracker.reset()
+        st.rerun()
+
+# Model Registry Section: activate another version (loaded and warmed up in the background, then
+# swapped in while predictions keep being served) and shadow-score a candidate against the live one
+def model_registry_section():
+    st.sidebar.header("Model Registry")
+    registry = model_registry.get_registry()
+    live = load_model()
+    versions = registry.versions()
+    selected = st.sidebar.selectbox("Model Version", versions, index=versions.index(live.name))
+    if selected != live.name and st.sidebar.button("Activate Version"):
+        registry.activate(selected)
+        st.sidebar.info(f"Loading {selected} in the background; it goes live once warmed up.")
+    shadow = registry.shadow_report()
+    candidates = ["None"] + [name for name in versions if name != live.name]
+    current = shadow["candidate"] if shadow and shadow["candidate"] in candidates else "None"
+    candidate = st.sidebar.selectbox("Shadow Candidate", candidates, index=candidates.index(current))
+    if candidate != current:
+        registry.stop_shadow()
+        if candidate != "None":
+            registry.start_shadow(load_model(candidate).name)
+        shadow = registry.shadow_report()
+    if not st.sidebar.checkbox("Show Model Registry"):
+        return
+    st.subheader("Model Registry")
+    st.write(f"Live version: **{live.name}**")
+    st.dataframe(registry.report(), hide_index=True)
+    if shadow:
+        st.write(f"**Shadow Scoring: {shadow['candidate']} vs {live.name}**")
+        st.dataframe(pd.DataFrame([shadow]), hide_index=True)
+
+# Model Evaluation Section: every model is scored once on the held-out split (scores are cached per
+# model and dataset hash); moving the threshold only recomputes the metrics from those scores
+def evaluation_section():
+    st.subheader("Model Evaluation")
+    with instrumentation.timer("app.evaluate_models"):
+        evaluations = evaluation.evaluate_models()
+    threshold = st.slider("Hazard Threshold", min_value=0.01, max_value=0.99, value=0.5, step=0.01, key="evaluation_threshold")
+    first = next(iter(evaluations.values()))
+    st.write(f"Held-out split of cleaned_Asteroid_orbit.csv: {len(first.y)} rows, {first.n_positive} hazardous")
+    st.dataframe(evaluation.compare(evaluations, threshold))
+
+    model_name = st.selectbox("Model", list(evaluations), key="evaluation_model")
+    selected = evaluations[model_name]
+    col1, col2 = st.columns(2)
+    col1.write("**Confusion Matrix**")
+    col1.dataframe(selected.confusion_matrix(threshold))
+    col2.write("**Per-Class Metrics**")
+    col2.dataframe(selected.class_report(threshold), hide_index=True)
+    col1.write("**ROC Curve**")
+    col1.line_chart(selected.roc_curve(), x="False Positive Rate", y="True Positive Rate")
+    col2.write("**Precision-Recall Curve**")
+    col2.line_chart(selected.pr_curve(), x="Recall", y="Precision")
+    calibration_table, brier, ece = selected.calibration()
+    st.write(f"**Calibration** (Brier score {brier:.4f}, expected calibration error {ece:.4f})")
+    st.dataframe(calibration_table, hide_index=True)
+    st.write("**By Object Classification**")
+    st.dataframe(selected.group_report(threshold), hide_index=True)
+    if st.button("Close Evaluation"):
+        st.session_state["show_evaluation"] = False
+        st.rerun()
 
 # Official User Section
 def official_user_section():
@@ -267,61 +536,21 @@ def official_user_section():
         st.sidebar.subheader("Train Models")
         
         if st.sidebar.button("Train Impact Prediction Model"):
-            # Create a placeholder for the entire training status
-            status_placeholder = st.empty()
-        
-            # Display initial status
-            status_placeholder.write("Training model started...")
-        
-            # Placeholder for updating epoch progress
-            epoch_placeholder = st.empty()
-        
-            # Simulate training with 100 epochs (replace this with actual training logic)
-            for epoch in range(1, 21):  # Loop from 1 to 20 (inclusive)
-                time.sleep(0.6)  # Simulate a short delay (adjust time as needed)
-                epoch_placeholder.text(f"Epoch {epoch}/20...")
-        
-            # After all epochs are complete, clear the epoch placeholder and update the status placeholder
-            epoch_placeholder.empty()  # Remove the epoch progress text
-            status_placeholder.write("Model Training Completed!")
-        
-            # Show the final result text and display the result image
-            st.write("Result:")
-            github_image_url = "https://raw.githubusercontent.com/AbBasitMSU/Cosmic-Collision-Predictor/main/Result Images/Accuracy of NN Model.jpg"
-            st.image(github_image_url, caption="Impact Model Training Result", use_column_width=True)
+            # Train in a background thread (resuming from the last checkpoint of an interrupted run)
+            training.start_training()
+        training_section()
+        ingest_section()
+        diagnostics_section()
+        model_registry_section()
         
         # Model Evaluation Section
         st.sidebar.header("Model Evaluation and Documentation")
     
         if st.sidebar.button("Evaluate Existing Models"):
-            # Placeholder for model evaluation status
-            evaluation_status_placeholder = st.empty()
-            
-            # Display initial status
-            evaluation_status_placeholder.write("Evaluating model...")
-        
-            # Placeholder for updating evaluation progress
-            evaluation_progress_placeholder = st.empty()
-        
-            # Simulate evaluation (e.g., looping through evaluation phases)
-            for phase in range(1, 6):  # Assuming 5 phases of evaluation
-                time.sleep(0.5)  # Simulate delay (adjust as needed)
-                evaluation_progress_placeholder.text(f"Evaluation phase {phase}/5...")
-        
-            # After all phases are complete, clear the progress and update status
-            evaluation_progress_placeholder.empty()  # Clear the evaluation progress text
-            evaluation_status_placeholder.write("Model Evaluation Completed!")
-        
-            # Show the result text and display two images from GitHub
-            st.write("Results:")
-        
-            # URL of images stored in the GitHub repository
-            image_1_url = "https://raw.githubusercontent.com/AbBasitMSU/Cosmic-Collision-Predictor/main/Result Images/IMG_0228.png"
-            image_2_url = "https://raw.githubusercontent.com/AbBasitMSU/Cosmic-Collision-Predictor/main/Result Images/IMG_0229.png"
-        
-            # Display the images with captions
-            st.image(image_1_url, caption="Evaluation Result - 1", use_column_width=True)
-            st.image(image_2_url, caption="Evaluation Result - 2", use_column_width=True)
+            # Stays open across reruns, so the threshold can be moved without pressing the button again
+            st.session_state["show_evaluation"] = True
+        if st.session_state.get("show_evaluation"):
+            evaluation_section()
             
         st.sidebar.header("Check Documentation")
         if st.sidebar.button("View Documentation"):
@@ -435,87 +664,59 @@ def official_user_section():
         data_choice = st.selectbox("Choose Data to View", ["Raw Orbit Data", "Cleaned Asteroid Data", "Raw Impact Data"])
         
         if data_choice == "Cleaned Asteroid Data":
-            df = load_csv_data("cleaned_Asteroid_orbit.csv")
-            if not df.empty:
-                st.write(df)
-            else:
-                st.error("No data available to display.")
+            paged_data_section("cleaned_Asteroid_orbit.csv")
         elif data_choice == "Raw Orbit Data":
-            df = load_csv_data("orbits.csv")
-            if not df.empty:
-                st.write(df)
-            else:
-                st.error("No data available to display.")
+            paged_data_section("orbits.csv")
         elif data_choice == "Raw Impact Data":
-            df = load_csv_data("impacts.csv")
-            if not df.empty:
-                st.write(df)
-            else:
-                st.error("No data available to display.")
+            paged_data_section("impacts.csv")
         
         st.subheader("Detailed Analysis")
         analysis_choice = st.selectbox("Choose Analysis", ["Impact Analysis", "Orbits Analysis", "Orbits vs Impacts Analysis"])
             
-        # Analysis based on selected choice
+        # Analysis based on selected choice (figures are drawn from small precomputed artifacts,
+        # cached per dataset hash, instead of the raw frames). Plotting libraries are imported
+        # when a chart is first drawn, not at app start (see app_startup.py).
         if analysis_choice == "Impact Analysis":
+            import matplotlib.pyplot as plt
             st.write("Performing Impact Analysis...")
             # Simple Analysis Example - Histogram
-            impacts_df = load_csv_data("impacts.csv")
-            if not impacts_df.empty:
-                fig, ax = plt.subplots()
-                sns.histplot(impacts_df['Asteroid Magnitude'], ax=ax, bins=20, kde=True)
-                ax.set_title("Asteroid Magnitude Distribution")
-                ax.set_xlabel("Asteroid Magnitude")
-                st.pyplot(fig)
+            impacts_path = dataset_path("impacts.csv")
+            if impacts_path is not None:
+                with instrumentation.timer("app.figure.impact_analysis"):
+                    histogram = analysis_artifacts.magnitude_histogram(impacts_path, bins=20)
+                    fig, ax = plt.subplots()
+                    ax.stairs(histogram["counts"], histogram["edges"], fill=True, alpha=0.5)
+                    ax.plot(histogram["kde_x"], histogram["kde_y"])
+                    ax.set_title("Asteroid Magnitude Distribution")
+                    ax.set_xlabel("Asteroid Magnitude")
+                    ax.set_ylabel("Count")
+                    st.pyplot(fig)
         
         elif analysis_choice == "Orbits Analysis":
+            import plotly.express as px
             st.write("Performing Orbits Analysis...")
-            # Scatter Plot Example
-            orbits_df = load_csv_data("orbits.csv")
-            if not orbits_df.empty:
-                fig = px.scatter(orbits_df, x='Orbit Eccentricity', y='Orbit Inclination (deg)', color='Object Classification',
-                                    title="Orbit Eccentricity vs Inclination")
-                st.plotly_chart(fig)
+            # Scatter Plot Example - binned density, one marker per occupied bin
+            orbits_path = dataset_path("orbits.csv")
+            if orbits_path is not None:
+                with instrumentation.timer("app.figure.orbits_analysis"):
+                    bins_df = analysis_artifacts.eccentricity_inclination_bins(orbits_path)
+                    fig = px.scatter(bins_df, x='Orbit Eccentricity', y='Orbit Inclination (deg)', color='Object Classification',
+                                        size='Objects', title="Orbit Eccentricity vs Inclination")
+                    st.plotly_chart(fig)
         
         elif analysis_choice == "Orbits vs Impacts Analysis":
+            import plotly.express as px
             st.write("Performing Orbits vs Impacts Analysis...")
             # Combined Analysis Example
-            orbits_df = load_csv_data("orbits.csv")
-            impacts_df = load_csv_data("impacts.csv")
-            if not orbits_df.empty and not impacts_df.empty:
-                comparison_df = pd.DataFrame({
-                    'Orbit Eccentricity': orbits_df['Orbit Eccentricity'].mean(),
-                    'Orbit Inclination (deg)': orbits_df['Orbit Inclination (deg)'].mean(),
-                    'Asteroid Magnitude': impacts_df['Asteroid Magnitude'].mean()
-                }, index=[0])
-                fig = px.bar(comparison_df, barmode='group', title="Orbits vs Impacts Data Comparison")
-                st.plotly_chart(fig)
+            orbits_path = dataset_path("orbits.csv")
+            impacts_path = dataset_path("impacts.csv")
+            if orbits_path is not None and impacts_path is not None:
+                with instrumentation.timer("app.figure.orbits_vs_impacts"):
+                    comparison_df = analysis_artifacts.orbits_vs_impacts_means(orbits_path, impacts_path)
+                    fig = px.bar(comparison_df, barmode='group', title="Orbits vs Impacts Data Comparison")
+                    st.plotly_chart(fig)
         
-        st.subheader("Enter New Asteroid Details")
-        velocity = st.number_input("Velocity (km/s)", min_value=0.0, value=0.0, step=1.0)
-        distance = st.number_input("Distance from Earth (AU)", min_value=0.0, value=0.0, step=1.0)
-        angle = st.number_input("Angle (degrees)", min_value=0.0, value=0.0, step=1.0)
-        size = st.number_input("Size (km)", min_value=0.0, value=0.0, step=1.0)
-        
-        if st.button("Predict Collision"):
-            if velocity > 1.0 and distance < 2000.0 and angle < 70.0 and size > 1.0:
-                    latitude, longitude = generate_random_location()
-                    possible_date = datetime(2024, 12, random.randint(1, 28)).date()
-                    st.write("**Possible Collision Detected!**")
-                    st.write(f"Date: {possible_date}")
-                    st.write(f"Location: Latitude {latitude}, Longitude {longitude}")
-                    st.write("Impact Area: High Risk")
-                    st.subheader("Precautions")
-                    st.write("""
-                    1. Stay indoors and away from windows.
-                    2. Stock up on food, water, and essentials.
-                    3. Follow local government advisories.
-                    """)
-            else:
-                st.write("No significant collision risk detected based on the provided parameters.")
-
-
-            
+        predict_collision_section()
 
 # Main Function
 def main():
@@ -545,5 +746,9 @@ def main():
             elif choice == "Sign Up":
                 signup()
 
+    # Optionally import the heavy libraries in the background once the page has been drawn
+    if app_startup.warm_up_enabled():
+        app_startup.start_warm_up()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,488 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import collision_calendar
+import ingestion
+import instrumentation
+
+DIAMETER_COLUMN = "Asteroid Diameter (km)"
+VELOCITY_COLUMN = "Asteroid Velocity"
+
+EARTH_RADIUS_KM = 6371.0
+ESCAPE_VELOCITY_KM_S = 11.19
+EARTH_ORBITAL_VELOCITY_KM_S = 29.78
+OBLIQUITY_DEG = 23.44
+MEGATON_TNT_J = 4.184e15
+# Stony impactor into crustal rock at the most likely entry angle
+IMPACTOR_DENSITY = 3000.0
+TARGET_DENSITY = 2500.0
+GRAVITY = 9.81
+IMPACT_ANGLE_DEG = 45.0
+# Stony bodies below this size break up in the atmosphere (airburst, no crater)
+AIRBURST_DIAMETER_KM = 0.05
+# Final crater diameter (km) above which craters collapse into complex ones
+SIMPLE_CRATER_LIMIT_KM = 3.2
+# Geometric albedo used to turn an absolute magnitude into a diameter
+ALBEDO = 0.14
+
+# Damage radii (km) of a 1 Mt burst and how they scale with the yield: blast overpressure with its
+# cube root, thermal radiation slightly faster
+DAMAGE_LEVELS = {
+    "severe": ("Severe Blast Damage (20 psi)", 2.4, 1.0 / 3.0),
+    "moderate": ("Moderate Blast Damage (5 psi)", 5.6, 1.0 / 3.0),
+    "thermal": ("Third-Degree Burns", 10.7, 0.41),
+    "light": ("Window Breakage (1 psi)", 12.0, 1.0 / 3.0),
+}
+
+# Radiants lie near the ecliptic; their ecliptic latitude is spread over +-inclination (this much
+# when the inclination is unknown), and over all ecliptic longitudes when the date is unknown
+RADIANT_SPREAD_DEG = 10.0
+LATITUDE_SAMPLES = 8
+LONGITUDE_SAMPLES = 24
+TIME_SAMPLES = 15
+
+# Map tiles: zoom z has 2^z rows and 2^(z+1) columns of TILE_PIXELS x TILE_PIXELS cells
+TILE_PIXELS = 64
+TILE_CACHE_BYTES = 32 * 2 ** 20
+
+
+# Impact velocity, mass, energy and crater/damage radii of every object, from its diameter (km)
+# and velocity relative to Earth before it is accelerated by Earth's gravity (km/s). Craters use
+# the pi-group scaling of Collins, Melosh & Marcus (2005); airbursts leave none.
+def impact_footprints(diameter_km, velocity_km_s, density=IMPACTOR_DENSITY, angle_deg=IMPACT_ANGLE_DEG):
+    diameter_km = np.asarray(diameter_km, dtype=np.float64)
+    impact_velocity = np.sqrt(np.asarray(velocity_km_s, dtype=np.float64) ** 2 + ESCAPE_VELOCITY_KM_S ** 2)
+    diameter_m = diameter_km * 1000.0
+    mass = density * np.pi / 6.0 * diameter_m ** 3
+    energy_mt = 0.5 * mass * (impact_velocity * 1000.0) ** 2 / MEGATON_TNT_J
+    transient_km = 1.161 * (density / TARGET_DENSITY) ** (1.0 / 3.0) * diameter_m ** 0.78 * (impact_velocity * 1000.0) ** 0.44 \
+        * GRAVITY ** -0.22 * np.sin(np.radians(angle_deg)) ** (1.0 / 3.0) / 1000.0
+    simple_km = 1.25 * transient_km
+    crater_km = np.where(simple_km <= SIMPLE_CRATER_LIMIT_KM, simple_km, 1.17 * transient_km ** 1.13 / SIMPLE_CRATER_LIMIT_KM ** 0.13)
+    airburst = diameter_km < AIRBURST_DIAMETER_KM
+    footprints = {
+        "Impact Velocity (km/s)": impact_velocity,
+        "Mass (kg)": mass,
+        "Energy (Mt TNT)": energy_mt,
+        "Airburst": airburst,
+        "Crater Radius (km)": np.where(airburst, 0.0, crater_km / 2.0),
+    }
+    for label, radius_1mt, exponent in DAMAGE_LEVELS.values():
+        footprints[f"{label} Radius (km)"] = radius_1mt * energy_mt ** exponent
+    return pd.DataFrame(footprints)
+
+def damage_radius(footprints, level):
+    return footprints[f"{DAMAGE_LEVELS[level][0]} Radius (km)"].to_numpy()
+
+# Diameter (km) of an asteroid of absolute magnitude H
+def diameter_from_magnitude(magnitude, albedo=ALBEDO):
+    return 1329.0 / np.sqrt(albedo) * 10.0 ** (-np.asarray(magnitude, dtype=np.float64) / 5.0)
+
+# Velocity relative to Earth (km/s) of an orbit met at 1 AU (Opik's approximation; orbits that
+# never reach 1 AU get the value at their closest distance)
+def encounter_velocity(axis_au, eccentricity, inclination_deg):
+    axis_au = np.asarray(axis_au, dtype=np.float64)
+    tisserand = 1.0 / axis_au + 2.0 * np.sqrt(axis_au * (1.0 - np.asarray(eccentricity) ** 2)) * np.cos(np.radians(inclination_deg))
+    return EARTH_ORBITAL_VELOCITY_KM_S * np.sqrt(np.clip(3.0 - tisserand, 0.0, None))
+
+# Next date after `after` on which each orbit crosses 1 AU (Earth's distance from the Sun), or
+# reaches perihelion/aphelion when it stays outside/inside it. Epochs are MJD (TDB).
+def next_encounter(epoch_mjd, axis_au, eccentricity, mean_anomaly_deg, after):
+    axis_au = np.asarray(axis_au, dtype=np.float64)
+    eccentricity = np.asarray(eccentricity, dtype=np.float64)
+    cos_e = np.clip((1.0 - 1.0 / axis_au) / np.maximum(eccentricity, 1e-12), -1.0, 1.0)
+    anomaly = np.arccos(cos_e)
+    crossing = anomaly - eccentricity * np.sin(anomaly)
+    targets = np.stack([crossing, 2.0 * np.pi - crossing], axis=-1)
+    mean_motion = 2.0 * np.pi / (axis_au ** 1.5 * 365.25)
+    mjd = after.toordinal() - date(1858, 11, 17).toordinal()
+    now = np.radians(mean_anomaly_deg) + mean_motion * (mjd - np.asarray(epoch_mjd, dtype=np.float64))
+    days = np.min(np.mod(targets - now[..., None], 2.0 * np.pi), axis=-1) / mean_motion
+    return np.asarray(after.toordinal() + np.ceil(days), dtype=np.int64)
+
+# Ecliptic longitude of the apex of Earth's motion (where head-on impactors come from) on a date
+def apex_longitude(day):
+    days = to_ordinal(day) - date(2000, 1, 1).toordinal() - 0.5
+    anomaly = np.radians(357.528 + 0.9856003 * days)
+    sun = 280.460 + 0.9856474 * days + 1.915 * np.sin(anomaly) + 0.020 * np.sin(2.0 * anomaly)
+    return np.mod(sun - 90.0, 360.0)
+
+def to_ordinal(value):
+    return collision_calendar.to_ordinal(value)
+
+# Footprint, approach geometry and next encounter date of one orbit record (as entered in the
+# prediction form): diameter from the magnitude, velocity and encounter from the orbit
+def record_footprint(record, after):
+    axis, eccentricity = record["Orbit Axis (AU)"], record["Orbit Eccentricity"]
+    inclination = record["Orbit Inclination (deg)"]
+    velocity = float(encounter_velocity(axis, eccentricity, inclination))
+    encounter = date.fromordinal(int(next_encounter(record["Epoch (TDB)"], axis, eccentricity, record["Mean Anomoly (deg)"], after)))
+    footprint = impact_footprints([diameter_from_magnitude(record["Asteroid Magnitude"])], [velocity]).iloc[0]
+    return footprint, ApproachGeometry.ecliptic(velocity, inclination, encounter), encounter
+
+
+# Possible approach directions of an object, as declinations of the radiant (deg) with weights,
+# and how strongly Earth's gravity bends the paths (slow objects are focused onto the whole
+# globe). With a known impact time the sub-radiant point is at `radiant_lon` give or take the
+# Earth's rotation during `time_sigma_hours`; without it every longitude is equally likely.
+class ApproachGeometry:
+    def __init__(self, radiant_lats, velocity_km_s, weights=None, radiant_lon=None, time_sigma_hours=0.0):
+        self.radiant_lats = np.atleast_1d(np.asarray(radiant_lats, dtype=np.float64))
+        weights = np.ones(len(self.radiant_lats)) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.weights = weights / weights.sum()
+        self.velocity = float(velocity_km_s)
+        self.focusing = ESCAPE_VELOCITY_KM_S ** 2 / (self.velocity ** 2 + ESCAPE_VELOCITY_KM_S ** 2)
+        self.radiant_lon = radiant_lon
+        self.time_sigma_hours = time_sigma_hours
+
+    # Radiants near the ecliptic: at the apex of Earth's motion on `encounter` (anywhere along the
+    # ecliptic without a date), ecliptic latitude spread over +-inclination
+    @classmethod
+    def ecliptic(cls, velocity_km_s, inclination_deg=None, encounter=None):
+        spread = RADIANT_SPREAD_DEG if inclination_deg is None else min(float(inclination_deg), 90.0)
+        beta = np.radians(spread * np.sin(2.0 * np.pi * (np.arange(LATITUDE_SAMPLES) + 0.5) / LATITUDE_SAMPLES))
+        if encounter is None:
+            longitudes = np.radians(360.0 * np.arange(LONGITUDE_SAMPLES) / LONGITUDE_SAMPLES)
+        else:
+            longitudes = np.radians([apex_longitude(encounter)])
+        beta, longitudes = np.meshgrid(beta, longitudes)
+        obliquity = np.radians(OBLIQUITY_DEG)
+        declination = np.arcsin(np.sin(beta) * np.cos(obliquity) + np.cos(beta) * np.sin(obliquity) * np.sin(longitudes))
+        return cls(np.degrees(declination.ravel()), velocity_km_s)
+
+    @property
+    def key(self):
+        return (self.radiant_lats.round(6).tobytes(), self.weights.round(9).tobytes(), round(self.velocity, 6),
+                self.radiant_lon, self.time_sigma_hours)
+
+    def longitude_free(self):
+        return self.radiant_lon is None
+
+    # Probability density (per km^2) of the impact point. Straight paths from one direction hit
+    # the facing hemisphere with density cos(zenith angle) / (pi R^2); the focused share of the
+    # paths is spread over the whole globe.
+    def impact_density(self, lat, lon=None):
+        return (1.0 - self.focusing) * self.directional_density(lat, lon) + self.focusing / (4.0 * np.pi * EARTH_RADIUS_KM ** 2)
+
+    def directional_density(self, lat, lon=None):
+        phi = np.radians(np.asarray(lat, dtype=np.float64))[..., None]
+        delta = np.radians(self.radiant_lats)
+        a = np.sin(phi) * np.sin(delta)
+        b = np.cos(phi) * np.cos(delta)
+        if self.longitude_free():
+            # Mean of max(0, a + b cos(dlon)) over all longitude offsets
+            edge = np.arccos(np.clip(np.divide(-a, b, out=np.where(a >= 0, -1.0, 1.0), where=b > 1e-12), -1.0, 1.0))
+            cosines = (a * edge + b * np.sin(edge)) / np.pi
+        else:
+            nodes, node_weights = np.polynomial.hermite_e.hermegauss(TIME_SAMPLES if self.time_sigma_hours else 1)
+            node_weights = node_weights / node_weights.sum()
+            # The sub-radiant point drifts west by 15 degrees per hour
+            sub_lon = np.radians(self.radiant_lon - 15.0 * self.time_sigma_hours * nodes)
+            dlon = np.radians(np.asarray(lon, dtype=np.float64))[..., None, None] - sub_lon
+            cosines = np.maximum(a[..., None] + b[..., None] * np.cos(dlon), 0.0) @ node_weights
+        return cosines @ self.weights / (np.pi * EARTH_RADIUS_KM ** 2)
+
+
+# Impact energy and damage radii of every object of an impacts table, with its risk window and
+# cumulative impact probability (row ids as in the collision calendar)
+class FootprintModel:
+    def __init__(self, frame, risk_calendar):
+        self.names = frame["Object Name"].to_numpy(dtype=object)
+        self.footprints = impact_footprints(frame[DIAMETER_COLUMN], frame[VELOCITY_COLUMN])
+        self.velocities = frame[VELOCITY_COLUMN].to_numpy(dtype=np.float64)
+        self.focusing = ESCAPE_VELOCITY_KM_S ** 2 / (self.velocities ** 2 + ESCAPE_VELOCITY_KM_S ** 2)
+        self.calendar = risk_calendar
+        # Only the risk window's years are known: radiants anywhere along the ecliptic, any time of day
+        self.geometry = ApproachGeometry.ecliptic(ESCAPE_VELOCITY_KM_S)
+
+    # Object ids whose window overlaps [low, high] (all objects without a range), weighted by the
+    # share of their cumulative probability that falls in the range
+    def selection(self, low=None, high=None, objects=None):
+        starts, ends = self.calendar.tree.starts, self.calendar.tree.ends
+        if objects is not None:
+            ids = np.atleast_1d(np.asarray(objects, dtype=np.int64))
+        elif low is None:
+            ids = np.arange(len(starts))
+        else:
+            low = to_ordinal(low)
+            high = low if high is None else to_ordinal(high)
+            ids = np.sort(self.calendar.tree.overlapping(low, high))
+        weights = self.calendar.probabilities[ids]
+        if low is not None:
+            high = low if high is None else high
+            overlap = np.minimum(ends[ids], high) - np.maximum(starts[ids], low) + 1
+            weights = weights * np.clip(overlap, 0, None) / (ends[ids] - starts[ids] + 1)
+        return ids, weights
+
+    # Energy and main radii of some objects, for tables next to the calendar
+    def summary(self, ids):
+        columns = ["Energy (Mt TNT)", "Airburst", "Crater Radius (km)", f"{DAMAGE_LEVELS['moderate'][0]} Radius (km)"]
+        return self.footprints[columns].iloc[np.asarray(ids, dtype=np.int64)].reset_index(drop=True)
+
+    def object_id(self, name):
+        return int(np.flatnonzero(self.names == name)[0])
+
+    def geometry_for(self, object_id):
+        return ApproachGeometry.ecliptic(self.velocities[object_id])
+
+
+# One map layer, evaluated per grid cell:
+# - "impact": probability that the impact point falls in the cell
+# - "damage": expected share of the cell's area within the damage radius of `level`
+# either for one approach geometry (weight = impact probability) or for the catalog objects
+# selected from a FootprintModel (weighted by their impact probability in the date range)
+class MapLayer:
+    def __init__(self, key, kind, level="moderate", geometry=None, radius_km=0.0, weight=1.0, model=None, ids=None, weights=None):
+        if kind not in ("impact", "damage"):
+            raise ValueError(f"Unknown map layer: {kind}")
+        if kind == "damage" and level not in DAMAGE_LEVELS and level != "crater":
+            raise ValueError(f"Unknown damage level: {level}")
+        self.key = (key, kind, level)
+        self.kind = kind
+        self.level = level
+        self.geometry = geometry
+        self.radius_km = radius_km
+        self.weight = weight
+        self.model = model
+        self.ids = ids
+        self.weights = weights
+
+    @classmethod
+    def for_geometry(cls, geometry, kind="impact", radius_km=0.0, weight=1.0, level="moderate"):
+        return cls(("geometry", geometry.key, round(float(radius_km), 6), weight), kind, level, geometry=geometry, radius_km=radius_km, weight=weight)
+
+    @classmethod
+    def for_catalog(cls, model, data_key, kind="damage", level="moderate", low=None, high=None, objects=None):
+        ids, weights = model.selection(low, high, objects)
+        key = ("catalog", data_key, None if low is None else to_ordinal(low), None if high is None else to_ordinal(high),
+               None if objects is None else tuple(np.atleast_1d(objects).tolist()))
+        return cls(key, kind, level, model=model, ids=ids, weights=weights)
+
+    def _radii(self):
+        if self.level == "crater":
+            return self.model.footprints["Crater Radius (km)"].to_numpy()[self.ids]
+        return damage_radius(self.model.footprints, self.level)[self.ids]
+
+    # Cell values for cell centers (lat, lon in degrees) of cells of `cell_km2` area each
+    def values(self, lat, lon, cell_km2):
+        if self.model is not None or self.geometry.longitude_free():
+            # Without a known impact time nothing depends on longitude: one value per latitude row
+            rows, inverse = np.unique(lat, return_inverse=True)
+            values = self._row_values(rows)[inverse.reshape(np.shape(lat))]
+        else:
+            values = self._point_values(lat, lon)
+        return values * cell_km2 if self.kind == "impact" else values
+
+    # Impact density (per km^2) or expected damaged share per latitude
+    def _row_values(self, rows):
+        if self.model is None:
+            return self._point_values(rows, None)
+        # Catalog objects share one radiant distribution; their paths differ in how much they are focused
+        focusing = self.model.focusing[self.ids][:, None]
+        density = (1.0 - focusing) * self.model.geometry.directional_density(rows)[None, :] \
+            + focusing / (4.0 * np.pi * EARTH_RADIUS_KM ** 2)
+        if self.kind == "impact":
+            return self.weights @ density
+        return self.weights @ np.minimum(1.0, density * np.pi * self._radii()[:, None] ** 2)
+
+    def _point_values(self, lat, lon):
+        density = self.geometry.impact_density(lat, lon)
+        if self.kind == "impact":
+            return self.weight * density
+        return self.weight * np.minimum(1.0, density * np.pi * self.radius_km ** 2)
+
+
+# Latitude/longitude of the cell centers of one tile, and the cells' areas (km^2)
+def tile_grid(zoom, row, col, pixels=TILE_PIXELS):
+    if not (0 <= row < 2 ** zoom and 0 <= col < 2 ** (zoom + 1)):
+        raise ValueError(f"No tile {row}/{col} at zoom {zoom}")
+    span = 180.0 / 2 ** zoom
+    step = span / pixels
+    lats = 90.0 - row * span - (np.arange(pixels) + 0.5) * step
+    lons = -180.0 + col * span + (np.arange(pixels) + 0.5) * step
+    lat, lon = np.meshgrid(lats, lons, indexing="ij")
+    cell_km2 = EARTH_RADIUS_KM ** 2 * np.radians(step) ** 2 * np.cos(np.radians(lat))
+    return lat, lon, cell_km2
+
+
+# LRU cache of rendered map tiles, bounded by their total size in bytes
+class TileCache:
+    def __init__(self, max_bytes=TILE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def tile(self, layer, zoom, row, col):
+        key = (layer.key, zoom, row, col)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+        instrumentation.cache_event("footprint_tiles", hit=tile is not None)
+        if tile is not None:
+            return tile
+        with instrumentation.timer("impact_footprint.build_tile"):
+            lat, lon, cell_km2 = tile_grid(zoom, row, col)
+            tile = np.asarray(layer.values(lat, lon, cell_km2), dtype=np.float32)
+        with self._lock:
+            self.misses += 1
+            if key not in self._tiles:
+                self._tiles[key] = tile
+                self.nbytes += tile.nbytes
+            while self.nbytes > self.max_bytes and len(self._tiles) > 1:
+                _, evicted = self._tiles.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+        return tile
+
+    # Whole globe at one zoom level, stitched from tiles, with the cell-center latitudes/longitudes
+    def global_map(self, layer, zoom=1):
+        rows = [np.hstack([self.tile(layer, zoom, row, col) for col in range(2 ** (zoom + 1))]) for row in range(2 ** zoom)]
+        step = 180.0 / 2 ** zoom / TILE_PIXELS
+        lats = 90.0 - (np.arange(len(rows) * TILE_PIXELS) + 0.5) * step
+        lons = -180.0 + (np.arange(2 ** (zoom + 1) * TILE_PIXELS) + 0.5) * step
+        return np.vstack(rows), lats, lons
+
+    def stats(self):
+        with self._lock:
+            return {"tiles": len(self._tiles), "bytes": self.nbytes, "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions}
+
+
+# Footprints of an impacts CSV and the map layers drawn from them. Built once per dataset
+# (content hash and ingested records); all datasets share one tile cache.
+class FootprintMaps:
+    def __init__(self, path, cache):
+        self.data_key = ingestion.dataset_key(path)
+        self.model = FootprintModel(ingestion.load_frame(path), ingestion.load_calendar(path))
+        self.cache = cache
+
+    def catalog_layer(self, kind="damage", level="moderate", low=None, high=None, objects=None):
+        return MapLayer.for_catalog(self.model, self.data_key, kind, level, low, high, objects)
+
+    def global_map(self, layer, zoom=1):
+        return self.cache.global_map(layer, zoom)
+
+
+_tile_cache = TileCache()
+_maps = {}
+_maps_lock = threading.Lock()
+
+def get_tile_cache():
+    return _tile_cache
+
+def load_maps(path=collision_calendar.IMPACTS_PATH):
+    key = (path, ingestion.dataset_key(path))
+    with _maps_lock:
+        if key not in _maps:
+            _maps[key] = FootprintMaps(path, _tile_cache)
+        return _maps[key]
+
+# Latitude band holding the central `share` of a raster's probability (all longitudes summed)
+def latitude_band(raster, lats, share=0.5):
+    profile = np.asarray(raster, dtype=np.float64).sum(axis=1)
+    cumulative = np.cumsum(profile[::-1]) / profile.sum()
+    south, north = np.searchsorted(cumulative, [(1.0 - share) / 2.0, (1.0 + share) / 2.0])
+    return float(lats[::-1][min(south, len(lats) - 1)]), float(lats[::-1][min(north, len(lats) - 1)])
+
+# RGB image of a raster (white to dark red on a log scale) with a 30-degree graticule
+def render_raster(raster, lats, lons):
+    raster = np.asarray(raster, dtype=np.float64)
+    positive = raster[raster > 0]
+    if len(positive):
+        low, high = np.log10(positive.min()), np.log10(positive.max())
+        level = np.clip((np.log10(np.maximum(raster, positive.min())) - low) / max(high - low, 1e-12), 0.0, 1.0)
+        level[raster <= 0] = 0.0
+    else:
+        level = np.zeros_like(raster)
+    image = np.empty(raster.shape + (3,), dtype=np.float64)
+    image[..., 0] = 1.0 - 0.45 * level
+    image[..., 1] = 1.0 - level
+    image[..., 2] = 1.0 - level
+    step = abs(lats[1] - lats[0])
+    image[np.abs(np.mod(lats + 15.0, 30.0) - 15.0) < step / 2, :] *= 0.7
+    image[:, np.abs(np.mod(lons + 15.0, 30.0) - 15.0) < step / 2] *= 0.7
+    return (image * 255).astype(np.uint8)
+
+
+def _row_loop(diameters, velocities):
+    rows = []
+    for diameter, velocity in zip(diameters, velocities):
+        impact_velocity = (velocity ** 2 + ESCAPE_VELOCITY_KM_S ** 2) ** 0.5
+        mass = IMPACTOR_DENSITY * np.pi / 6.0 * (diameter * 1000.0) ** 3
+        energy = 0.5 * mass * (impact_velocity * 1000.0) ** 2 / MEGATON_TNT_J
+        rows.append({label: radius * energy ** exponent for label, radius, exponent in DAMAGE_LEVELS.values()})
+    return rows
+
+# Footprints of the impacts.csv objects and of 1M synthetic ones (vectorized vs a per-row loop),
+# cold and cached global maps per zoom level, and LRU eviction under a small tile budget
+def benchmark(n_synthetic=1_000_000, zooms=(0, 1, 2, 3)):
+    maps = FootprintMaps(collision_calendar.IMPACTS_PATH, TileCache())
+    frame = ingestion.load_frame(collision_calendar.IMPACTS_PATH)
+    rng = np.random.default_rng(0)
+    diameters = 10.0 ** rng.uniform(-3, 0.5, n_synthetic)
+    velocities = rng.uniform(0.5, 40.0, n_synthetic)
+    results = []
+    for name, d, v in [("impacts.csv", frame[DIAMETER_COLUMN].to_numpy(), frame[VELOCITY_COLUMN].to_numpy()),
+                       (f"synthetic {n_synthetic}", diameters, velocities)]:
+        started = time.perf_counter()
+        impact_footprints(d, v)
+        vectorized = time.perf_counter() - started
+        sample = min(len(d), 100_000)
+        started = time.perf_counter()
+        _row_loop(d[:sample], v[:sample])
+        loop = (time.perf_counter() - started) * len(d) / sample
+        results.append({"case": f"footprints {name}", "objects": len(d), "vectorized_ms": vectorized * 1000.0,
+                        "row_loop_ms": loop * 1000.0, "speedup": loop / vectorized})
+    footprints = pd.DataFrame(results)
+
+    layers = {
+        "all objects, moderate damage": maps.catalog_layer("damage", "moderate"),
+        "objects at risk in 2050": maps.catalog_layer("damage", "moderate", date(2050, 1, 1), date(2050, 12, 31)),
+        "one object, impact probability": maps.catalog_layer("impact", objects=[maps.model.object_id(maps.model.names[0])]),
+        "known radiant, 2 h time sigma": MapLayer.for_geometry(ApproachGeometry(10.0, 15.0, radiant_lon=40.0, time_sigma_hours=2.0)),
+    }
+    timings = []
+    for name, layer in layers.items():
+        for zoom in zooms:
+            started = time.perf_counter()
+            raster, _, _ = maps.global_map(layer, zoom)
+            cold = time.perf_counter() - started
+            started = time.perf_counter()
+            maps.global_map(layer, zoom)
+            warm = time.perf_counter() - started
+            timings.append({"layer": name, "zoom": zoom, "pixels": raster.size, "cold_ms": cold * 1000.0, "cached_ms": warm * 1000.0})
+    impact = maps.global_map(layers["known radiant, 2 h time sigma"], 2)[0]
+
+    small = TileCache(max_bytes=8 * TILE_PIXELS ** 2 * 4)
+    for zoom in zooms[:3]:
+        small.global_map(layers["all objects, moderate damage"], zoom)
+    return {
+        "footprints": footprints,
+        "maps": pd.DataFrame(timings),
+        "impact_probability_sum": pd.DataFrame([{"layer": "known radiant, 2 h time sigma", "zoom": 2, "sum": float(impact.sum())}]),
+        "eviction": pd.DataFrame([small.stats()]),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # python impact_footprint.py <object name>
+        maps = load_maps()
+        object_id = maps.model.object_id(" ".join(sys.argv[1:]))
+        print(maps.model.footprints.iloc[object_id].to_string())
+    else:
+        for section, table in benchmark().items():
+            print(f"\n{section}")
+            print(table.to_string(index=False, float_format="%.4g"))
@@ -0,0 +1,317 @@
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import dataset_cache
+import orbit_propagation
+
+IMPACTS_PATH = os.path.join("Original_Datasets", "impacts.csv")
+
+EARTH_RADIUS_AU = 6371.0 / 149597870.7
+EARTH_ESCAPE_KM_S = 11.186
+AU_PER_DAY_KM_S = 149597870.7 / 86400.0
+
+# orbits.csv carries no covariances, so clones are drawn around the catalog elements with these
+# 1-sigma widths (a relative, e absolute, angles in degrees), all multiplied by `uncertainty`.
+# They are sized for the short-arc objects impacts.csv lists (widths 10x or 100x smaller left
+# most of them without a single encounter). The along-track spread that dominates real
+# uncertainty regions grows on its own from sigma(a).
+SIGMAS = {"a": 2e-3, "e": 2e-3, "i": 0.05, "node": 0.05, "peri": 0.1, "M": 0.5}
+ELEMENT_COLUMNS = {
+    "a": "Orbit Axis (AU)",
+    "e": "Orbit Eccentricity",
+    "i": "Orbit Inclination (deg)",
+    "node": "Node Longitude (deg)",
+    "peri": "Perihelion Argument (deg)",
+    "M": "Mean Anomoly (deg)",
+}
+
+# A clone has an encounter when its Earth distance has a local minimum below ENCOUNTER_AU.
+# Direct hits (inside the gravitationally focused Earth radius) are far too rare to count at
+# these sample sizes, so the impact probability is also estimated from the encounters: if the
+# clones crossing the encounter disk are spread evenly over it, each one hits with probability
+# (capture radius / ENCOUNTER_AU)^2 (the usual target-plane argument).
+ENCOUNTER_AU = 0.05
+STEP_DAYS = 2.0
+N_CLONES = 2048
+CHUNK_CLONES = 512
+SEED = 2017
+Z_95 = 1.959964
+
+
+# Catalog rows paired with their impacts.csv entry (names match once the orbits.csv
+# designation is taken from inside the parentheses, e.g. "468813 (2012 OT5)" -> "2012 OT5")
+def impact_targets(catalog, impacts_path=IMPACTS_PATH):
+    impacts = dataset_cache.load_frame(impacts_path)
+    names = pd.Series(np.asarray(catalog["Object Name"], dtype=str)).str.replace("\xa0", " ")
+    designations = names.str.extract(r"\(([^)]+)\)")[0].fillna(names).str.strip()
+    rows = pd.DataFrame({"row": np.arange(len(catalog)), "Object Name": designations})
+    rows = rows.drop_duplicates("Object Name")
+    impacts = impacts.assign(**{"Object Name": impacts["Object Name"].str.strip()})
+    return impacts.merge(rows, on="Object Name").reset_index(drop=True)
+
+# Search window of an impacts.csv period, from 1 January of the first year to the end of the last
+def period_mjd(start_year, end_year):
+    return (orbit_propagation.datetime_to_mjd(datetime(int(start_year), 1, 1)),
+            orbit_propagation.datetime_to_mjd(datetime(int(end_year) + 1, 1, 1)))
+
+# Orbital elements of one catalog row as plain floats (small enough to send with every task)
+def object_elements(catalog, row):
+    record = catalog.iloc[row]
+    elements = {name: float(record[column]) for name, column in ELEMENT_COLUMNS.items()}
+    elements["epoch"] = float(record["Epoch (TDB)"])
+    return elements
+
+
+# n perturbed copies of an object's elements, as an elements dict for orbit_propagation
+def sample_clones(base, n, rng, uncertainty=1.0, sigmas=SIGMAS):
+    noise = {name: rng.standard_normal(n) * sigma * uncertainty for name, sigma in sigmas.items()}
+    clones = pd.DataFrame({
+        ELEMENT_COLUMNS["a"]: base["a"] * (1 + noise["a"]),
+        ELEMENT_COLUMNS["e"]: np.clip(base["e"] + noise["e"], 0.0, 0.999),
+        ELEMENT_COLUMNS["i"]: base["i"] + noise["i"],
+        ELEMENT_COLUMNS["node"]: base["node"] + noise["node"],
+        ELEMENT_COLUMNS["peri"]: base["peri"] + noise["peri"],
+        ELEMENT_COLUMNS["M"]: base["M"] + noise["M"],
+        "Epoch (TDB)": np.full(n, base["epoch"]),
+    })
+    return orbit_propagation.elements_from_frame(clones)
+
+def _subset(elements, rows):
+    return {key: value[rows] for key, value in elements.items()}
+
+# Earth-relative speed (km/s) of each clone at its encounter epoch, by central difference
+def _encounter_speeds(elements, rows, times, dt=0.01):
+    grid = times[:, None] + np.array([-dt, dt])[None, :]
+    subset = _subset(elements, rows)
+    relative = orbit_propagation.positions(subset, grid) - orbit_propagation.earth_positions(grid.ravel()).reshape(grid.shape + (3,))
+    return np.linalg.norm(relative[:, 1] - relative[:, 0], axis=-1) / (2 * dt) * AU_PER_DAY_KM_S
+
+# Every encounter of the clones in [start_mjd, end_mjd]: the close-approach sweep of
+# orbit_propagation, two more refinement passes on the minima (so the distances resolve the
+# Earth's radius), and the gravitationally focused capture radius at each encounter speed.
+# Clones whose MOID is beyond the encounter distance cannot have one and are not propagated.
+def clone_encounters(elements, start_mjd, end_mjd, encounter_au=ENCOUNTER_AU, step_days=STEP_DAYS):
+    empty = pd.DataFrame({"clone": [], "epoch_mjd": [], "distance_au": [], "speed_km_s": [], "capture_au": []})
+    candidates = np.nonzero(orbit_propagation.compute_moid(elements, samples=360) < encounter_au + 1e-3)[0]
+    if len(candidates) == 0:
+        return empty
+    subset = _subset(elements, candidates)
+    _, events = orbit_propagation.close_approaches(subset, start_mjd, end_mjd, step_days, encounter_au)
+    if events.empty:
+        return empty
+    rows, times = events["object"].to_numpy(), events["epoch_mjd"].to_numpy()
+    half_width = step_days
+    for _ in range(2):
+        half_width /= 40.0
+        times, distances = orbit_propagation.refine_minima(subset, rows, times, half_width)
+    speeds = _encounter_speeds(subset, rows, times)
+    capture = EARTH_RADIUS_AU * np.sqrt(1 + (EARTH_ESCAPE_KM_S / np.maximum(speeds, 1e-3)) ** 2)
+    return pd.DataFrame({"clone": candidates[rows], "epoch_mjd": times, "distance_au": distances,
+                         "speed_km_s": speeds, "capture_au": capture})
+
+
+# One Monte Carlo chunk: `n` clones of one object, seeded from (seed, object, chunk) only, so
+# the estimates do not depend on how chunks are spread over workers or in what order they run
+def run_chunk(task):
+    started = time.perf_counter()
+    rng = np.random.default_rng(np.random.SeedSequence(task["seed"], spawn_key=(task["row"], task["chunk"])))
+    elements = sample_clones(task["elements"], task["n"], rng, task["uncertainty"])
+    events = clone_encounters(elements, task["start_mjd"], task["end_mjd"], task["encounter_au"], task["step_days"])
+    weights = np.zeros(task["n"])
+    np.add.at(weights, events["clone"].to_numpy(dtype=int), (events["capture_au"] / task["encounter_au"]).to_numpy() ** 2)
+    hit_clones = events.loc[events["distance_au"] < events["capture_au"], "clone"].nunique()
+    years = {orbit_propagation.mjd_to_datetime(mjd).year for mjd in events["epoch_mjd"]}
+    return {
+        "row": task["row"],
+        "chunk": task["chunk"],
+        "samples": task["n"],
+        "encounters": len(events),
+        "encounter_clones": int(events["clone"].nunique()),
+        "hit_clones": int(hit_clones),
+        "weight_sum": float(weights.sum()),
+        "weight_sq_sum": float((weights ** 2).sum()),
+        "years": sorted(years),
+        "seconds": time.perf_counter() - started,
+    }
+
+# Wilson score interval of a binomial proportion
+def wilson_interval(successes, n, z=Z_95):
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+# Running totals of one object's chunks, summarized as the estimates so far
+class ObjectEstimate:
+    def __init__(self, target):
+        self.target = target
+        self.samples = self.encounters = self.encounter_clones = self.hit_clones = self.chunks = 0
+        self.seconds = 0.0
+        self.years = set()
+        # Weight sums per chunk, added up with fsum so the result does not depend on the order
+        # the chunks finished in
+        self._weight_sums, self._weight_sq_sums = [], []
+
+    def add(self, result):
+        self.chunks += 1
+        self.samples += result["samples"]
+        self.encounters += result["encounters"]
+        self.encounter_clones += result["encounter_clones"]
+        self.hit_clones += result["hit_clones"]
+        self._weight_sums.append(result["weight_sum"])
+        self._weight_sq_sums.append(result["weight_sq_sum"])
+        self.seconds += result["seconds"]
+        self.years.update(result["years"])
+
+    # Encounter and direct-hit fractions with Wilson intervals, and the target-plane impact
+    # probability with a normal interval on the per-clone mean
+    def summary(self):
+        n = self.samples
+        mean = math.fsum(self._weight_sums) / n
+        variance = max(math.fsum(self._weight_sq_sums) / n - mean ** 2, 0.0)
+        half = Z_95 * np.sqrt(variance / n)
+        encounter_low, encounter_high = wilson_interval(self.encounter_clones, n)
+        hit_low, hit_high = wilson_interval(self.hit_clones, n)
+        return {
+            "Object Name": self.target["Object Name"],
+            "Period Start": self.target["Period Start"],
+            "Period End": self.target["Period End"],
+            "samples": n,
+            "chunks": self.chunks,
+            "encounters": self.encounters,
+            "encounter_years": len(self.years),
+            "encounter_probability": self.encounter_clones / n,
+            "encounter_ci_low": encounter_low,
+            "encounter_ci_high": encounter_high,
+            "hit_probability": self.hit_clones / n,
+            "hit_ci_low": hit_low,
+            "hit_ci_high": hit_high,
+            "impact_probability": mean,
+            "impact_ci_low": max(0.0, mean - half),
+            "impact_ci_high": mean + half,
+            "published_probability": self.target.get("Cumulative Impact Probability", np.nan),
+            "cpu_seconds": self.seconds,
+        }
+
+
+# Chunked tasks for every target, chunk-major so every object gets a first estimate early
+def make_tasks(catalog, targets, n_clones=N_CLONES, chunk_clones=CHUNK_CLONES, uncertainty=1.0,
+               encounter_au=ENCOUNTER_AU, step_days=STEP_DAYS, seed=SEED):
+    tasks = []
+    n_chunks = -(-n_clones // chunk_clones)
+    for chunk in range(n_chunks):
+        for _, target in targets.iterrows():
+            start_mjd, end_mjd = period_mjd(target["Period Start"], target["Period End"])
+            tasks.append({
+                "row": int(target["row"]),
+                "chunk": chunk,
+                "n": min(chunk_clones, n_clones - chunk * chunk_clones),
+                "elements": object_elements(catalog, int(target["row"])),
+                "start_mjd": start_mjd,
+                "end_mjd": end_mjd,
+                "uncertainty": uncertainty,
+                "encounter_au": encounter_au,
+                "step_days": step_days,
+                "seed": seed,
+            })
+    return tasks
+
+# Run the tasks with `workers` processes (1 = in this process) and yield the updated summary of
+# an object every time one of its chunks finishes
+def stream_estimates(catalog, targets, workers=1, **options):
+    estimates = {int(target["row"]): ObjectEstimate(target.to_dict()) for _, target in targets.iterrows()}
+    tasks = make_tasks(catalog, targets, **options)
+
+    def update(result):
+        estimate = estimates[result["row"]]
+        estimate.add(result)
+        return estimate.summary()
+
+    if workers == 1:
+        for task in tasks:
+            yield update(run_chunk(task))
+        return
+    # Spawned workers, as in sweep_runner (safe when the parent has TensorFlow loaded)
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(run_chunk, task) for task in tasks]
+        for future in as_completed(futures):
+            yield update(future.result())
+
+# Final estimate per object (the last streamed summary of each), in the order of `targets`
+def estimate_impacts(catalog, targets, workers=1, on_update=None, **options):
+    final = {}
+    for summary in stream_estimates(catalog, targets, workers, **options):
+        final[summary["Object Name"]] = summary
+        if on_update is not None:
+            on_update(summary)
+    return pd.DataFrame([final[name] for name in targets["Object Name"]])
+
+
+# Compare the target-plane estimates with impacts.csv's Cumulative Impact Probability for the
+# first n_objects matched objects: order-of-magnitude error and rank agreement
+def validate(n_objects=40, n_clones=N_CLONES, workers=None, **options):
+    catalog = orbit_propagation.load_catalog()
+    targets = impact_targets(catalog).head(n_objects)
+    results = estimate_impacts(catalog, targets, workers or os.cpu_count(), n_clones=n_clones, **options)
+    estimated = results["impact_probability"].to_numpy()
+    published = results["published_probability"].to_numpy(dtype=np.float64)
+    resolved = estimated > 0
+    log_error = np.log10(estimated[resolved] / published[resolved])
+    summary = {
+        "objects": len(results),
+        "resolved": int(resolved.sum()),
+        "median_log10_ratio": float(np.median(log_error)) if resolved.any() else np.nan,
+        "within_1_order": float(np.mean(np.abs(log_error) <= 1)) if resolved.any() else np.nan,
+        "within_2_orders": float(np.mean(np.abs(log_error) <= 2)) if resolved.any() else np.nan,
+        "spearman": float(pd.Series(estimated).corr(pd.Series(published), method="spearman")),
+    }
+    return results, summary
+
+# Samples/sec per core on one worker, and wall-clock scaling from 1 to `max_workers` processes
+# for the same tasks (the estimates are identical for every worker count)
+def benchmark(n_objects=8, n_clones=1024, max_workers=None):
+    max_workers = max_workers or max(os.cpu_count(), 2)
+    catalog = orbit_propagation.load_catalog()
+    targets = impact_targets(catalog).head(n_objects)
+    rows, reference = [], None
+    for workers in sorted({1, 2, max_workers} | {2 ** k for k in range(max_workers.bit_length()) if 2 ** k <= max_workers}):
+        started = time.perf_counter()
+        results = estimate_impacts(catalog, targets, workers, n_clones=n_clones)
+        seconds = time.perf_counter() - started
+        samples = int(results["samples"].sum())
+        if reference is None:
+            reference = results["impact_probability"].to_numpy()
+        rows.append({
+            "workers": workers,
+            "samples": samples,
+            "seconds": seconds,
+            "samples_per_sec": samples / seconds,
+            "samples_per_sec_per_worker": samples / seconds / workers,
+            "cpu_samples_per_sec": samples / results["cpu_seconds"].sum(),
+            "same_estimates": bool(np.array_equal(reference, results["impact_probability"].to_numpy())),
+        })
+    report = pd.DataFrame(rows)
+    report["speedup"] = report["seconds"].iloc[0] / report["seconds"]
+    return report
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["benchmark"]:
+        print(f"{os.cpu_count()} CPU core(s)")
+        print(benchmark().to_string(index=False, float_format="%.2f"))
+    else:
+        results, summary = validate()
+        columns = ["Object Name", "Period Start", "Period End", "samples", "encounters", "encounter_probability",
+                   "hit_probability", "impact_probability", "impact_ci_high", "published_probability"]
+        print(results[columns].to_string(index=False, float_format="%.3g"))
+        print(summary)
@@ -0,0 +1,687 @@
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import collision_calendar
+import dataset_cache
+import preprocessing
+from data_view import DataView
+from orbit_index import OrbitIndex, synthetic_catalog
+
+# Accepted records are appended to <data folder>/.ingest/<dataset>.jsonl; the CSVs are never
+# rewritten. Every process replays the log on top of the CSVs and follows new lines.
+INGEST_DIR_NAME = ".ingest"
+CHUNK_ROWS = 5_000
+
+# Tables of each dataset and the CSV each one starts from. Orbit records also feed the cleaned
+# table (preprocessing.clean_orbits) and the model feature matrix.
+DATASETS = {
+    "orbits": {"raw": "orbits.csv", "cleaned": "cleaned_Asteroid_orbit.csv"},
+    "impacts": {"raw": "impacts.csv"},
+}
+
+# Validation rules per column: (kind, lowest, highest, required). Bounds are inclusive.
+SCHEMAS = {
+    "orbits": {
+        "Object Name": ("text", None, None, True),
+        "Object Classification": ("text", None, None, True),
+        "Epoch (TDB)": ("integer", 0, None, True),
+        "Orbit Axis (AU)": ("number", 1e-6, None, True),
+        # Closed orbits only (the propagator and the cleaned features assume e < 1)
+        "Orbit Eccentricity": ("number", 0.0, np.nextafter(1.0, 0.0), True),
+        "Orbit Inclination (deg)": ("number", 0.0, 180.0, True),
+        "Perihelion Argument (deg)": ("number", 0.0, 360.0, True),
+        "Node Longitude (deg)": ("number", 0.0, 360.0, True),
+        "Mean Anomoly (deg)": ("number", 0.0, 360.0, True),
+        "Perihelion Distance (AU)": ("number", 0.0, None, True),
+        "Aphelion Distance (AU)": ("number", 0.0, None, True),
+        "Orbital Period (yr)": ("number", 0.0, None, True),
+        "Minimum Orbit Intersection Distance (AU)": ("number", 0.0, None, True),
+        "Orbital Reference": ("integer", 0, None, True),
+        # Rows without a magnitude are kept in the raw table; the cleaning drops them
+        "Asteroid Magnitude": ("number", None, None, False),
+    },
+    "impacts": {
+        "Object Name": ("text", None, None, True),
+        "Period Start": ("integer", 1, 9999, True),
+        "Period End": ("integer", 1, 9999, True),
+        "Possible Impacts": ("integer", 1, None, True),
+        "Cumulative Impact Probability": ("number", 0.0, 1.0, True),
+        "Asteroid Velocity": ("number", 0.0, None, True),
+        "Asteroid Magnitude": ("number", None, None, True),
+        "Asteroid Diameter (km)": ("number", 0.0, None, True),
+        "Cumulative Palermo Scale": ("number", None, None, True),
+        "Maximum Palermo Scale": ("number", None, None, True),
+        "Maximum Torino Scale": ("text", None, None, True),
+    },
+}
+
+
+# Schema-level problem with a batch (missing columns, unreadable file); row-level problems
+# are reported per row instead
+class IngestError(ValueError):
+    pass
+
+
+def normalized_name(name):
+    return str(name).replace("\xa0", " ").strip()
+
+# Chunks of a CSV or JSON Lines batch (a path, or an uploaded file object with a name)
+def read_batches(source, chunk_rows=CHUNK_ROWS):
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_rows):
+            yield source.iloc[start:start + chunk_rows].reset_index(drop=True)
+        return
+    name = getattr(source, "name", source)
+    if str(name).lower().endswith((".jsonl", ".json", ".ndjson")):
+        if not isinstance(source, str):
+            source = io.StringIO(source.read().decode() if hasattr(source, "read") else source)
+        reader = pd.read_json(source, lines=True, chunksize=chunk_rows, dtype=False)
+    else:
+        reader = pd.read_csv(source, chunksize=chunk_rows)
+    with reader:
+        yield from reader
+
+# Check one chunk against the dataset's schema. Returns the valid rows (typed, in the
+# CSV's column order) and one {"row", "reason"} entry per rejected row; `first_row` is the
+# chunk's offset in the batch, so reported rows are batch line numbers.
+def validate_chunk(dataset, chunk, first_row=0):
+    schema = SCHEMAS[dataset]
+    missing = [column for column in schema if column not in chunk.columns]
+    if missing:
+        raise IngestError(f"{dataset} batch is missing columns: {', '.join(missing)}")
+
+    reasons = np.full(len(chunk), "", dtype=object)
+    ok = np.ones(len(chunk), dtype=bool)
+    def reject(mask, reason):
+        mask = np.asarray(mask, dtype=bool) & ok
+        reasons[mask] = reason
+        ok[mask] = False
+
+    valid = {}
+    for column, (kind, lowest, highest, required) in schema.items():
+        raw = chunk[column].reset_index(drop=True)
+        present = raw.notna()
+        if not pd.api.types.is_numeric_dtype(raw):
+            present &= raw.astype(str).str.strip() != ""
+        if required:
+            reject(~present, f"{column} is missing")
+        if kind == "text":
+            valid[column] = raw.map(lambda value: str(value).strip(), na_action="ignore").astype(object).where(present, None)
+            continue
+        values = pd.to_numeric(raw, errors="coerce")
+        reject(present & values.isna(), f"{column} is not a number")
+        if kind == "integer":
+            reject(present & values.notna() & (values != values.round()), f"{column} is not an integer")
+        if lowest is not None:
+            reject(values < lowest, f"{column} is below {lowest}")
+        if highest is not None:
+            reject(values > highest, f"{column} is above {highest}")
+        valid[column] = values
+
+    valid = pd.DataFrame(valid)
+    if dataset == "orbits":
+        classes = valid["Object Classification"].fillna("").str.split("(", n=1).str[0].str.strip()
+        reject(~classes.isin(preprocessing.CLASSIFICATIONS), "Object Classification is not a known class")
+    elif dataset == "impacts":
+        reject(valid["Period Start"] > valid["Period End"], "Period Start is after Period End")
+    names = valid["Object Name"].map(normalized_name, na_action="ignore")
+    reject(names.duplicated(keep="first") & names.notna(), "Object Name appears twice in the batch")
+
+    rejected = [{"row": first_row + int(i), "reason": reasons[i]} for i in np.flatnonzero(~ok)]
+    valid = valid[ok].reset_index(drop=True)
+    for column, (kind, _, _, _) in schema.items():
+        if kind == "integer":
+            valid[column] = valid[column].astype(np.int64)
+    return valid, rejected
+
+
+# Append-only array with spare capacity. Rows below the current length are never written
+# again, so a view of the first n rows stays valid (and unchanged) for as long as it is held;
+# growing copies into a new buffer and leaves older views on the old one.
+class GrowingArray:
+    def __init__(self, values, dtype=None):
+        self._buffer = values
+        self.dtype = np.dtype(dtype or values.dtype)
+        self.n_rows = len(values)
+
+    def append(self, values):
+        values = np.asarray(values, dtype=self.dtype)
+        needed = self.n_rows + len(values)
+        if needed > len(self._buffer) or self._buffer.dtype != self.dtype:
+            capacity = max(needed, 2 * len(self._buffer), 1024)
+            buffer = np.empty((capacity,) + self._buffer.shape[1:], dtype=self.dtype)
+            buffer[:self.n_rows] = self._buffer[:self.n_rows]
+            self._buffer = buffer
+        self._buffer[self.n_rows:needed] = values
+        self.n_rows = needed
+
+    def view(self, n_rows):
+        return self._buffer[:n_rows]
+
+
+# Columns of one table as growing arrays; text columns keep their dictionary encoding (new
+# values get new codes at the end, so existing codes never change)
+class Table:
+    def __init__(self, columns):
+        self.columns = {}
+        self.categories = {}
+        self._codes = {}
+        for name, values in columns.items():
+            if isinstance(values, pd.Categorical):
+                self.columns[name] = GrowingArray(np.asarray(values.codes), dtype=np.int32)
+                self.categories[name] = values.categories.to_numpy(dtype=object).tolist()
+            else:
+                self.columns[name] = GrowingArray(np.asarray(values))
+        self.n_rows = next(iter(self.columns.values())).n_rows
+
+    def _encode(self, name, values):
+        categories = self.categories[name]
+        if name not in self._codes:
+            # Built on the first append only (a large catalog may never get one)
+            self._codes[name] = {category: code for code, category in enumerate(categories)}
+        codes = self._codes[name]
+        inverse, uniques = pd.factorize(values)
+        unique_codes = np.empty(len(uniques) + 1, dtype=np.int32)
+        unique_codes[-1] = -1  # factorize marks missing values with -1
+        for i, value in enumerate(uniques):
+            if value not in codes:
+                codes[value] = len(categories)
+                categories.append(value)
+            unique_codes[i] = codes[value]
+        return unique_codes[inverse]
+
+    def append(self, df):
+        for name, column in self.columns.items():
+            values = df[name].to_numpy(dtype=object) if name in self.categories else df[name].to_numpy()
+            column.append(self._encode(name, values) if name in self.categories else values)
+        self.n_rows += len(df)
+
+    # What a snapshot needs to see the table as it is now
+    def state(self):
+        return self.n_rows, {name: len(categories) for name, categories in self.categories.items()}
+
+    def frame(self, state):
+        n_rows, n_categories = state
+        columns = {}
+        for name, column in self.columns.items():
+            values = column.view(n_rows)
+            if name in self.categories:
+                values = pd.Categorical.from_codes(values, categories=self.categories[name][:n_categories[name]])
+            columns[name] = values
+        return pd.DataFrame(columns, copy=False)
+
+
+# Count, mean, sum of squared deviations, min and max per numeric column. Batches are merged
+# with the parallel-variance update, so adding rows never rescans the existing ones.
+class RunningStats:
+    def __init__(self, columns, count, mean, m2, minimum, maximum):
+        self.columns = list(columns)
+        self.count, self.mean, self.m2 = count, mean, m2
+        self.minimum, self.maximum = minimum, maximum
+
+    @classmethod
+    def from_frame(cls, df):
+        columns = [column for column in df.columns if pd.api.types.is_numeric_dtype(df[column])]
+        values = np.column_stack([np.asarray(df[column], dtype=np.float64) for column in columns]) if columns else np.empty((len(df), 0))
+        present = ~np.isnan(values)
+        count = present.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, np.nansum(values, axis=0) / count, np.nan)
+        m2 = np.nansum((values - mean) ** 2, axis=0)
+        empty = count == 0
+        minimum = np.where(empty, np.nan, np.min(np.where(present, values, np.inf), axis=0, initial=np.inf))
+        maximum = np.where(empty, np.nan, np.max(np.where(present, values, -np.inf), axis=0, initial=-np.inf))
+        return cls(columns, count, mean, m2, minimum, maximum)
+
+    def merged(self, df):
+        other = RunningStats.from_frame(df[self.columns])
+        count = self.count + other.count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = np.nan_to_num(other.mean) - np.nan_to_num(self.mean)
+            mean = np.where(count > 0, np.nan_to_num(self.mean) + delta * other.count / count, np.nan)
+            m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / np.where(count > 0, count, 1)
+        return RunningStats(self.columns, count, mean, m2, np.fmin(self.minimum, other.minimum), np.fmax(self.maximum, other.maximum))
+
+    # Same layout as DataFrame.describe().T, without the quartiles (they cannot be merged)
+    def summary(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(self.m2 / (self.count - 1))
+        return pd.DataFrame({"count": self.count, "mean": self.mean, "std": std, "min": self.minimum, "max": self.maximum},
+                            index=self.columns)
+
+
+# Model inputs of the cleaned orbit table with ingested rows appended: the same attributes as
+# preprocessing.FeatureMatrix. New rows are transformed with the already-fitted pipeline (never
+# refitted) and added to the training rows; the held-out test rows stay those of the CSV.
+class FeatureSnapshot:
+    def __init__(self, pipeline, raw, X, y, train_rows, test_rows, data_hash):
+        self.pipeline = pipeline
+        self.raw, self.X, self.y = raw, X, y
+        self.train_rows, self.test_rows = train_rows, test_rows
+        self.data_hash = data_hash
+
+    def split(self):
+        return self.X[self.train_rows], self.X[self.test_rows], self.y[self.train_rows], self.y[self.test_rows]
+
+# Growing feature arrays behind the feature snapshots
+class FeatureBuffers:
+    def __init__(self, matrix):
+        self.pipeline = matrix.pipeline
+        self.base_hash = matrix.data_hash
+        self.base_rows = len(matrix.X)
+        self.raw = GrowingArray(matrix.raw)
+        self.X = GrowingArray(matrix.X)
+        self.y = GrowingArray(matrix.y)
+        self.train_rows = GrowingArray(matrix.train_rows)
+        self.test_rows = np.asarray(matrix.test_rows)
+
+    def append(self, cleaned):
+        first_row = self.raw.n_rows
+        raw = self.pipeline.raw_features(cleaned)
+        self.raw.append(raw)
+        self.X.append(self.pipeline.scale_features(raw))
+        self.y.append(preprocessing.build_target(cleaned))
+        self.train_rows.append(np.arange(first_row, first_row + len(cleaned)))
+
+    # Features of the first n_rows cleaned rows
+    def snapshot(self, n_rows, version):
+        n_train = len(self.train_rows.view(self.train_rows.n_rows)) - (self.raw.n_rows - n_rows)
+        return FeatureSnapshot(self.pipeline, self.raw.view(n_rows), self.X.view(n_rows), self.y.view(n_rows),
+                               self.train_rows.view(n_train), self.test_rows, f"{self.base_hash}+{version}")
+
+
+# Immutable state of a dataset that readers hold on to: table frames, summary statistics,
+# paged views, and (orbits) the feature matrix and orbit index, or (impacts) the collision
+# calendar. Derived structures are built on first use; once built, every later snapshot gets
+# them extended with the new rows at publish time instead of rebuilt.
+class Snapshot:
+    def __init__(self, store, version, states):
+        self.store = store
+        self.version = version
+        self.states = states
+        self._frames = {}
+        self._stats = {}
+        self._views = {}
+        self._features = None
+        self._index = None
+        self._calendar = None
+
+    @property
+    def n_ingested(self):
+        return self.store.ingested_rows(self)
+
+    def frame(self, table="raw"):
+        if table not in self._frames:
+            self._frames[table] = self.store.tables[table].frame(self.states[table])
+        return self._frames[table]
+
+    def columns(self, table="raw"):
+        frame = self.frame(table)
+        return {column: frame[column].array if isinstance(frame[column].dtype, pd.CategoricalDtype) else frame[column].to_numpy()
+                for column in frame.columns}
+
+    def stats(self, table="raw"):
+        if table not in self._stats:
+            self._stats[table] = RunningStats.from_frame(self.frame(table))
+        return self._stats[table]
+
+    def view(self, table="raw"):
+        if table not in self._views:
+            self._views[table] = DataView(self.frame(table), summary=self.stats(table).summary())
+        return self._views[table]
+
+    @property
+    def features(self):
+        if self._features is None:
+            self._features = self.store.feature_buffers().snapshot(self.states["cleaned"][0], self.version)
+        return self._features
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = OrbitIndex(self.frame("cleaned"))
+        return self._index
+
+    @property
+    def calendar(self):
+        if self._calendar is None:
+            self._calendar = collision_calendar.CollisionCalendar.from_frame(self.frame("raw"))
+        return self._calendar
+
+    # Carry every derived structure built on `previous` over to this snapshot, given the
+    # rows each table gained
+    def extend_from(self, previous, new_rows):
+        for table, stats in previous._stats.items():
+            self._stats[table] = stats.merged(new_rows[table]) if len(new_rows[table]) else stats
+        for table, view in previous._views.items():
+            self._views[table] = view.extended(self.frame(table), self.stats(table).summary())
+        if previous._features is not None:
+            self._features = self.store.feature_buffers().snapshot(self.states["cleaned"][0], self.version)
+        if previous._index is not None:
+            self._index = previous._index.extended(self.frame("cleaned"))
+        if previous._calendar is not None:
+            self._calendar = previous._calendar.extended(self.frame("raw"))
+
+
+# One dataset (its CSVs in `folder` plus the ingest log) with the current snapshot.
+# Writers are serialized by a lock; readers just take `snapshot()` and never wait on them.
+class DatasetStore:
+    def __init__(self, dataset, folder):
+        self.dataset = dataset
+        self.folder = folder
+        self.paths = {table: os.path.join(folder, filename) for table, filename in DATASETS[dataset].items()}
+        self.tables = {table: Table(dataset_cache.open_columns(path)) for table, path in self.paths.items()}
+        self.base_rows = {table: table_data.n_rows for table, table_data in self.tables.items()}
+        self.log_path = os.path.join(folder, INGEST_DIR_NAME, f"{dataset}.jsonl")
+        self._names = None
+        self._features = None
+        self._lock = threading.Lock()
+        self._log_offset = 0
+        self._snapshot = Snapshot(self, 0, self._states())
+        self.refresh()
+
+    def _states(self):
+        return {table: table_data.state() for table, table_data in self.tables.items()}
+
+    def ingested_rows(self, snapshot):
+        return snapshot.states["raw"][0] - self.base_rows["raw"]
+
+    # Growing feature arrays of the cleaned table, created on first use and kept up to date
+    def feature_buffers(self):
+        if self._features is None:
+            features = FeatureBuffers(preprocessing.feature_matrix(self.paths["cleaned"]))
+            base = self.base_rows["cleaned"]
+            cleaned = self.tables["cleaned"]
+            if cleaned.n_rows > base:
+                features.append(cleaned.frame(cleaned.state()).iloc[base:].reset_index(drop=True))
+            self._features = features
+        return self._features
+
+    def snapshot(self):
+        if self._log_changed():
+            self.refresh()
+        return self._snapshot
+
+    def _log_changed(self):
+        try:
+            return os.path.getsize(self.log_path) > self._log_offset
+        except OSError:
+            return False
+
+    # Normalized names of every record in the raw table, built when first needed (the Object
+    # Name categories are the distinct names, ingested ones included)
+    def _known_names(self):
+        if self._names is None:
+            self._names = {normalized_name(name) for name in self.tables["raw"].categories["Object Name"]}
+        return self._names
+
+    # Drop records whose Object Name is already in the table (a replayed or repeated record)
+    def _drop_known(self, records, first_row=0):
+        names = records["Object Name"].map(normalized_name)
+        known_names = self._known_names()
+        known = np.fromiter((name in known_names for name in names), dtype=bool, count=len(names))
+        rejected = [{"row": first_row + int(i), "reason": "Object Name is already in the dataset"} for i in np.flatnonzero(known)]
+        return records[~known].reset_index(drop=True), rejected
+
+    # Add validated records to every table and publish a new snapshot (caller holds the lock)
+    def _apply(self, records):
+        new_rows = {"raw": records}
+        if "cleaned" in self.tables:
+            new_rows["cleaned"] = preprocessing.clean_orbits(records)
+        for table, rows in new_rows.items():
+            self.tables[table].append(rows)
+        if self._features is not None and len(new_rows.get("cleaned", ())):
+            self._features.append(new_rows["cleaned"])
+        if self._names is not None:
+            self._names.update(records["Object Name"].map(normalized_name))
+
+        previous = self._snapshot
+        snapshot = Snapshot(self, previous.version + 1, self._states())
+        snapshot.extend_from(previous, new_rows)
+        self._snapshot = snapshot  # the swap readers see
+        return snapshot
+
+    # Apply log lines written since the last refresh (by this or another process)
+    def refresh(self):
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        if not self._log_changed():
+            return self._snapshot
+        with open(self.log_path, "rb") as file:
+            file.seek(self._log_offset)
+            data = file.read()
+        # A line still being written by another process is left for the next refresh
+        complete = data[:data.rfind(b"\n") + 1]
+        self._log_offset += len(complete)
+        if complete:
+            records = pd.read_json(io.BytesIO(complete), lines=True, dtype=False)
+            records, _ = validate_chunk(self.dataset, records)
+            records, _ = self._drop_known(records)
+            if len(records):
+                self._apply(records)
+        return self._snapshot
+
+    # Append records to the log (whole chunk in one O_APPEND write). Returns whether the log
+    # ended where this store had read up to, i.e. no other process wrote in between.
+    def _write_log(self, records):
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        data = records.to_json(orient="records", lines=True, force_ascii=False)
+        data = (data if data.endswith("\n") else data + "\n").encode()
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+        finally:
+            os.close(fd)
+        if end - len(data) == self._log_offset:
+            self._log_offset = end
+            return True
+        return False
+
+    # Stream a CSV/JSONL batch (path, uploaded file or DataFrame) into the dataset chunk by
+    # chunk: validate, log, apply, publish. Each chunk is visible to readers as soon as its
+    # snapshot is published. Returns one report row per chunk and the rejected rows.
+    def ingest(self, source, chunk_rows=CHUNK_ROWS, on_chunk=None):
+        reports, rejected = [], []
+        first_row = 0
+        for chunk in read_batches(source, chunk_rows):
+            started = time.perf_counter()
+            records, chunk_rejected = validate_chunk(self.dataset, chunk, first_row)
+            with self._lock:
+                self._refresh()
+                records, known = self._drop_known(records, first_row)
+                chunk_rejected += known
+                if len(records):
+                    if self._write_log(records):
+                        self._apply(records)
+                    else:
+                        # Another process appended first: read its lines and ours back in log order
+                        self._refresh()
+            report = {
+                "chunk": len(reports),
+                "rows": len(chunk),
+                "accepted": len(records),
+                "rejected": len(chunk_rejected),
+                "version": self._snapshot.version,
+                "visible_seconds": time.perf_counter() - started,
+            }
+            reports.append(report)
+            rejected += chunk_rejected
+            first_row += len(chunk)
+            if on_chunk is not None:
+                on_chunk(report)
+        return pd.DataFrame(reports), pd.DataFrame(rejected, columns=["row", "reason"])
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+# The store behind a data file and the table it holds, or (None, None) for other files
+def store_for(path):
+    filename = os.path.basename(path)
+    folder = os.path.dirname(os.path.abspath(path))
+    for dataset, files in DATASETS.items():
+        for table, table_file in files.items():
+            if filename == table_file:
+                with _stores_lock:
+                    key = (dataset, folder)
+                    if key not in _stores:
+                        _stores[key] = DatasetStore(dataset, folder)
+                    return _stores[key], table
+    return None, None
+
+def get_store(dataset, folder=os.path.join("Original_Datasets")):
+    return store_for(os.path.join(folder, DATASETS[dataset]["raw"]))[0]
+
+# Current frame of a data file: the CSV plus every ingested record
+def load_frame(path):
+    store, table = store_for(path)
+    if store is None:
+        return dataset_cache.load_frame(path)
+    return store.snapshot().frame(table)
+
+# Current column arrays of a data file (as dataset_cache.open_columns)
+def open_columns(path):
+    store, table = store_for(path)
+    if store is None:
+        return dataset_cache.open_columns(path)
+    return store.snapshot().columns(table)
+
+# Cache key for anything computed from a data file: its CSV hash and the number of records
+# ingested on top of it (records are only ever appended, so the pair identifies the contents
+# in every process)
+def dataset_key(path):
+    store, _ = store_for(path)
+    n_ingested = store.snapshot().n_ingested if store is not None else 0
+    return dataset_cache.dataset_hash(path), n_ingested
+
+def data_view(path):
+    store, table = store_for(path)
+    if store is None:
+        return DataView(dataset_cache.load_frame(path))
+    return store.snapshot().view(table)
+
+# Feature matrix of the cleaned orbits, including ingested orbit records. Without any, this is
+# preprocessing's memory-mapped matrix itself.
+def feature_matrix(data_path=preprocessing.CLEANED_ORBITS_PATH):
+    store, table = store_for(data_path)
+    if store is None or table != "cleaned" or store.snapshot().n_ingested == 0:
+        return preprocessing.feature_matrix(data_path)
+    return store.snapshot().features
+
+def load_calendar(path=collision_calendar.IMPACTS_PATH):
+    store, _ = store_for(path)
+    if store is None or store.snapshot().n_ingested == 0:
+        return collision_calendar.load_calendar(path)
+    return store.snapshot().calendar
+
+
+# n new raw orbit records resampled from the catalog (with jitter and unique names)
+def synthetic_orbits(base, n_rows, seed=0):
+    records = synthetic_catalog(base, n_rows, seed)
+    records["Object Name"] = [f"(SYN {seed}-{i})" for i in range(n_rows)]
+    for column, (kind, _, _, _) in SCHEMAS["orbits"].items():
+        if kind == "integer":
+            records[column] = np.round(records[column].astype(np.float64)).astype(np.int64)
+    records["Orbit Eccentricity"] = records["Orbit Eccentricity"].clip(upper=0.999)
+    records["Orbit Inclination (deg)"] = records["Orbit Inclination (deg)"].clip(upper=180.0)
+    for column in ["Perihelion Argument (deg)", "Node Longitude (deg)", "Mean Anomoly (deg)"]:
+        records[column] = records[column].clip(upper=360.0)
+    return records
+
+# Everything the app derives from the orbit CSVs, built from scratch (what replacing the CSVs
+# used to cost): columnar copies, refitted feature matrix, paged views and the orbit index
+def _full_reload(folder):
+    started = time.perf_counter()
+    for filename in DATASETS["orbits"].values():
+        dataset_cache.build_columnar(os.path.join(folder, filename))
+    cleaned_path = os.path.join(folder, DATASETS["orbits"]["cleaned"])
+    preprocessing.build_feature_matrix(cleaned_path, dataset_cache.dataset_hash(cleaned_path))
+    preprocessing.FeatureMatrix(preprocessing.cache_dir_for(cleaned_path), None).split()
+    for filename in DATASETS["orbits"].values():
+        view = DataView(dataset_cache.load_frame(os.path.join(folder, filename)))
+        view.sorted_index("Minimum Orbit Intersection Distance (AU)")
+    OrbitIndex(dataset_cache.load_frame(cleaned_path))
+    return time.perf_counter() - started
+
+# Rows/sec and time-to-visible of ingesting n_rows new orbit records in chunks into a warm
+# store (views, index, features and stats already built), against rebuilding everything from
+# CSVs that have the same rows appended. Runs in a temporary folder on the real orbit CSVs and
+# on catalogs grown to each of base_sizes with synthetic records.
+def benchmark(base_sizes=(15_635, 500_000), n_rows=20_000, chunk_rows=CHUNK_ROWS):
+    original = pd.read_csv(os.path.join("Original_Datasets", DATASETS["orbits"]["raw"]))
+    records = synthetic_orbits(original, n_rows)
+    results = []
+    for base_size in base_sizes:
+        workdir = tempfile.mkdtemp(prefix="ingest-")
+        try:
+            if base_size <= len(original):
+                for filename in DATASETS["orbits"].values():
+                    shutil.copy(os.path.join("Original_Datasets", filename), workdir)
+            else:
+                base = pd.concat([original, synthetic_orbits(original, base_size - len(original), seed=1)], ignore_index=True)
+                base.to_csv(os.path.join(workdir, DATASETS["orbits"]["raw"]), index=False)
+                preprocessing.clean_orbits(base).to_csv(os.path.join(workdir, DATASETS["orbits"]["cleaned"]), index=False)
+            batch_path = os.path.join(workdir, "batch.csv")
+            records.to_csv(batch_path, index=False)
+
+            store = DatasetStore("orbits", workdir)
+            snapshot = store.snapshot()
+            n_base = len(snapshot.frame("raw"))
+            for table in DATASETS["orbits"]:
+                snapshot.view(table).sorted_index("Minimum Orbit Intersection Distance (AU)")
+            # Build the feature matrix and orbit index (with its KD-tree), as the app would have
+            snapshot.features.split()
+            snapshot.index.count(moid_max=0.05)
+            snapshot.index.similar(0)
+
+            started = time.perf_counter()
+            reports, rejected = store.ingest(batch_path, chunk_rows)
+            ingest_seconds = time.perf_counter() - started
+            accepted = int(reports["accepted"].sum())
+            snapshot = store.snapshot()
+            assert len(snapshot.frame("raw")) == n_base + accepted
+            assert len(snapshot.features.X) == len(snapshot.frame("cleaned"))
+
+            # A fresh store replays the log to the same state
+            replayed = DatasetStore("orbits", workdir).snapshot()
+            assert len(replayed.frame("raw")) == len(snapshot.frame("raw"))
+
+            accepted_rows = pd.read_csv(batch_path).drop(index=rejected["row"].to_numpy())
+            accepted_rows.to_csv(os.path.join(workdir, DATASETS["orbits"]["raw"]), mode="a", header=False, index=False)
+            cleaned = preprocessing.clean_orbits(accepted_rows)
+            cleaned.to_csv(os.path.join(workdir, DATASETS["orbits"]["cleaned"]), mode="a", header=False, index=False)
+            reload_seconds = _full_reload(workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        results.append({"base_rows": n_base, "mode": "incremental", "rows": n_rows, "accepted": accepted,
+                        "seconds": ingest_seconds, "rows_per_sec": n_rows / ingest_seconds,
+                        "time_to_visible_ms": reports["visible_seconds"].median() * 1000.0})
+        results.append({"base_rows": n_base, "mode": "full reload", "rows": n_rows, "accepted": accepted,
+                        "seconds": reload_seconds, "rows_per_sec": n_rows / reload_seconds,
+                        "time_to_visible_ms": reload_seconds * 1000.0})
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["ingest"] and len(sys.argv) == 4:
+        # python ingestion.py ingest orbits|impacts <batch.csv|batch.jsonl>
+        reports, rejected = get_store(sys.argv[2]).ingest(sys.argv[3], on_chunk=lambda report: print(json.dumps(report)))
+        print(f"Accepted {reports['accepted'].sum()} of {reports['rows'].sum()} rows")
+        if len(rejected):
+            print(rejected.groupby("reason").size().to_string())
+    else:
+        print(benchmark().to_string(index=False, float_format="%.2f"))
@@ -0,0 +1,195 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import numpy as np
+
+# Set COSMIC_PROFILE=1 to profile every instrumented stage from the start (it can also be turned
+# on from the diagnostics panel). pyinstrument is used when it is installed, cProfile otherwise.
+PROFILE_ENV = "COSMIC_PROFILE"
+# Durations kept per stage for the p50/p99 columns (counts and totals cover every call)
+RECENT_SAMPLES = 512
+PROFILE_LINES = 25
+
+
+# Current and peak resident memory of this process (MB)
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+# Timings of one stage plus the highest RSS seen when it finished
+class StageStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+        self.rss_high_water_mb = 0.0
+        self.rss_growth_mb = 0.0
+
+    def record(self, seconds, rss_before, rss_after):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+        self.rss_high_water_mb = max(self.rss_high_water_mb, rss_after)
+        self.rss_growth_mb = max(self.rss_growth_mb, rss_after - rss_before)
+
+    def summary(self):
+        recent = np.asarray(self.recent) * 1000.0
+        return {
+            "calls": self.count,
+            "total_s": self.total,
+            "mean_ms": self.total / self.count * 1000.0,
+            "p50_ms": float(np.percentile(recent, 50)),
+            "p99_ms": float(np.percentile(recent, 99)),
+            "max_ms": self.max * 1000.0,
+            "rss_high_water_mb": self.rss_high_water_mb,
+            "max_rss_growth_mb": self.rss_growth_mb,
+        }
+
+
+# Process-wide measurements of the app's hot paths: per-stage timers, cache hit/miss counters and
+# memory high-water marks, plus the profile of each stage's last call while profiling is on.
+# Nested stages are timed separately; only the outermost stage of a thread is profiled.
+class Instrumentation:
+    def __init__(self, profiling=None):
+        self.profiling = os.environ.get(PROFILE_ENV, "") == "1" if profiling is None else profiling
+        self.started = time.time()
+        self._stages = {}
+        self._caches = {}
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def record(self, stage, seconds, rss_before=None, rss_after=None):
+        rss_after = rss_mb() if rss_after is None else rss_after
+        rss_before = rss_after if rss_before is None else rss_before
+        with self._lock:
+            self._stages.setdefault(stage, StageStats()).record(seconds, rss_before, rss_after)
+
+    @contextmanager
+    def timer(self, stage):
+        depth = getattr(self._local, "depth", 0)
+        profiler = _start_profiler() if self.profiling and depth == 0 else None
+        self._local.depth = depth + 1
+        rss_before = rss_mb()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            self._local.depth = depth
+            self.record(stage, seconds, rss_before)
+            if profiler is not None:
+                report = _stop_profiler(profiler)
+                with self._lock:
+                    self._profiles[stage] = report
+
+    # Decorator form of timer()
+    def timed(self, stage):
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def cache_event(self, cache, hit):
+        with self._lock:
+            counts = self._caches.setdefault(cache, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def set_profiling(self, enabled):
+        self.profiling = bool(enabled)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._caches.clear()
+            self._profiles.clear()
+            self.started = time.time()
+
+    def stages(self):
+        with self._lock:
+            return {stage: stats.summary() for stage, stats in sorted(self._stages.items())}
+
+    def caches(self):
+        with self._lock:
+            return {cache: {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+                    for cache, (hits, misses) in sorted(self._caches.items())}
+
+    def snapshot(self):
+        with self._lock:
+            profiles = dict(self._profiles)
+        return {
+            "collected_at": datetime.now().isoformat(timespec="seconds"),
+            "since": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "memory": {"rss_mb": rss_mb(), "peak_rss_mb": peak_rss_mb()},
+            "profiling": self.profiling,
+            "stages": self.stages(),
+            "caches": self.caches(),
+            "profiles": profiles,
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+
+def _start_profiler():
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    profiler = Profiler()
+    profiler.start()
+    return profiler
+
+# Text report of a finished profile (top functions by cumulative time for cProfile)
+def _stop_profiler(profiler):
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_LINES)
+        return output.getvalue()
+    profiler.stop()
+    return profiler.output_text()
+
+
+_instrumentation = Instrumentation()
+
+def get_instrumentation():
+    return _instrumentation
+
+# Shortcuts to the process-wide instance, for the instrumented modules
+def timer(stage):
+    return _instrumentation.timer(stage)
+
+def timed(stage):
+    return _instrumentation.timed(stage)
+
+def record(stage, seconds):
+    _instrumentation.record(stage, seconds)
+
+def cache_event(cache, hit):
+    _instrumentation.cache_event(cache, hit)
@@ -0,0 +1,399 @@
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import numpy_runtime
+import preprocessing
+import training
+
+# Versions are loaded and warmed up on one background thread, then swapped in between two
+# prediction batches. Ready versions beyond MEMORY_BUDGET bytes are evicted least recently used
+# first; the live version and the shadow candidate are never evicted.
+MEMORY_BUDGET = 64 * 2 ** 20
+DEFAULT_VERSION = os.path.splitext(os.path.basename(numpy_runtime.MODEL_PATHS[0]))[0]
+WARM_UP_ROWS = 256
+WARM_UP_CALLS = 3
+# Live batches waiting for the shadow model; when it falls behind, batches are skipped (and
+# counted) rather than slowing down the live requests
+SHADOW_QUEUE = 16
+HAZARD_THRESHOLD = 0.5
+
+
+# Models in h5_Files and every trained version, as {name: (h5 path, pipeline or None)}. Shipped
+# models use the data's fitted pipeline (None); trained versions the one they were trained with.
+def discover_models(models_dir=training.TRAINED_MODELS_DIR):
+    models = {os.path.splitext(os.path.basename(path))[0]: (path, None) for path in numpy_runtime.MODEL_PATHS}
+    for version in training.list_versions(models_dir):
+        path = os.path.join(training.version_dir(version, models_dir), training.MODEL_FILE)
+        if os.path.exists(path):
+            models[f"Trained v{version}"] = (path, training.load_pipeline(version, models_dir))
+    return models
+
+def _load_keras(path):
+    import tensorflow as tf
+
+    return tf.keras.models.load_model(path, compile=False)
+
+def _model_nbytes(model):
+    if isinstance(model, numpy_runtime.NumpyModel):
+        return sum(kernel.nbytes + bias.nbytes for kernel, bias, _ in model.layers)
+    return sum(weights.nbytes for weights in model.get_weights())
+
+# Backends a version can be served with: the NumPy runtime (default, no TensorFlow) or Keras
+LOADERS = {"numpy": numpy_runtime.load_runtime, "keras": _load_keras}
+
+
+# One registered model: where it comes from and, once loaded, the shared model object (never
+# copied) with its size and warm-up timings
+class ModelVersion:
+    def __init__(self, name, path, pipeline=None, backend="numpy"):
+        self.name = name
+        self.path = path
+        self.backend = backend
+        self.pipeline = pipeline
+        self.model = None
+        self.state = "registered"
+        self.error = None
+        self.nbytes = 0
+        self.load_seconds = None
+        self.first_call_ms = None
+        self.warm_call_ms = None
+        self.last_used = 0.0
+        self.future = None
+
+    def summary(self):
+        return {"version": self.name, "backend": self.backend, "state": self.state, "size_kb": self.nbytes / 1024,
+                "load_s": self.load_seconds, "first_call_ms": self.first_call_ms, "warm_call_ms": self.warm_call_ms,
+                "error": self.error or ""}
+
+
+# Agreement and latency of a candidate scored on the same batches as the live model
+class ShadowStats:
+    def __init__(self, candidate):
+        self.candidate = candidate
+        self.batches = 0
+        self.rows = 0
+        self.skipped = 0
+        # Batches the candidate failed on, and the last failure
+        self.errors = 0
+        self.last_error = None
+        self.agreements = 0
+        self.abs_diff_sum = 0.0
+        self.live_ms = []
+        self.candidate_ms = []
+
+    def record(self, live_scores, candidate_scores, live_seconds, candidate_seconds):
+        self.batches += 1
+        self.rows += len(live_scores)
+        self.agreements += int(np.sum((live_scores >= HAZARD_THRESHOLD) == (candidate_scores >= HAZARD_THRESHOLD)))
+        self.abs_diff_sum += float(np.sum(np.abs(live_scores - candidate_scores)))
+        self.live_ms.append(live_seconds * 1000.0)
+        self.candidate_ms.append(candidate_seconds * 1000.0)
+
+    def record_error(self, error):
+        self.errors += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+
+    def report(self):
+        report = {"candidate": self.candidate, "batches": self.batches, "rows": self.rows, "skipped_batches": self.skipped,
+                  "errors": self.errors, "last_error": self.last_error or ""}
+        if self.rows:
+            report.update({
+                "agreement": self.agreements / self.rows,
+                "mean_abs_diff": self.abs_diff_sum / self.rows,
+                "live_p50_ms": float(np.percentile(self.live_ms, 50)),
+                "live_p99_ms": float(np.percentile(self.live_ms, 99)),
+                "candidate_p50_ms": float(np.percentile(self.candidate_ms, 50)),
+                "candidate_p99_ms": float(np.percentile(self.candidate_ms, 99)),
+            })
+        return report
+
+
+# Process-wide registry of model versions. Engines attached to it (prediction_engine) keep
+# serving the live version while another one loads; activate() swaps the new one in once it
+# has been warmed up, so no request waits for a load.
+class ModelRegistry:
+    def __init__(self, memory_budget=MEMORY_BUDGET, backend="numpy"):
+        self.memory_budget = memory_budget
+        self.backend = backend
+        self._versions = OrderedDict()
+        self._live = None
+        self._engines = []
+        self._lock = threading.RLock()
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+        self._shadow = None
+        self._shadow_queue = queue.Queue(SHADOW_QUEUE)
+        self._shadow_thread = None
+        for name, (path, pipeline) in discover_models().items():
+            self.register(name, path, pipeline)
+
+    def register(self, name, path, pipeline=None, backend=None):
+        with self._lock:
+            if name not in self._versions:
+                self._versions[name] = ModelVersion(name, path, pipeline, backend or self.backend)
+            return self._versions[name]
+
+    def versions(self):
+        with self._lock:
+            return list(self._versions)
+
+    def live_name(self):
+        return self._live.name if self._live is not None else None
+
+    # Start loading a version in the background (no-op when it is loaded or loading). Returns a
+    # future of the ready version.
+    def load(self, name):
+        with self._lock:
+            version = self._versions[name]
+            if version.future is None or version.state in ("failed", "evicted"):
+                version.state = "loading"
+                version.future = self._loader.submit(self._load, version)
+            return version.future
+
+    def _load(self, version):
+        try:
+            started = time.perf_counter()
+            model = LOADERS[version.backend](version.path)
+            pipeline = version.pipeline or preprocessing.fitted_pipeline()
+            load_seconds = time.perf_counter() - started
+            # The first calls pay for allocation (and graph tracing with Keras); make them here
+            rows = pipeline.scale_features(preprocessing.feature_matrix().raw[:WARM_UP_ROWS])
+            timings = []
+            for _ in range(WARM_UP_CALLS):
+                started = time.perf_counter()
+                model.predict_on_batch(rows)
+                timings.append((time.perf_counter() - started) * 1000.0)
+        except Exception as e:
+            version.state, version.error = "failed", str(e)
+            raise
+        with self._lock:
+            version.model, version.pipeline = model, pipeline
+            version.nbytes = _model_nbytes(model)
+            version.load_seconds = load_seconds
+            version.first_call_ms, version.warm_call_ms = timings[0], timings[-1]
+            version.last_used = time.time()
+            version.state, version.error = "ready", None
+            self._evict()
+        return version
+
+    # Loaded version, waiting for the load if needed
+    def get(self, name, timeout=None):
+        version = self.load(name).result(timeout)
+        version.last_used = time.time()
+        return version
+
+    # Load and warm up `name`, then make it the live version of every attached engine in one
+    # step (requests keep using the previous version until then). Returns a future of it.
+    def activate(self, name):
+        activated = Future()
+
+        def swap(loaded):
+            try:
+                activated.set_result(self._make_live(loaded.result()))
+            except Exception as e:
+                activated.set_exception(e)
+
+        self.load(name).add_done_callback(swap)
+        return activated
+
+    def _make_live(self, version):
+        with self._lock:
+            self._live = version
+            version.last_used = time.time()
+            # Promoting the shadow candidate ends its shadow run
+            if self._shadow is not None and self._shadow.candidate == version.name:
+                self._shadow = None
+            for engine in self._engines:
+                engine.swap(version.model, version.pipeline)
+            self._evict()
+        return version
+
+    # The live version (the default one is loaded on first use)
+    def live(self):
+        with self._lock:
+            if self._live is not None:
+                return self._live
+        version = self.get(DEFAULT_VERSION)
+        with self._lock:
+            return self._live or self._make_live(version)
+
+    def attach(self, engine):
+        with self._lock:
+            self._engines.append(engine)
+            engine.on_batch = self._on_batch
+            if self._live is not None:
+                engine.swap(self._live.model, self._live.pipeline)
+
+    # Drop least recently used ready versions until the total size fits the budget
+    def _evict(self):
+        ready = [version for version in self._versions.values() if version.state == "ready"]
+        total = sum(version.nbytes for version in ready)
+        protected = {self.live_name(), self._shadow.candidate if self._shadow is not None else None}
+        for version in sorted(ready, key=lambda version: version.last_used):
+            if total <= self.memory_budget:
+                break
+            if version.name in protected:
+                continue
+            total -= version.nbytes
+            version.model, version.state, version.future = None, "evicted", None
+
+    # Score every live batch with `name` as well, off the request path, until stop_shadow()
+    def start_shadow(self, name):
+        candidate = self.get(name)
+        with self._lock:
+            self._shadow = ShadowStats(candidate.name)
+            # (Re)start the worker; it only stops if something outside the per-batch handling failed
+            if self._shadow_thread is None or not self._shadow_thread.is_alive():
+                self._shadow_thread = threading.Thread(target=self._run_shadow, name="model-shadow", daemon=True)
+                self._shadow_thread.start()
+        return self._shadow
+
+    def stop_shadow(self):
+        with self._lock:
+            stats, self._shadow = self._shadow, None
+        return stats.report() if stats is not None else None
+
+    def shadow_report(self):
+        stats = self._shadow
+        return stats.report() if stats is not None else None
+
+    # Called by the engine after each live batch (raw rows, live scores, live seconds)
+    def _on_batch(self, rows, scores, seconds):
+        stats = self._shadow
+        if stats is None:
+            return
+        try:
+            self._shadow_queue.put_nowait((stats, rows, scores, seconds))
+        except queue.Full:
+            stats.skipped += 1
+
+    def _run_shadow(self):
+        while True:
+            stats, rows, live_scores, live_seconds = self._shadow_queue.get()
+            version = self._versions.get(stats.candidate)
+            if version is None or version.model is None:
+                continue
+            started = time.perf_counter()
+            try:
+                scores = np.asarray(version.model.predict_on_batch(version.pipeline.scale_features(rows))).reshape(-1)
+            except Exception as e:
+                # A failing candidate is reported, and the worker keeps going for the next batch
+                stats.record_error(e)
+                continue
+            stats.record(live_scores, scores, live_seconds, time.perf_counter() - started)
+
+    def report(self):
+        with self._lock:
+            rows = [dict(version.summary(), live=version is self._live) for version in self._versions.values()]
+        return pd.DataFrame(rows)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+# Requests/sec and latency of an engine under steady load while the live version is swapped
+# back and forth, load/warm-up time per version and backend, shadow agreement between the two
+# shipped models, and eviction under a budget that only fits one version
+def benchmark(duration=3.0, clients=16, swap_every=0.5):
+    import prediction_engine
+
+    results = {}
+    registry = ModelRegistry()
+    names = [os.path.splitext(os.path.basename(path))[0] for path in numpy_runtime.MODEL_PATHS]
+    for name in names:
+        registry.get(name)
+    keras = ModelRegistry(backend="keras")
+    for name in names:
+        keras.get(name)
+    results["versions"] = pd.concat([registry.report(), keras.report()], ignore_index=True)
+
+    live = registry.live()
+    engine = prediction_engine.PredictionEngine(live.model, live.pipeline)
+    registry.attach(engine)
+    rows = np.asarray(preprocessing.feature_matrix().raw)
+    latencies, errors = [], []
+    stop = threading.Event()
+
+    def client(worker):
+        rng = np.random.default_rng(worker)
+        local = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                engine.predict(rows[rng.integers(len(rows))])
+            except Exception as e:
+                errors.append(e)
+            local.append((started, time.perf_counter() - started))
+        latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(worker,)) for worker in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    swaps = []
+    while time.perf_counter() - started < duration:
+        time.sleep(swap_every)
+        target = names[(len(swaps) + 1) % len(names)]
+        swap_started = time.perf_counter()
+        registry.activate(target).result()
+        swaps.append((swap_started, time.perf_counter() - swap_started))
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    engine.close()
+
+    times = np.asarray([latency for _, latency in latencies]) * 1000.0
+    # Requests that were in flight within 50 ms of a swap
+    near_swap = np.zeros(len(latencies), dtype=bool)
+    starts = np.asarray([start for start, _ in latencies])
+    for swap_started, _ in swaps:
+        near_swap |= np.abs(starts - swap_started) < 0.05
+    results["hot_swap"] = pd.DataFrame([{
+        "requests": len(latencies),
+        "errors": len(errors),
+        "swaps": len(swaps),
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(times, 50)),
+        "p99_ms": float(np.percentile(times, 99)),
+        "p99_near_swap_ms": float(np.percentile(times[near_swap], 99)) if near_swap.any() else float("nan"),
+        "swap_ms": float(np.median([seconds for _, seconds in swaps]) * 1000.0),
+    }])
+
+    registry.activate(names[0]).result()
+    shadow_engine = prediction_engine.PredictionEngine(registry.live().model, registry.live().pipeline)
+    registry.attach(shadow_engine)
+    registry.start_shadow(names[1])
+    for start in range(0, len(rows), 64):
+        shadow_engine.predict(rows[start:start + 64])
+    time.sleep(0.2)
+    results["shadow"] = pd.DataFrame([registry.stop_shadow()])
+    shadow_engine.close()
+
+    small = ModelRegistry(memory_budget=max(version.nbytes for version in map(registry.get, names)))
+    for name in names:
+        small.get(name)
+    results["eviction"] = small.report()[["version", "state", "size_kb"]]
+    return results
+
+
+if __name__ == "__main__":
+    for section, table in benchmark().items():
+        print(f"\n{section}")
+        print(table.to_string(index=False, float_format="%.3f"))
+    sys.exit(0)
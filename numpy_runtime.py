@@ -0,0 +1,222 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import dataset_cache
+
+MODEL_PATHS = [
+    os.path.join("h5_Files", "Asteroid_Impact_Model.h5"),
+    os.path.join("h5_Files", "Asteroid_Impact_Optimization_Model.h5"),
+]
+# Rows pushed through the layers at a time (keeps the activations in cache for big batches)
+CHUNK_ROWS = 8192
+
+
+def _layer_weights(group):
+    # Keras lists a layer's weights in its "weight_names" attribute; key them by short name
+    weights = {}
+    for name in group.attrs["weight_names"]:
+        name = name.decode() if isinstance(name, bytes) else name
+        short = name.split("/")[-1].split(":")[0]
+        weights[short] = np.asarray(group[name], dtype=np.float64)
+    return weights
+
+# Read a Keras .h5 model (Dense / BatchNormalization / Dropout stack) with h5py only, and
+# fold it into a list of (kernel, bias, activation) Dense layers: Dropout is an identity at
+# inference and every BatchNormalization is folded into the Dense layer that follows it
+def fold_h5(h5_path):
+    import h5py
+
+    with h5py.File(h5_path, "r") as file:
+        config = json.loads(file.attrs["model_config"])
+        weights_root = file["model_weights"] if "model_weights" in file else file
+        layers = []
+        pending_scale = pending_shift = None
+        for layer in config["config"]["layers"]:
+            kind, layer_config = layer["class_name"], layer["config"]
+            if kind in ("InputLayer", "Dropout"):
+                continue
+            weights = _layer_weights(weights_root[layer_config["name"]])
+            if kind == "Dense":
+                kernel = weights["kernel"]
+                bias = weights.get("bias", np.zeros(kernel.shape[1]))
+                if pending_scale is not None:
+                    # Dense(BN(x)) = (x * s + t) @ W + b = x @ (s[:, None] * W) + (t @ W + b)
+                    bias = pending_shift @ kernel + bias
+                    kernel = pending_scale[:, None] * kernel
+                    pending_scale = pending_shift = None
+                layers.append((kernel, bias, layer_config.get("activation", "linear")))
+            elif kind == "BatchNormalization":
+                scale = weights.get("gamma", np.ones_like(weights["moving_mean"])) / np.sqrt(weights["moving_variance"] + layer_config["epsilon"])
+                shift = weights.get("beta", np.zeros_like(scale)) - weights["moving_mean"] * scale
+                pending_scale, pending_shift = scale, shift
+            else:
+                raise ValueError(f"Unsupported layer type in {h5_path}: {kind}")
+        if pending_scale is not None:
+            raise ValueError(f"{h5_path} ends with a BatchNormalization layer; nothing to fold it into.")
+    return layers
+
+def npz_path_for(h5_path):
+    return os.path.splitext(h5_path)[0] + ".npz"
+
+# Write the folded layers as a compact float32 .npz next to the .h5 (tagged with the .h5 hash)
+def export_npz(h5_path, npz_path=None):
+    npz_path = npz_path or npz_path_for(h5_path)
+    layers = fold_h5(h5_path)
+    arrays = {"source_sha256": np.array(dataset_cache.file_sha256(h5_path)),
+              "activations": np.array([activation for _, _, activation in layers])}
+    for i, (kernel, bias, _) in enumerate(layers):
+        arrays[f"kernel_{i}"] = kernel.astype(np.float32)
+        arrays[f"bias_{i}"] = bias.astype(np.float32)
+    tmp_path = npz_path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, npz_path)
+    return npz_path
+
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+def _sigmoid(x):
+    # tanh form: no overflow for large negative inputs
+    x *= 0.5
+    np.tanh(x, out=x)
+    x += 1.0
+    x *= 0.5
+    return x
+
+def _linear(x):
+    return x
+
+ACTIVATIONS = {"relu": _relu, "sigmoid": _sigmoid, "linear": _linear}
+
+
+# Folded Dense stack evaluated with NumPy in float32. predict / predict_on_batch return the
+# same (n, 1) scores as the Keras model, so it can stand in for it (e.g. in PredictionEngine).
+class NumpyModel:
+    def __init__(self, layers):
+        self.layers = [(np.ascontiguousarray(kernel, dtype=np.float32), np.asarray(bias, dtype=np.float32), ACTIVATIONS[activation])
+                       for kernel, bias, activation in layers]
+        self.n_features = self.layers[0][0].shape[0]
+
+    @classmethod
+    def load(cls, npz_path):
+        with np.load(npz_path) as arrays:
+            activations = [str(activation) for activation in arrays["activations"]]
+            return cls([(arrays[f"kernel_{i}"], arrays[f"bias_{i}"], activation) for i, activation in enumerate(activations)])
+
+    def _forward(self, x):
+        for kernel, bias, activation in self.layers:
+            x = x @ kernel
+            x += bias
+            x = activation(x)
+        return x
+
+    def predict_on_batch(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if len(X) <= CHUNK_ROWS:
+            return self._forward(X)
+        return np.concatenate([self._forward(X[start:start + CHUNK_ROWS]) for start in range(0, len(X), CHUNK_ROWS)])
+
+    def predict(self, X, verbose=0):
+        return self.predict_on_batch(X)
+
+# NumPy model for an .h5 file, re-exported when the .npz is missing or older than the .h5
+def load_runtime(h5_path=MODEL_PATHS[0]):
+    npz_path = npz_path_for(h5_path)
+    if os.path.exists(npz_path):
+        with np.load(npz_path) as arrays:
+            current = str(arrays["source_sha256"]) == dataset_cache.file_sha256(h5_path)
+        if current:
+            return NumpyModel.load(npz_path)
+    return NumpyModel.load(export_npz(h5_path))
+
+
+# Largest absolute difference between the NumPy runtime and Keras predict on the real
+# feature matrix plus random inputs far outside the training range
+def check_equivalence(h5_path, n_random=20_000, seed=0):
+    import tensorflow as tf
+
+    import preprocessing
+
+    keras_model = tf.keras.models.load_model(h5_path, compile=False)
+    numpy_model = load_runtime(h5_path)
+    rng = np.random.default_rng(seed)
+    X = np.vstack([
+        np.asarray(preprocessing.feature_matrix().X),
+        rng.normal(0.0, 3.0, (n_random, numpy_model.n_features)).astype(np.float32),
+    ])
+    expected = keras_model.predict(X, batch_size=4096, verbose=0)
+    found = numpy_model.predict(X)
+    if found.shape != expected.shape:
+        raise ValueError(f"NumPy runtime returned shape {found.shape}, Keras {expected.shape}.")
+    return {
+        "model": os.path.basename(h5_path),
+        "rows": len(X),
+        "max_abs_diff": float(np.abs(expected - found).max()),
+        "same_decisions": bool(np.array_equal(expected >= 0.5, found >= 0.5)),
+    }
+
+# Import time and peak RSS of a fresh worker that loads one model with each runtime
+_WORKER_CODE = {
+    "numpy": "import numpy_runtime; model = numpy_runtime.load_runtime({path!r}); n_features = model.n_features",
+    "keras": "import tensorflow as tf; model = tf.keras.models.load_model({path!r}, compile=False); n_features = model.inputs[0].shape[1]",
+}
+
+def _worker_footprint(runtime, h5_path):
+    code = (
+        "import time; started = time.perf_counter(); "
+        + _WORKER_CODE[runtime].format(path=h5_path)
+        + "; import numpy as np; model.predict_on_batch(np.zeros((1, n_features), np.float32))"
+        # VmHWM (not ru_maxrss, which Linux carries over from the parent across exec)
+        + "; hwm = [line for line in open('/proc/self/status') if line.startswith('VmHWM')][0].split()[1]"
+        + "; print(time.perf_counter() - started, int(hwm) / 1024.0)"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    seconds, rss_mb = output.stdout.strip().splitlines()[-1].split()
+    return float(seconds), float(rss_mb)
+
+# Rows/sec of Keras predict_on_batch vs the NumPy runtime per batch size, plus per-worker
+# start-up time and memory for each runtime
+def benchmark(h5_path=MODEL_PATHS[1], batch_sizes=(1, 10, 100, 1_000, 10_000, 100_000), budget_seconds=1.0):
+    import pandas as pd
+    import tensorflow as tf
+
+    keras_model = tf.keras.models.load_model(h5_path, compile=False)
+    numpy_model = load_runtime(h5_path)
+    rng = np.random.default_rng(0)
+    results = []
+    for batch_size in batch_sizes:
+        X = rng.normal(size=(batch_size, numpy_model.n_features)).astype(np.float32)
+        row = {"batch_size": batch_size}
+        for name, model in (("keras", keras_model), ("numpy", numpy_model)):
+            model.predict_on_batch(X)  # warm-up
+            calls, started = 0, time.perf_counter()
+            while calls == 0 or time.perf_counter() - started < budget_seconds:
+                model.predict_on_batch(X)
+                calls += 1
+            row[f"{name}_rows_per_sec"] = calls * batch_size / (time.perf_counter() - started)
+        row["speedup"] = row["numpy_rows_per_sec"] / row["keras_rows_per_sec"]
+        results.append(row)
+
+    footprint = []
+    for runtime in ("keras", "numpy"):
+        seconds, rss_mb = _worker_footprint(runtime, h5_path)
+        footprint.append({"runtime": runtime, "worker_start_seconds": seconds, "worker_peak_rss_mb": rss_mb})
+    return pd.DataFrame(results), pd.DataFrame(footprint)
+
+
+if __name__ == "__main__":
+    for path in MODEL_PATHS:
+        print(f"Exported {export_npz(path)}")
+        print(check_equivalence(path))
+    throughput, footprint = benchmark()
+    print(throughput.to_string(index=False, float_format="%.1f"))
+    print(footprint.to_string(index=False, float_format="%.2f"))
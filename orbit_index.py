@@ -0,0 +1,358 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import dataset_cache
+
+CLEANED_ORBITS_PATH = os.path.join("Original_Datasets", "cleaned_Asteroid_orbit.csv")
+MOID_COLUMN = "Minimum Orbit Intersection Distance (AU)"
+MAGNITUDE_COLUMN = "Asteroid Magnitude"
+CLASSIFICATION_COLUMN = "Object Classification"
+HAZARD_COLUMN = "Hazardous"
+
+# Orbital elements used for "objects like this one" (angles are embedded on the unit circle)
+SIMILARITY_COLUMNS = ["Orbit Axis (AU)", "Orbit Eccentricity", "Orbit Inclination (deg)", "Perihelion Distance (AU)"]
+ANGLE_COLUMNS = ["Node Longitude (deg)", "Perihelion Argument (deg)"]
+# Appended rows go into a delta KD-tree until they outnumber this fraction of the rows in the
+# main tree; then both are rebuilt over the whole catalog
+DELTA_FRACTION = 0.25
+
+
+# Sorted index over one numeric column: range queries are two binary searches and
+# return a slice of the sort permutation (row ids, in value order)
+class SortedIndex:
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.values = values
+        self.order = np.argsort(values, kind="stable")
+        self.sorted_values = values[self.order]
+        # NaNs sort last; keep them out of every range
+        self.n_valid = len(values) - int(np.isnan(values).sum())
+
+    # Row ids from the largest value down, NaNs still last and equal values still in row order
+    # (as a stable descending sort would give)
+    def descending_order(self):
+        valid = self.sorted_values[:self.n_valid]
+        starts = np.flatnonzero(np.r_[True, valid[1:] != valid[:-1]]) if self.n_valid else np.empty(0, dtype=np.int64)
+        lengths = np.diff(np.r_[starts, self.n_valid])
+        # Each run of equal values moves to the mirrored position, keeping its inner order
+        run_starts = np.repeat(starts, lengths)
+        positions = self.n_valid - np.repeat(starts + lengths, lengths) + (np.arange(self.n_valid) - run_starts)
+        order = np.empty_like(self.order)
+        order[positions] = self.order[:self.n_valid]
+        order[self.n_valid:] = self.order[self.n_valid:]
+        return order
+
+    def _bounds(self, low=None, high=None, include_high=True):
+        valid = self.sorted_values[:self.n_valid]
+        start = 0 if low is None else np.searchsorted(valid, low, side="left")
+        side = "right" if include_high else "left"
+        stop = self.n_valid if high is None else np.searchsorted(valid, high, side=side)
+        return start, max(start, stop)
+
+    # Row ids with low <= value <= high (or < high); a view, nothing is copied
+    def range(self, low=None, high=None, include_high=True):
+        start, stop = self._bounds(low, high, include_high)
+        return self.order[start:stop]
+
+    def count(self, low=None, high=None, include_high=True):
+        start, stop = self._bounds(low, high, include_high)
+        return stop - start
+
+    # Which of the given row ids have a value inside the range
+    def contains(self, rows, low=None, high=None, include_high=True):
+        values = self.values[rows]
+        mask = ~np.isnan(values)
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= (values <= high) if include_high else (values < high)
+        return mask
+
+    # Index over these values followed by `new_values` (row ids continue after the existing
+    # ones): the new values are sorted on their own and merged in, instead of re-sorting all
+    def extended(self, new_values):
+        new_values = np.asarray(new_values, dtype=np.float64)
+        new_order = np.argsort(new_values, kind="stable")
+        # side="right" keeps equal values in row order (old rows first), like the stable sort
+        slots = np.searchsorted(self.sorted_values, new_values[new_order], side="right") + np.arange(len(new_values))
+        is_new = np.zeros(len(self.values) + len(new_values), dtype=bool)
+        is_new[slots] = True
+        order = np.empty(len(is_new), dtype=self.order.dtype)
+        order[slots] = new_order + len(self.values)
+        order[~is_new] = self.order
+
+        index = SortedIndex.__new__(SortedIndex)
+        index.values = np.concatenate([self.values, new_values])
+        index.order = order
+        index.sorted_values = index.values[order]
+        index.n_valid = self.n_valid + len(new_values) - int(np.isnan(new_values).sum())
+        return index
+
+
+# Bitmap index over one categorical column: one packed bitmap (n/8 bytes) per value,
+# so AND/OR combinations of filters are byte-wise operations
+class BitmapIndex:
+    def __init__(self, values):
+        categorical = pd.Categorical(values)
+        self.n_rows = len(categorical)
+        self.bitmaps = {
+            category: np.packbits(categorical.codes == code)
+            for code, category in enumerate(categorical.categories)
+        }
+        self.missing = np.packbits(categorical.codes == -1)
+
+    # Index over these rows followed by `values`
+    def extended(self, values):
+        categorical = pd.Categorical(values)
+        n_rows = self.n_rows + len(categorical)
+
+        def grown(bitmap, mask):
+            return np.packbits(np.concatenate([np.unpackbits(bitmap, count=self.n_rows).view(bool), mask]))
+
+        index = BitmapIndex.__new__(BitmapIndex)
+        index.n_rows = n_rows
+        index.bitmaps = {}
+        empty = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        for category in set(self.bitmaps) | set(categorical.categories):
+            mask = np.asarray(categorical == category) if category in categorical.categories else np.zeros(len(categorical), dtype=bool)
+            index.bitmaps[category] = grown(self.bitmaps.get(category, empty), mask)
+        index.missing = grown(self.missing, categorical.codes == -1)
+        return index
+
+    def bitmap(self, *categories):
+        result = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        for category in categories:
+            if category is None:
+                result |= self.missing
+            elif category in self.bitmaps:
+                result |= self.bitmaps[category]
+        return result
+
+
+# Packed bitmap with the given row ids set
+def bitmap_from_rows(rows, n_rows):
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[rows] = True
+    return np.packbits(mask)
+
+# Row ids (ascending) set in a packed bitmap
+def rows_from_bitmap(bitmap, n_rows):
+    return np.flatnonzero(np.unpackbits(bitmap, count=n_rows))
+
+# Which of the given row ids are set in a packed bitmap
+def bitmap_contains(bitmap, rows):
+    return (bitmap[rows >> 3] >> (7 - (rows & 7)).astype(np.uint8)) & 1 == 1
+
+
+# Mean and standard deviation of the shape elements, which similarity_features normalizes by
+def similarity_scale(df):
+    features = np.column_stack([df[column].to_numpy(dtype=np.float64) for column in SIMILARITY_COLUMNS])
+    return features.mean(axis=0), features.std(axis=0)
+
+# Normalized orbital-element vectors for the similarity search (by the frame's own scale
+# unless one is given)
+def similarity_features(df, scale=None):
+    columns = [df[column].to_numpy(dtype=np.float64) for column in SIMILARITY_COLUMNS]
+    features = np.column_stack(columns)
+    mean, std = scale if scale is not None else (features.mean(axis=0), features.std(axis=0))
+    features = (features - mean) / std
+    angles = np.radians(np.column_stack([df[column].to_numpy(dtype=np.float64) for column in ANGLE_COLUMNS]))
+    # Node and perihelion argument get half the weight of the shape elements
+    return np.hstack([features, 0.5 * np.cos(angles), 0.5 * np.sin(angles)])
+
+
+# Prebuilt indexes over the orbit catalog: sorted indexes on MOID and magnitude, bitmaps on
+# classification and hazard flag, and a KD-tree on normalized orbital elements.
+# Every query returns row ids into the frame the index was built from.
+class OrbitIndex:
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.moid = SortedIndex(df[MOID_COLUMN])
+        self.magnitude = SortedIndex(df[MAGNITUDE_COLUMN])
+        self.classification = BitmapIndex(df[CLASSIFICATION_COLUMN])
+        self.hazard = BitmapIndex(df[HAZARD_COLUMN])
+        self._df = df
+        self._features = None
+        self._scale = None
+        self._tree = None
+        self._tree_rows = 0
+        self._delta_tree = None
+
+    # Index over `df`, which is this index's frame with rows appended: the sorted indexes and
+    # bitmaps are extended with the new rows. A built KD-tree is kept; the new rows are
+    # normalized by its scale and searched through a delta tree until there are too many of
+    # them, and then the KD-tree is rebuilt (with a fresh scale) on its next use.
+    def extended(self, df):
+        new_rows = df.iloc[self.n_rows:]
+        index = OrbitIndex.__new__(OrbitIndex)
+        index.n_rows = len(df)
+        index.moid = self.moid.extended(new_rows[MOID_COLUMN])
+        index.magnitude = self.magnitude.extended(new_rows[MAGNITUDE_COLUMN])
+        index.classification = self.classification.extended(new_rows[CLASSIFICATION_COLUMN])
+        index.hazard = self.hazard.extended(new_rows[HAZARD_COLUMN])
+        index._df = df
+        index._delta_tree = None
+        if self._tree is not None and index.n_rows - self._tree_rows <= DELTA_FRACTION * self._tree_rows:
+            index._features = np.concatenate([self._features, similarity_features(new_rows, self._scale)])
+            index._scale, index._tree, index._tree_rows = self._scale, self._tree, self._tree_rows
+        else:
+            index._features, index._scale, index._tree, index._tree_rows = None, None, None, 0
+        return index
+
+    # KD-tree is built on first use (only the similarity search needs it)
+    @property
+    def tree(self):
+        if self._tree is None:
+            from sklearn.neighbors import KDTree
+
+            self._scale = similarity_scale(self._df)
+            self._features = similarity_features(self._df, self._scale)
+            self._tree = KDTree(self._features)
+            self._tree_rows = self.n_rows
+        return self._tree
+
+    # KD-tree over the rows appended since the main tree was built
+    @property
+    def delta_tree(self):
+        if self._delta_tree is None:
+            from sklearn.neighbors import KDTree
+
+            self._delta_tree = KDTree(self._features[self._tree_rows:])
+        return self._delta_tree
+
+    # Row ids (ascending) matching every filter that is given:
+    #   moid_max / moid_min (AU), magnitude_range=(low, high), classifications=[...], hazardous=True/False
+    # With a range filter the query starts from the most selective sorted range and only
+    # tests its candidates against the other filters; otherwise the bitmaps are ANDed.
+    def query(self, moid_min=None, moid_max=None, magnitude_range=None, classifications=None, hazardous=None):
+        bitmaps = []
+        if classifications:
+            bitmaps.append(self.classification.bitmap(*classifications))
+        if hazardous is not None:
+            bitmaps.append(self.hazard.bitmap("Hazard" if hazardous else None))
+        ranges = []
+        if moid_min is not None or moid_max is not None:
+            ranges.append((self.moid, moid_min, moid_max))
+        if magnitude_range is not None:
+            ranges.append((self.magnitude, magnitude_range[0], magnitude_range[1]))
+
+        if not ranges:
+            if not bitmaps:
+                return np.arange(self.n_rows)
+            result = bitmaps[0]
+            for bitmap in bitmaps[1:]:
+                result = result & bitmap
+            return rows_from_bitmap(result, self.n_rows)
+
+        ranges.sort(key=lambda item: item[0].count(item[1], item[2]))
+        index, low, high = ranges[0]
+        if index.count(low, high) > self.n_rows // 16:
+            # Not selective: one pass of column compares and unpacked bitmaps is cheaper
+            mask = np.ones(self.n_rows, dtype=bool)
+            for index, low, high in ranges:
+                mask &= index.contains(slice(None), low, high)
+            for bitmap in bitmaps:
+                mask &= np.unpackbits(bitmap, count=self.n_rows).view(bool)
+            return np.flatnonzero(mask)
+
+        rows = np.sort(index.range(low, high))
+        for index, low, high in ranges[1:]:
+            rows = rows[index.contains(rows, low, high)]
+        for bitmap in bitmaps:
+            rows = rows[bitmap_contains(bitmap, rows)]
+        return rows
+
+    # Number of rows matching the filters (same arguments as query)
+    def count(self, **filters):
+        return len(self.query(**filters))
+
+    # The k orbits most similar to row `row_id` (excluding itself): (row ids, distances)
+    def similar(self, row_id, k=10):
+        tree = self.tree
+        point = self._features[row_id:row_id + 1]
+        distances, rows = tree.query(point, k=k + 1)
+        distances, rows = distances[0], rows[0]
+        if self._tree_rows < self.n_rows:
+            delta_distances, delta_rows = self.delta_tree.query(point, k=min(k + 1, self.n_rows - self._tree_rows))
+            distances = np.concatenate([distances, delta_distances[0]])
+            rows = np.concatenate([rows, delta_rows[0] + self._tree_rows])
+            order = np.argsort(distances, kind="stable")
+            distances, rows = distances[order], rows[order]
+        keep = rows != row_id
+        return rows[keep][:k], distances[keep][:k]
+
+
+def load_index(path=CLEANED_ORBITS_PATH):
+    return OrbitIndex(dataset_cache.load_frame(path))
+
+# Synthetic catalog of n rows resampled from the real one with small jitter on the numbers
+def synthetic_catalog(df, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(df), n_rows)
+    synthetic = {}
+    for column in df.columns:
+        values = np.asarray(df[column])[rows]
+        if pd.api.types.is_numeric_dtype(df[column]):
+            values = values * rng.normal(1.0, 0.01, n_rows)
+        synthetic[column] = values
+    return pd.DataFrame(synthetic)
+
+def _timed(function, repeat=5):
+    best = np.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000.0, result
+
+# Compare the index against the naive pandas boolean-mask path as the catalog grows
+def benchmark(sizes=(15_634, 100_000, 1_000_000, 4_000_000)):
+    base = dataset_cache.load_frame(CLEANED_ORBITS_PATH)
+    results = []
+    for n_rows in sizes:
+        df = base if n_rows == len(base) else synthetic_catalog(base, n_rows)
+        started = time.perf_counter()
+        index = OrbitIndex(df)
+        build_ms = (time.perf_counter() - started) * 1000.0
+
+        pandas_ms, expected = _timed(lambda: df.index[
+            (df[MOID_COLUMN] <= 0.05) & (df[HAZARD_COLUMN] == "Hazard")
+            & df[MAGNITUDE_COLUMN].between(18, 22)
+        ].to_numpy())
+        index_ms, found = _timed(lambda: index.query(moid_max=0.05, hazardous=True, magnitude_range=(18, 22)))
+        assert np.array_equal(np.sort(expected), found)
+
+        pandas_narrow_ms, expected = _timed(lambda: df.index[
+            (df[MOID_COLUMN] <= 0.001) & (df[CLASSIFICATION_COLUMN] == "Aten Asteroid")
+        ].to_numpy())
+        index_narrow_ms, found = _timed(lambda: index.query(moid_max=0.001, classifications=["Aten Asteroid"]))
+        assert np.array_equal(np.sort(expected), found)
+
+        pandas_range_ms, _ = _timed(lambda: int((df[MOID_COLUMN] < 0.05).sum()))
+        index_range_ms, _ = _timed(lambda: index.moid.count(high=0.05, include_high=False))
+
+        index.tree  # build the KD-tree outside the timing
+        features = similarity_features(df)
+        brute_ms, _ = _timed(lambda: np.argpartition(((features - features[0]) ** 2).sum(axis=1), 11)[:11], repeat=3)
+        knn_ms, _ = _timed(lambda: index.similar(0, k=10), repeat=3)
+
+        results.append({
+            "rows": n_rows,
+            "build_ms": build_ms,
+            "pandas_filter_ms": pandas_ms,
+            "index_filter_ms": index_ms,
+            "pandas_narrow_filter_ms": pandas_narrow_ms,
+            "index_narrow_filter_ms": index_narrow_ms,
+            "pandas_moid_count_ms": pandas_range_ms,
+            "index_moid_count_ms": index_range_ms,
+            "brute_knn_ms": brute_ms,
+            "kdtree_knn_ms": knn_ms,
+        })
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    print(benchmark().to_string(index=False, float_format="%.3f"))
@@ -0,0 +1,342 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import dataset_cache
+
+ORBITS_PATH = os.path.join("Original_Datasets", "orbits.csv")
+
+# Gaussian gravitational constant (rad/day): mean motion n = K / a^1.5 for a in AU
+GAUSS_K = 0.01720209895
+MJD_J2000 = 51544.5
+MJD_ZERO = datetime(1858, 11, 17)
+
+# Upper bound on the Earth-relative speed of an approaching object (AU/day, about 52 km/s);
+# bounds how far a coarse time grid can overshoot a close approach
+MAX_APPROACH_SPEED = 0.03
+
+# Mean J2000 elements of the Earth-Moon barycenter (ecliptic, AU/degrees)
+EARTH_ELEMENTS = {
+    "a": 1.00000261,
+    "e": 0.01671123,
+    "i": -0.00001531,
+    "node": 0.0,
+    "peri": 102.93768193,
+    "mean_longitude": 100.46457166,
+}
+
+# Convert a Modified Julian Date (the catalog's "Epoch (TDB)") to a datetime and back
+def mjd_to_datetime(mjd):
+    return MJD_ZERO + timedelta(days=float(mjd))
+
+def datetime_to_mjd(value):
+    return (value - MJD_ZERO).total_seconds() / 86400.0
+
+# One Halley step for Kepler's equation; returns the new estimate and the correction applied
+def _halley_step(E, M, e):
+    e_sin, e_cos = e * np.sin(E), e * np.cos(E)
+    f = E - e_sin - M
+    f_prime = 1 - e_cos
+    delta = f / (f_prime - 0.5 * f * e_sin / f_prime)
+    return E - delta, delta
+
+# Solve Kepler's equation E - e sin E = M for whole arrays at once (Halley's method).
+# A few steps over the full array converge almost every element; only the stragglers
+# (high eccentricity near perihelion) keep iterating. float32 input is solved in float32,
+# which is several times faster and accurate to ~1e-5 rad.
+def solve_kepler(M, e, tol=None, full_iterations=3, max_iter=30):
+    dtype = np.float32 if M.dtype == np.float32 else np.float64
+    M = np.remainder(M, 2 * np.pi, dtype=dtype)
+    return _solve_reduced_kepler(M, np.asarray(e, dtype=dtype), tol, full_iterations, max_iter)
+
+# Kepler solver for M already reduced to [0, 2*pi) and e of the same dtype
+def _solve_reduced_kepler(M, e, tol=None, full_iterations=3, max_iter=30):
+    tol = tol or (1e-5 if M.dtype == np.float32 else 1e-12)
+    e = np.broadcast_to(e, M.shape)
+    E = np.sin(M)
+    E *= e
+    E += M
+    for _ in range(full_iterations):
+        E, delta = _halley_step(E, M, e)
+
+    todo = np.nonzero(np.abs(delta) >= tol)
+    if len(todo[0]):
+        E_todo, M_todo, e_todo = E[todo], M[todo], e[todo]
+        for _ in range(max_iter):
+            E_todo, delta = _halley_step(E_todo, M_todo, e_todo)
+            if np.max(np.abs(delta)) < tol:
+                break
+        E[todo] = E_todo
+    return E
+
+# Unit vectors P (towards perihelion) and Q of each orbital plane in ecliptic coordinates
+def orbit_basis(inclination, node, peri):
+    i, O, w = np.radians(inclination), np.radians(node), np.radians(peri)
+    cos_O, sin_O = np.cos(O), np.sin(O)
+    cos_w, sin_w = np.cos(w), np.sin(w)
+    cos_i, sin_i = np.cos(i), np.sin(i)
+    P = np.stack([
+        cos_O * cos_w - sin_O * sin_w * cos_i,
+        sin_O * cos_w + cos_O * sin_w * cos_i,
+        sin_w * sin_i,
+    ], axis=-1)
+    Q = np.stack([
+        -cos_O * sin_w - sin_O * cos_w * cos_i,
+        -sin_O * sin_w + cos_O * cos_w * cos_i,
+        cos_w * sin_i,
+    ], axis=-1)
+    return P, Q
+
+# Element arrays for every object in an orbits DataFrame, with the per-object constants
+# the propagator needs precomputed once
+def elements_from_frame(df):
+    a = df["Orbit Axis (AU)"].to_numpy(dtype=np.float64)
+    e = df["Orbit Eccentricity"].to_numpy(dtype=np.float64)
+    P, Q = orbit_basis(
+        df["Orbit Inclination (deg)"].to_numpy(dtype=np.float64),
+        df["Node Longitude (deg)"].to_numpy(dtype=np.float64),
+        df["Perihelion Argument (deg)"].to_numpy(dtype=np.float64),
+    )
+    return {
+        "a": a,
+        "e": e,
+        "b": a * np.sqrt(1 - e ** 2),
+        "n": GAUSS_K / a ** 1.5,
+        "M0": np.radians(df["Mean Anomoly (deg)"].to_numpy(dtype=np.float64)),
+        "epoch": df["Epoch (TDB)"].to_numpy(dtype=np.float64),
+        "P": P,
+        "Q": Q,
+    }
+
+def earth_elements():
+    a, e = EARTH_ELEMENTS["a"], EARTH_ELEMENTS["e"]
+    P, Q = orbit_basis(
+        np.array([EARTH_ELEMENTS["i"]]),
+        np.array([EARTH_ELEMENTS["node"]]),
+        np.array([EARTH_ELEMENTS["peri"] - EARTH_ELEMENTS["node"]]),
+    )
+    return {
+        "a": np.array([a]),
+        "e": np.array([e]),
+        "b": np.array([a * np.sqrt(1 - e ** 2)]),
+        "n": np.array([GAUSS_K / a ** 1.5]),
+        "M0": np.radians([EARTH_ELEMENTS["mean_longitude"] - EARTH_ELEMENTS["peri"]]),
+        "epoch": np.array([MJD_J2000]),
+        "P": P,
+        "Q": Q,
+    }
+
+# Mean anomaly (radians, in [0, 2*pi)) of every object at every time. `mjd` is either a 1-D
+# time grid shared by all objects or a 2-D (objects, times) array. The phase is accumulated
+# in float64 revolutions (epochs are decades apart) before any cast to float32.
+def _mean_anomaly(elements, mjd, dtype):
+    mjd = np.asarray(mjd, dtype=np.float64)
+    if mjd.ndim == 1:
+        mjd = mjd[None, :]
+    n_rev = elements["n"] / (2 * np.pi)
+    phase = elements["M0"] / (2 * np.pi) - n_rev * elements["epoch"]
+    revolutions = n_rev[:, None] * mjd
+    revolutions += phase[:, None]
+    revolutions -= np.floor(revolutions)
+    M = revolutions.astype(dtype)
+    M *= dtype(2 * np.pi)
+    return M
+
+# Orbital-plane coordinates (x towards perihelion, y) of every object at every time
+def _plane_coordinates(elements, mjd, dtype):
+    M = _mean_anomaly(elements, mjd, dtype)
+    e = elements["e"][:, None].astype(dtype)
+    E = _solve_reduced_kepler(M, e)
+    x = np.cos(E)
+    x -= e
+    x *= elements["a"][:, None].astype(dtype)
+    y = np.sin(E)
+    y *= elements["b"][:, None].astype(dtype)
+    return x, y
+
+# Heliocentric positions (AU) of every object at every time: shape (objects, times, 3)
+def positions(elements, mjd, dtype=np.float64):
+    x, y = _plane_coordinates(elements, mjd, dtype)
+    P, Q = elements["P"].astype(dtype), elements["Q"].astype(dtype)
+    return x[..., None] * P[:, None, :] + y[..., None] * Q[:, None, :]
+
+def earth_positions(mjd):
+    return positions(earth_elements(), mjd)[0]
+
+# Distance (AU) between every object and the Earth on a time grid: shape (objects, times).
+# Uses |r - r_earth|^2 = |r|^2 + |r_earth|^2 - 2 (x P + y Q) . r_earth, so the projections
+# onto the Earth's position are a single matrix product for a shared time grid.
+def earth_distances(elements, mjd, dtype=np.float64):
+    mjd = np.asarray(mjd, dtype=np.float64)
+    earth = earth_positions(mjd.ravel()).reshape(mjd.shape + (3,))
+    P, Q = elements["P"], elements["Q"]
+    if mjd.ndim == 1:
+        P_dot, Q_dot = (P @ earth.T).astype(dtype), (Q @ earth.T).astype(dtype)
+        earth_sq = np.sum(earth ** 2, axis=-1)[None, :].astype(dtype)
+    else:
+        P_dot = np.einsum("nk,ntk->nt", P, earth).astype(dtype)
+        Q_dot = np.einsum("nk,ntk->nt", Q, earth).astype(dtype)
+        earth_sq = np.sum(earth ** 2, axis=-1).astype(dtype)
+
+    x, y = _plane_coordinates(elements, mjd, dtype)
+    P_dot *= x
+    Q_dot *= y
+    P_dot += Q_dot
+    P_dot *= -2
+    x *= x
+    y *= y
+    P_dot += x
+    P_dot += y
+    P_dot += earth_sq
+    return np.sqrt(np.maximum(P_dot, 0, out=P_dot), out=P_dot)
+
+# Re-sample a +/- half_width window around each (object, time) candidate and return the
+# refined time and distance of the minimum
+def refine_minima(elements, rows, times, half_width, samples=81):
+    if len(rows) == 0:
+        return np.empty(0), np.empty(0)
+    subset = {key: value[rows] for key, value in elements.items()}
+    offsets = np.linspace(-half_width, half_width, samples)
+    grid = times[:, None] + offsets[None, :]
+    distances = earth_distances(subset, grid)
+    best = np.argmin(distances, axis=1)
+    index = np.arange(len(rows))
+    return grid[index, best], distances[index, best]
+
+# Scan one slice of the time grid in chunks of at most ~max_chunk_bytes, tracking each
+# object's minimum distance and every coarse local minimum that could be a close approach.
+# Only interior points of `grid` are tested as minima, so slices that overlap their
+# neighbours by one step report each minimum exactly once.
+def _sweep(elements, grid, candidate_au, max_chunk_bytes):
+    n_objects = len(elements["a"])
+    chunk_steps = max(3, int(max_chunk_bytes // (n_objects * 3 * 4)))
+
+    best_distance = np.full(n_objects, np.inf)
+    best_time = np.full(n_objects, np.nan)
+    event_rows, event_times = [], []
+    previous = None  # last two distance columns of the previous chunk
+    for start in range(0, len(grid), chunk_steps):
+        times = grid[start:start + chunk_steps]
+        distances = earth_distances(elements, times, dtype=np.float32)
+
+        chunk_best = np.argmin(distances, axis=1)
+        chunk_distance = distances[np.arange(n_objects), chunk_best]
+        improved = chunk_distance < best_distance
+        best_distance[improved] = chunk_distance[improved]
+        best_time[improved] = times[chunk_best[improved]]
+
+        if previous is not None:
+            distances = np.concatenate([previous, distances], axis=1)
+            times = grid[start - previous.shape[1]:start + chunk_steps]
+        middle = distances[:, 1:-1]
+        local_min = (middle < distances[:, :-2]) & (middle <= distances[:, 2:]) & (middle < candidate_au)
+        rows, cols = np.nonzero(local_min)
+        event_rows.append(rows)
+        event_times.append(times[cols + 1])
+        previous = distances[:, -2:]
+    return best_distance, best_time, np.concatenate(event_rows), np.concatenate(event_times)
+
+# Propagate the whole catalog over [start_mjd, end_mjd] and find, per object, the minimum
+# Earth distance and its epoch, plus every close approach (local minimum below threshold_au).
+# The coarse scan runs in float32 over chunks of the time grid (split across `workers`
+# processes); each candidate minimum is then refined in float64 on a fine grid.
+def close_approaches(elements, start_mjd, end_mjd, step_days=5.0, threshold_au=0.05,
+                     max_chunk_bytes=64 * 2 ** 20, workers=1):
+    grid = np.arange(start_mjd, end_mjd + step_days, step_days)
+    candidate_au = threshold_au + MAX_APPROACH_SPEED * step_days / 2
+
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        bounds = np.linspace(0, len(grid), workers + 1).astype(int)
+        slices = [grid[max(0, lo - 1):hi + 1] for lo, hi in zip(bounds[:-1], bounds[1:])]
+        with ProcessPoolExecutor(workers) as pool:
+            parts = list(pool.map(_sweep, [elements] * workers, slices,
+                                  [candidate_au] * workers, [max_chunk_bytes] * workers))
+    else:
+        parts = [_sweep(elements, grid, candidate_au, max_chunk_bytes)]
+
+    distances = np.stack([part[0] for part in parts])
+    best = np.argmin(distances, axis=0)
+    best_time = np.stack([part[1] for part in parts])[best, np.arange(distances.shape[1])]
+    best_time, best_distance = refine_minima(elements, np.arange(len(best_time)), best_time, step_days)
+
+    rows = np.concatenate([part[2] for part in parts])
+    times, distances = refine_minima(elements, rows, np.concatenate([part[3] for part in parts]), step_days)
+    keep = distances < threshold_au
+    events = pd.DataFrame({"object": rows[keep], "epoch_mjd": times[keep], "distance_au": distances[keep]})
+    events = events.sort_values(["epoch_mjd", "object"], ignore_index=True)
+
+    summary = pd.DataFrame({"min_distance_au": best_distance, "min_epoch_mjd": best_time})
+    return summary, events
+
+# Earth's orbit radius (AU) in the ecliptic at heliocentric longitude theta (radians)
+def _earth_orbit_radius(theta):
+    a, e = EARTH_ELEMENTS["a"], EARTH_ELEMENTS["e"]
+    return a * (1 - e ** 2) / (1 + e * np.cos(theta - np.radians(EARTH_ELEMENTS["peri"])))
+
+# Distance from points on the asteroid orbits (eccentric anomaly E) to the Earth's orbit.
+# The Earth's orbit is treated as lying in the ecliptic and the nearest point on it is taken
+# at the same heliocentric longitude; the error this adds is of order e_earth^2 (~3e-4 AU).
+def _distance_to_earth_orbit(elements, E):
+    e = elements["e"][:, None]
+    x = elements["a"][:, None] * (np.cos(E) - e)
+    y = elements["b"][:, None] * np.sin(E)
+    xyz = x[..., None] * elements["P"][:, None, :] + y[..., None] * elements["Q"][:, None, :]
+    rho = np.hypot(xyz[..., 0], xyz[..., 1])
+    theta = np.arctan2(xyz[..., 1], xyz[..., 0])
+    return np.hypot(rho - _earth_orbit_radius(theta), xyz[..., 2])
+
+# Minimum Orbit Intersection Distance (AU) with the Earth for every object: a coarse scan of
+# each orbit followed by a fine re-scan around the closest sample, in chunks of objects
+def compute_moid(elements, samples=720, refine_samples=64, chunk_objects=2048):
+    n_objects = len(elements["a"])
+    moid = np.empty(n_objects)
+    E = np.linspace(0, 2 * np.pi, samples, endpoint=False)[None, :]
+    step = 2 * np.pi / samples
+    for start in range(0, n_objects, chunk_objects):
+        subset = {key: value[start:start + chunk_objects] for key, value in elements.items()}
+        distances = _distance_to_earth_orbit(subset, E)
+        best = E[0, np.argmin(distances, axis=1)]
+        fine = best[:, None] + np.linspace(-step, step, refine_samples)[None, :]
+        moid[start:start + chunk_objects] = _distance_to_earth_orbit(subset, fine).min(axis=1)
+    return moid
+
+# Compare computed MOIDs with the catalog's "Minimum Orbit Intersection Distance (AU)" column
+def validate_moid(df):
+    computed = compute_moid(elements_from_frame(df))
+    catalog = df["Minimum Orbit Intersection Distance (AU)"].to_numpy(dtype=np.float64)
+    error = np.abs(computed - catalog)
+    comparison = pd.DataFrame({
+        "Object Name": np.asarray(df["Object Name"]),
+        "catalog_moid_au": catalog,
+        "computed_moid_au": computed,
+        "abs_error_au": error,
+    })
+    summary = {
+        "objects": len(df),
+        "median_abs_error_au": float(np.median(error)),
+        "p95_abs_error_au": float(np.percentile(error, 95)),
+        "within_0.005_au": float(np.mean(error < 0.005)),
+    }
+    return comparison, summary
+
+def load_catalog(path=ORBITS_PATH):
+    return dataset_cache.load_frame(path)
+
+
+if __name__ == "__main__":
+    catalog = load_catalog()
+    elements = elements_from_frame(catalog)
+
+    started = time.perf_counter()
+    _, summary = validate_moid(catalog)
+    print(f"MOID for {len(catalog)} objects in {time.perf_counter() - started:.2f}s: {summary}")
+
+    start = datetime_to_mjd(datetime(2025, 1, 1))
+    started = time.perf_counter()
+    nearest, events = close_approaches(elements, start, start + 100 * 365.25, workers=os.cpu_count())
+    print(f"100-year close-approach sweep in {time.perf_counter() - started:.2f}s: {len(events)} approaches under 0.05 AU")
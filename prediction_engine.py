@@ -0,0 +1,227 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+import model_registry
+import numpy_runtime
+import preprocessing
+
+# Model used by the prediction engine
+MODEL_PATH = os.path.join("h5_Files", "Asteroid_Impact_Model.h5")
+
+# Load the Keras model from h5_Files (TensorFlow is only imported here)
+def load_keras_model(model_path=MODEL_PATH):
+    import tensorflow as tf
+
+    return tf.keras.models.load_model(model_path, compile=False)
+
+
+# A queued prediction request: raw feature rows plus the future that receives the scores
+class _Request:
+    def __init__(self, rows):
+        self.rows = rows
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+# Micro-batching inference engine.
+# Requests from any thread are queued; a single worker thread groups them into one
+# batch (until max_batch_size rows are waiting or max_wait_ms has passed since the
+# first request arrived), scales the batch with the fitted feature pipeline and runs one
+# vectorized predict call. swap() replaces the model and pipeline between two batches, so a
+# new version goes live without dropping or stalling queued requests.
+class PredictionEngine:
+    def __init__(self, model, pipeline, max_batch_size=256, max_wait_ms=5.0):
+        self._active = (model, pipeline)
+        # Optional callback(raw rows, scores, seconds) after each batch (shadow scoring)
+        self.on_batch = None
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._latencies = {}
+        self._batch_rows = {}
+        self._busy_time = 0.0
+        self._callback_errors = 0
+        self._last_callback_error = None
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="prediction-engine", daemon=True)
+        self._worker.start()
+
+    @property
+    def model(self):
+        return self._active[0]
+
+    @property
+    def pipeline(self):
+        return self._active[1]
+
+    def swap(self, model, pipeline):
+        self._active = (model, pipeline)
+
+    # Queue raw feature rows (shape (17,) or (n, 17)); returns a Future of probabilities
+    def submit(self, rows):
+        if self._closed:
+            raise RuntimeError("Prediction engine has been closed.")
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float32))
+        if rows.shape[1] != self.pipeline.n_features:
+            raise ValueError(f"Expected {self.pipeline.n_features} features per row, got {rows.shape[1]}.")
+        request = _Request(rows)
+        self._queue.put(request)
+        return request.future
+
+    # Blocking helper: hazard probability for every row
+    def predict(self, rows, timeout=None):
+        return self.submit(rows).result(timeout=timeout)
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        n_rows = len(first.rows)
+        deadline = time.perf_counter() + self.max_wait
+        while n_rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            batch.append(request)
+            n_rows += len(request.rows)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+            model, pipeline = self._active
+            started = time.perf_counter()
+            try:
+                rows = np.concatenate([request.rows for request in batch])
+                scaled = pipeline.scale_features(rows)
+                scores = np.asarray(model.predict_on_batch(scaled)).reshape(-1)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            offset = 0
+            for request in batch:
+                request.future.set_result(scores[offset:offset + len(request.rows)])
+                offset += len(request.rows)
+            self._record(len(rows), [finished - request.submitted for request in batch], finished - started)
+            if self.on_batch is not None:
+                try:
+                    self.on_batch(rows, scores, finished - started)
+                except Exception as e:
+                    # Never fails the batch; counted and shown in report()
+                    with self._stats_lock:
+                        self._callback_errors += 1
+                        self._last_callback_error = f"{type(e).__name__}: {e}"
+
+    def _record(self, n_rows, latencies, busy):
+        with self._stats_lock:
+            self._latencies.setdefault(n_rows, []).extend(latencies)
+            self._batch_rows[n_rows] = self._batch_rows.get(n_rows, 0) + 1
+            self._busy_time += busy
+        instrumentation.record("prediction_engine.batch", busy)
+
+    # Latency (ms) percentiles and model throughput for every batch size seen so far
+    def report(self):
+        with self._stats_lock:
+            report = {}
+            for n_rows, latencies in sorted(self._latencies.items()):
+                latencies = np.asarray(latencies) * 1000.0
+                report[n_rows] = {
+                    "batches": self._batch_rows[n_rows],
+                    "requests": len(latencies),
+                    "p50_ms": float(np.percentile(latencies, 50)),
+                    "p99_ms": float(np.percentile(latencies, 99)),
+                }
+            total_rows = sum(n * count for n, count in self._batch_rows.items())
+            report["total"] = {
+                "rows": total_rows,
+                "rows_per_sec": total_rows / self._busy_time if self._busy_time else 0.0,
+                "callback_errors": self._callback_errors,
+                "last_callback_error": self._last_callback_error or "",
+            }
+            return report
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+# Process-wide engine serving the model registry's live version (NumPy runtime exported from the
+# .h5, so serving never loads TensorFlow). Activating another version in the registry swaps it in.
+def get_engine(max_batch_size=256, max_wait_ms=5.0):
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            registry = model_registry.get_registry()
+            live = registry.live()
+            _engine = PredictionEngine(live.model, live.pipeline, max_batch_size, max_wait_ms)
+            registry.attach(_engine)
+        return _engine
+
+# Fire n_requests single-row requests from `concurrency` threads at engines with
+# different batch limits and report throughput and p50/p99 latency per batch limit
+def benchmark(batch_sizes=(1, 8, 32, 128, 512), n_requests=4000, concurrency=64, max_wait_ms=5.0):
+    model = numpy_runtime.load_runtime(MODEL_PATH)
+    matrix = preprocessing.feature_matrix()
+    rows = np.asarray(matrix.raw)
+    results = []
+    for batch_size in batch_sizes:
+        engine = PredictionEngine(model, matrix.pipeline, max_batch_size=batch_size, max_wait_ms=max_wait_ms)
+        engine.predict(rows[:batch_size])  # warm-up
+        latencies = []
+        lock = threading.Lock()
+
+        def client(worker):
+            local = []
+            for i in range(worker, n_requests, concurrency):
+                started = time.perf_counter()
+                engine.predict(rows[i % len(rows)])
+                local.append(time.perf_counter() - started)
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=client, args=(w,)) for w in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        engine.close()
+
+        latencies = np.asarray(latencies) * 1000.0
+        results.append({
+            "max_batch_size": batch_size,
+            "requests_per_sec": n_requests / elapsed,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+        })
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    print(benchmark().to_string(index=False))
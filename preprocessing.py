@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import dataset_cache
+import instrumentation
+
+ORBITS_PATH = os.path.join("Original_Datasets", "orbits.csv")
+CLEANED_ORBITS_PATH = os.path.join("Original_Datasets", "cleaned_Asteroid_orbit.csv")
+
+# Feature layout used when the models in h5_Files were trained (get_dummies of the
+# classification first, then the numeric orbit columns in file order)
+CLASSIFICATIONS = ["Amor Asteroid", "Apohele Asteroid", "Apollo Asteroid", "Aten Asteroid"]
+NUMERIC_COLUMNS = [
+    "Epoch (TDB)",
+    "Orbit Axis (AU)",
+    "Orbit Eccentricity",
+    "Orbit Inclination (deg)",
+    "Perihelion Argument (deg)",
+    "Node Longitude (deg)",
+    "Mean Anomoly (deg)",
+    "Perihelion Distance (AU)",
+    "Aphelion Distance (AU)",
+    "Orbital Period (yr)",
+    "Minimum Orbit Intersection Distance (AU)",
+    "Orbital Reference",
+    "Asteroid Magnitude",
+]
+N_FEATURES = len(CLASSIFICATIONS) + len(NUMERIC_COLUMNS)
+
+# Fitted pipelines and their feature matrices are cached next to the CSV they came from
+CACHE_DIR_NAME = ".features"
+PIPELINE_FILE = "pipeline.json"
+
+
+# The notebooks' cleaning of orbits.csv (cleaned_Asteroid_orbit.csv is its saved output):
+# split "Object Classification" on "(" into the class and a Hazardous flag, strip the class,
+# drop rows without a name or magnitude, then drop the name column
+def clean_orbits(df):
+    classification = df["Object Classification"].astype(str)
+    parts = classification.str.split("(", n=1, expand=True)
+    cleaned = df.drop(columns=["Object Name", "Object Classification"])
+    cleaned.insert(0, "Object Classification", parts[0].str.strip())
+    cleaned["Hazardous"] = parts[1].replace("Hazard)", "Hazard") if 1 in parts else None
+    keep = df["Object Name"].notna() & df["Asteroid Magnitude"].notna()
+    return cleaned[keep.to_numpy()].reset_index(drop=True)
+
+# Build the target vector (1 = Hazard) from a cleaned orbit DataFrame
+def build_target(df):
+    return (np.asarray(df["Hazardous"], dtype=object) == "Hazard").astype(np.float32)
+
+# Mean and standard deviation per column, as StandardScaler computes them (constant columns
+# keep a scale of 1)
+def scaling_params(X):
+    X = np.asarray(X, dtype=np.float64)
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0
+    return mean, scale
+
+# Row ids of the notebooks' train/test split (train_test_split(..., random_state=42) only
+# depends on the number of rows)
+def split_rows(n_rows):
+    from sklearn.model_selection import train_test_split
+
+    train_rows, test_rows = train_test_split(np.arange(n_rows), random_state=42)
+    return train_rows, test_rows
+
+
+# Fitted feature transform: one-hot encoding of the classification (categories learned at
+# fit time, in get_dummies order) followed by standard scaling of all features.
+# Transforming new rows only applies the stored parameters; nothing is refitted.
+class FeaturePipeline:
+    def __init__(self, classifications, mean, scale):
+        self.classifications = list(classifications)
+        self.numeric_columns = list(NUMERIC_COLUMNS)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.n_features = len(self.classifications) + len(self.numeric_columns)
+
+    # Fit the encoder and scaler on the given cleaned rows
+    @classmethod
+    def fit(cls, df):
+        classifications = sorted(pd.unique(np.asarray(df["Object Classification"], dtype=object)))
+        pipeline = cls(classifications, np.zeros(0), np.ones(0))
+        mean, scale = scaling_params(pipeline.raw_features(df))
+        return cls(classifications, mean, scale)
+
+    # Unscaled float32 feature matrix (dummies from category codes, no get_dummies frame)
+    def raw_features(self, df):
+        features = np.empty((len(df), self.n_features), dtype=np.float32)
+        codes = pd.Categorical(df["Object Classification"], categories=self.classifications).codes
+        n_classes = len(self.classifications)
+        features[:, :n_classes] = np.arange(n_classes) == codes[:, None]
+        for i, column in enumerate(self.numeric_columns):
+            features[:, n_classes + i] = np.asarray(df[column], dtype=np.float32)
+        return features
+
+    def scale_features(self, features):
+        return (np.asarray(features, dtype=np.float32) - self.mean) / self.scale
+
+    def transform(self, df):
+        return self.scale_features(self.raw_features(df))
+
+    # Unscaled feature row for one record (a dict keyed by column name), without pandas
+    def record_features(self, record):
+        row = np.zeros(self.n_features, dtype=np.float32)
+        if record["Object Classification"] in self.classifications:
+            row[self.classifications.index(record["Object Classification"])] = 1.0
+        for i, column in enumerate(self.numeric_columns):
+            row[len(self.classifications) + i] = record[column]
+        return row
+
+    def transform_records(self, records):
+        return self.scale_features(np.stack([self.record_features(record) for record in records]))
+
+    def to_dict(self):
+        return {
+            "classifications": self.classifications,
+            "numeric_columns": self.numeric_columns,
+            "mean": self.mean.tolist(),
+            "scale": self.scale.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, params):
+        if params["numeric_columns"] != NUMERIC_COLUMNS:
+            raise ValueError("Saved pipeline uses a different numeric column layout.")
+        return cls(params["classifications"], params["mean"], params["scale"])
+
+    # Content hash of the fitted parameters (identifies the exact transform a model was trained with)
+    @property
+    def fingerprint(self):
+        return hashlib.sha256(json.dumps(self.to_dict(), sort_keys=True).encode()).hexdigest()
+
+    def save(self, path):
+        params = dict(self.to_dict(), fingerprint=self.fingerprint)
+        with open(path + ".tmp", "w") as file:
+            json.dump(params, file)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            params = json.load(file)
+        pipeline = cls.from_dict(params)
+        if params.get("fingerprint", pipeline.fingerprint) != pipeline.fingerprint:
+            raise ValueError(f"Pipeline parameters in {path} do not match their fingerprint.")
+        return pipeline
+
+
+# A cleaned dataset turned into model inputs: the fitted pipeline plus memory-mapped float32
+# matrices of every row (raw and scaled), the target, and the train/test row ids
+class FeatureMatrix:
+    def __init__(self, directory, data_hash):
+        self.directory = directory
+        self.data_hash = data_hash
+        self.pipeline = FeaturePipeline.load(os.path.join(directory, PIPELINE_FILE))
+        self.raw = np.load(os.path.join(directory, "raw.npy"), mmap_mode="r")
+        self.X = np.load(os.path.join(directory, "X.npy"), mmap_mode="r")
+        self.y = np.load(os.path.join(directory, "y.npy"), mmap_mode="r")
+        self.train_rows = np.load(os.path.join(directory, "train_rows.npy"))
+        self.test_rows = np.load(os.path.join(directory, "test_rows.npy"))
+
+    # Scaled X_train, X_test, y_train, y_test, as the notebooks' split produced them
+    def split(self):
+        return self.X[self.train_rows], self.X[self.test_rows], self.y[self.train_rows], self.y[self.test_rows]
+
+def cache_dir_for(data_path):
+    folder, filename = os.path.split(data_path)
+    return os.path.join(folder, CACHE_DIR_NAME, os.path.splitext(filename)[0])
+
+# Fit the pipeline on the training split of a cleaned CSV and write it with the transformed
+# matrices; built in a temporary folder and swapped in, like the columnar cache
+def build_feature_matrix(data_path, data_hash):
+    target_dir = cache_dir_for(data_path)
+    tmp_dir = target_dir + ".tmp-" + str(os.getpid())
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    df = dataset_cache.load_frame(data_path)
+    train_rows, test_rows = split_rows(len(df))
+    pipeline = FeaturePipeline.fit(df.take(train_rows))
+    raw = pipeline.raw_features(df)
+    np.save(os.path.join(tmp_dir, "raw.npy"), raw)
+    np.save(os.path.join(tmp_dir, "X.npy"), pipeline.scale_features(raw))
+    np.save(os.path.join(tmp_dir, "y.npy"), build_target(df))
+    np.save(os.path.join(tmp_dir, "train_rows.npy"), train_rows)
+    np.save(os.path.join(tmp_dir, "test_rows.npy"), test_rows)
+    pipeline.save(os.path.join(tmp_dir, PIPELINE_FILE))
+    with open(os.path.join(tmp_dir, "source.json"), "w") as file:
+        json.dump({"source_sha256": data_hash, "rows": len(df)}, file)
+
+    old_dir = target_dir + ".old-" + str(os.getpid())
+    if os.path.exists(target_dir):
+        os.replace(target_dir, old_dir)
+    os.replace(tmp_dir, target_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+def _cached_hash(directory):
+    try:
+        with open(os.path.join(directory, "source.json")) as file:
+            return json.load(file)["source_sha256"]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return None
+
+# Feature matrices already opened by this process, keyed by CSV path
+_matrices = {}
+
+# Up-to-date FeatureMatrix of a cleaned CSV; refitted only when the CSV content changes
+def feature_matrix(data_path=CLEANED_ORBITS_PATH):
+    data_hash = dataset_cache.dataset_hash(data_path)
+    matrix = _matrices.get(data_path)
+    if matrix is not None and matrix.data_hash == data_hash:
+        instrumentation.cache_event("feature_matrix", hit=True)
+        return matrix
+    directory = cache_dir_for(data_path)
+    cached = _cached_hash(directory) == data_hash
+    instrumentation.cache_event("feature_matrix", hit=cached)
+    if not cached:
+        with instrumentation.timer("preprocessing.build_feature_matrix"):
+            build_feature_matrix(data_path, data_hash)
+    matrix = FeatureMatrix(directory, data_hash)
+    _matrices[data_path] = matrix
+    return matrix
+
+def fitted_pipeline(data_path=CLEANED_ORBITS_PATH):
+    return feature_matrix(data_path).pipeline
+
+# Median value of every input, used to pre-fill the "Enter New Asteroid Details" form
+def feature_defaults(data_path=CLEANED_ORBITS_PATH):
+    df = dataset_cache.load_frame(data_path)
+    defaults = df[NUMERIC_COLUMNS].median().to_dict()
+    defaults["Object Classification"] = df["Object Classification"].mode()[0]
+    return defaults
+
+
+if __name__ == "__main__":
+    # Check the cleaning against the notebooks' saved output and report the cached transform
+    cleaned = clean_orbits(pd.read_csv(ORBITS_PATH))
+    expected = pd.read_csv(CLEANED_ORBITS_PATH)
+    pd.testing.assert_frame_equal(cleaned, expected, check_dtype=False)
+    print(f"clean_orbits matches {CLEANED_ORBITS_PATH} ({len(cleaned)} rows)")
+    matrix = feature_matrix()
+    print(f"Feature matrix {matrix.X.shape} {matrix.X.dtype}, pipeline {matrix.pipeline.fingerprint[:12]}")
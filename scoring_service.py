@@ -0,0 +1,435 @@
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import prediction_engine
+import preprocessing
+
+# Headless bulk scoring: POST a CSV or JSON Lines file of orbit records to /score and the hazard
+# probabilities stream back in the same format, one chunk of rows at a time. Request bodies are
+# read in READ_BYTES blocks and at most PIPELINE_DEPTH parsed chunks are held per upload, so
+# memory does not grow with the file size: when the client stops reading results, the server
+# stops reading its upload.
+HOST = "127.0.0.1"
+PORT = 8765
+CHUNK_ROWS = 2_000
+MAX_CHUNK_ROWS = 100_000
+READ_BYTES = 64 * 2 ** 10
+PIPELINE_DEPTH = 2
+
+# Uploads scored at once; more wait up to QUEUE_TIMEOUT seconds for a slot, then get a 503
+MAX_CONCURRENT = 4
+QUEUE_TIMEOUT = 30.0
+
+HAZARD_THRESHOLD = 0.5
+REQUIRED_COLUMNS = ["Object Classification"] + preprocessing.NUMERIC_COLUMNS
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 411: "Length Required", 500: "Internal Server Error",
+               503: "Service Unavailable"}
+
+
+class ScoringError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# Complete lines of a byte stream, chunk_rows at a time (blank lines are skipped). CSV fields
+# with embedded newlines are not supported; orbit records never have them.
+async def line_chunks(blocks, chunk_rows=CHUNK_ROWS):
+    pending = b""
+    lines = []
+    async for block in blocks:
+        parts = (pending + block).split(b"\n")
+        pending = parts.pop()
+        lines.extend(part for part in parts if part.strip())
+        while len(lines) >= chunk_rows:
+            yield lines[:chunk_rows]
+            lines = lines[chunk_rows:]
+    if pending.strip():
+        lines.append(pending)
+    if lines:
+        yield lines
+
+def parse_chunk(fmt, header, lines):
+    data = io.BytesIO(b"\n".join([header] + lines) if fmt == "csv" else b"\n".join(lines))
+    try:
+        if fmt == "csv":
+            return pd.read_csv(data, dtype={"Object Name": str, "Object Classification": str})
+        return pd.read_json(data, lines=True, dtype=False)
+    except ValueError as e:
+        raise ScoringError(f"Could not parse {fmt} rows: {e}")
+
+# Raw feature rows of the scorable records in a chunk (the app's FeaturePipeline layout), the
+# mask of those records and a per-row error message for the others. Classifications may keep
+# orbits.csv's "(Hazard)" suffix.
+def chunk_features(pipeline, frame):
+    missing = [column for column in REQUIRED_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ScoringError(f"Missing columns: {', '.join(missing)}")
+    classification = frame["Object Classification"].astype(str).str.split("(", n=1).str[0].str.strip()
+    known = pd.Categorical(classification, categories=pipeline.classifications).codes >= 0
+    numeric = np.column_stack([np.asarray(pd.to_numeric(frame[column], errors="coerce"), dtype=np.float64)
+                               for column in pipeline.numeric_columns])
+    complete = np.isfinite(numeric).all(axis=1)
+    valid = known & complete
+    errors = np.where(~known, "unknown Object Classification", np.where(~complete, "missing or non-numeric feature", ""))
+    columns = {"Object Classification": np.asarray(classification)[valid]}
+    columns.update({column: numeric[valid, i] for i, column in enumerate(pipeline.numeric_columns)})
+    return pipeline.raw_features(pd.DataFrame(columns)), valid, errors
+
+def result_frame(frame, first_row, valid, errors, probabilities, threshold=HAZARD_THRESHOLD):
+    scores = np.full(len(frame), np.nan)
+    scores[valid] = probabilities
+    results = pd.DataFrame({"row": np.arange(first_row, first_row + len(frame))})
+    if "Object Name" in frame.columns:
+        results["Object Name"] = frame["Object Name"].to_numpy()
+    results["hazard_probability"] = scores
+    results["hazardous"] = scores >= threshold
+    results["error"] = errors
+    return results
+
+def format_results(results, fmt, header):
+    if fmt == "csv":
+        return results.to_csv(index=False, header=header).encode()
+    return results.to_json(orient="records", lines=True, force_ascii=False).encode()
+
+# Scored result frames of an upload, in row order. Chunks are parsed on a worker thread and
+# submitted to the prediction engine as soon as they are read, while earlier chunks are still
+# being written out; the bounded queue between the two sides is the backpressure.
+async def score_chunks(blocks, fmt, engine, chunk_rows=CHUNK_ROWS, depth=PIPELINE_DEPTH):
+    queue = asyncio.Queue(depth)
+
+    async def produce():
+        try:
+            header, first_row = None, 0
+            async for lines in line_chunks(blocks, chunk_rows):
+                if fmt == "csv" and header is None:
+                    header = lines.pop(0)
+                    if not lines:
+                        continue
+                frame = await asyncio.to_thread(parse_chunk, fmt, header, lines)
+                features, valid, errors = await asyncio.to_thread(chunk_features, engine.pipeline, frame)
+                scores = asyncio.wrap_future(engine.submit(features)) if len(features) else None
+                await queue.put((frame, first_row, valid, errors, scores))
+                first_row += len(frame)
+            await queue.put(None)
+        except Exception as e:
+            await queue.put(e)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (item := await queue.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            frame, first_row, valid, errors, scores = item
+            probabilities = await scores if scores is not None else np.zeros(0)
+            yield result_frame(frame, first_row, valid, errors, probabilities)
+    finally:
+        producer.cancel()
+
+
+# HTTP/1.1 plumbing on asyncio streams (one request per connection)
+async def read_request_head(reader):
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.LimitOverrunError:
+        raise ScoringError("Request head too large")
+    request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+    try:
+        method, target, _ = request_line.split(" ", 2)
+    except ValueError:
+        raise ScoringError("Malformed request line")
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return method.upper(), target, headers
+
+# Request (or response) body as blocks of at most READ_BYTES, from a Content-Length or chunked body
+async def body_blocks(reader, headers):
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if size == 0:
+                await reader.readuntil(b"\r\n")
+                return
+            while size > 0:
+                block = await reader.readexactly(min(size, READ_BYTES))
+                size -= len(block)
+                yield block
+            await reader.readexactly(2)
+    else:
+        if "content-length" not in headers:
+            raise ScoringError("Content-Length or chunked transfer encoding required", 411)
+        remaining = int(headers["content-length"])
+        while remaining > 0:
+            block = await reader.read(min(remaining, READ_BYTES))
+            if not block:
+                raise asyncio.IncompleteReadError(b"", remaining)
+            remaining -= len(block)
+            yield block
+
+def response_head(status, content_type, headers=None):
+    lines = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}", f"Content-Type: {content_type}", "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+async def send_json(writer, status, payload, headers=None):
+    body = json.dumps(payload).encode()
+    writer.write(response_head(status, "application/json", {"Content-Length": len(body), **(headers or {})}) + body)
+    await writer.drain()
+
+async def send_chunk(writer, data):
+    writer.write(b"%x\r\n%b\r\n" % (len(data), data))
+    await writer.drain()  # waits while the client is not reading
+
+
+# The scoring HTTP service. POST /score?format=csv|jsonl&chunk_rows=N (the format defaults to the
+# Content-Type, then CSV) streams back one result row per input row: row number, Object Name
+# when given, hazard_probability, hazardous and an error message for rows that could not be
+# scored. GET /health reports the load.
+class ScoringService:
+    def __init__(self, engine=None, max_concurrent=MAX_CONCURRENT, queue_timeout=QUEUE_TIMEOUT, chunk_rows=CHUNK_ROWS):
+        self.engine = engine or prediction_engine.get_engine()
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.chunk_rows = chunk_rows
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.rows_scored = 0
+        self.rejected = 0
+
+    def health(self):
+        return {"status": "ok", "active": self.active, "waiting": self.waiting, "max_concurrent": self.max_concurrent,
+                "rows_scored": self.rows_scored, "rejected": self.rejected}
+
+    async def handle(self, reader, writer):
+        try:
+            method, target, headers = await read_request_head(reader)
+            url = urlsplit(target)
+            query = dict(parse_qsl(url.query))
+            if method == "GET" and url.path == "/health":
+                await send_json(writer, 200, self.health())
+            elif method == "POST" and url.path == "/score":
+                await self.score(reader, writer, headers, query)
+            else:
+                await send_json(writer, 404, {"error": f"No route for {method} {url.path}"})
+        except ScoringError as e:
+            await send_json(writer, e.status, {"error": str(e)}, {"Retry-After": 1} if e.status == 503 else None)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            # Anything else is a bug; score() has already dropped the connection if results were streaming
+            try:
+                await send_json(writer, 500, {"error": f"Internal error: {e}"})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def score(self, reader, writer, headers, query):
+        content_type = headers.get("content-type", "")
+        fmt = query.get("format") or ("jsonl" if "json" in content_type else "csv")
+        if fmt not in FORMATS:
+            raise ScoringError(f"Unknown format {fmt!r} (use csv or jsonl)")
+        try:
+            chunk_rows = int(query.get("chunk_rows", self.chunk_rows))
+        except ValueError:
+            raise ScoringError(f"chunk_rows must be an integer, got {query['chunk_rows']!r}")
+        if not 1 <= chunk_rows <= MAX_CHUNK_ROWS:
+            raise ScoringError(f"chunk_rows must be between 1 and {MAX_CHUNK_ROWS}, got {chunk_rows}")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except TimeoutError:
+            self.rejected += 1
+            raise ScoringError("Too many uploads in progress, retry later", 503)
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            if headers.get("expect", "").lower() == "100-continue":
+                writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            started = False
+            try:
+                async for results in score_chunks(body_blocks(reader, headers), fmt, self.engine, chunk_rows):
+                    if not started:
+                        writer.write(response_head(200, FORMATS[fmt], {"Transfer-Encoding": "chunked"}))
+                        started = True
+                    await send_chunk(writer, format_results(results, fmt, header=results["row"].iloc[0] == 0))
+                    self.rows_scored += len(results)
+            except Exception:
+                if not started:
+                    raise
+                # Results were already streaming: drop the connection without the final chunk, so
+                # the client sees a truncated response rather than a complete one
+                return
+            if not started:
+                writer.write(response_head(200, FORMATS[fmt], {"Transfer-Encoding": "chunked"}))
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    async def start(self, host=HOST, port=PORT):
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(host=HOST, port=PORT, **options):
+    service = ScoringService(**options)
+    server = await service.start(host, port)
+    print(f"Scoring service on http://{host}:{port}/score (max {service.max_concurrent} concurrent uploads)")
+    async with server:
+        await server.serve_forever()
+
+async def file_blocks(path):
+    with open(path, "rb") as file:
+        while block := await asyncio.to_thread(file.read, READ_BYTES):
+            yield block
+
+# Score a file without the server (same chunked path), writing results to output_path or stdout
+async def score_file(input_path, output_path=None, chunk_rows=CHUNK_ROWS, engine=None):
+    engine = engine or prediction_engine.get_engine()
+    fmt = "jsonl" if input_path.lower().endswith((".jsonl", ".json", ".ndjson")) else "csv"
+    output = open(output_path, "wb") if output_path else sys.stdout.buffer
+    n_rows = n_scored = 0
+    try:
+        async for results in score_chunks(file_blocks(input_path), fmt, engine, chunk_rows):
+            output.write(format_results(results, fmt, header=n_rows == 0))
+            n_rows += len(results)
+            n_scored += int((results["error"] == "").sum())
+    finally:
+        if output_path:
+            output.close()
+    return n_rows, n_scored
+
+
+# Load-test client: upload a file to /score (streaming it from disk while results stream back).
+# Returns the status, the seconds to the first result block and to the end, and the result rows.
+async def upload(path, host=HOST, port=PORT, fmt="csv"):
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write((f"POST /score?format={fmt} HTTP/1.1\r\nHost: {host}\r\nContent-Type: {FORMATS[fmt]}\r\n"
+                  f"Content-Length: {os.path.getsize(path)}\r\n\r\n").encode())
+
+    async def send():
+        async for block in file_blocks(path):
+            writer.write(block)
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    try:
+        _, status, headers = await read_request_head(reader)
+        first_result, n_lines = None, 0
+        async for block in body_blocks(reader, headers):
+            first_result = first_result or time.perf_counter() - started
+            n_lines += block.count(b"\n")
+    finally:
+        sender.cancel()
+        writer.close()
+    n_rows = n_lines - 1 if fmt == "csv" and n_lines else n_lines
+    return int(status), first_result, time.perf_counter() - started, n_rows
+
+# Current resident memory (MB) of this process
+def _rss_mb():
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+# Synthetic orbits.csv-style uploads of n_rows records
+def _write_upload(folder, n_rows, seed=0):
+    import ingestion
+
+    path = os.path.join(folder, f"upload-{n_rows}.csv")
+    base = pd.read_csv(preprocessing.ORBITS_PATH)
+    for start in range(0, n_rows, 100_000):
+        records = ingestion.synthetic_orbits(base, min(100_000, n_rows - start), seed=seed + start)
+        records.to_csv(path, mode="a", header=start == 0, index=False)
+    return path
+
+async def _load_test(folder, clients, uploads, rows_per_upload, memory_rows, max_concurrent):
+    service = ScoringService(max_concurrent=max_concurrent)
+    server = await service.start(HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    path = _write_upload(folder, rows_per_upload)
+    await upload(path, port=port)  # warm-up (model, pipeline, thread pool)
+    results = []
+    async with server:
+        for n_clients in clients:
+            pending = iter(range(uploads))
+            timings = []
+
+            async def client():
+                for _ in pending:
+                    timings.append(await upload(path, port=port))
+
+            started = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(n_clients)))
+            elapsed = time.perf_counter() - started
+            ok = [timing for timing in timings if timing[0] == 200]
+            first = np.asarray([timing[1] for timing in ok]) * 1000.0
+            total = np.asarray([timing[2] for timing in ok]) * 1000.0
+            results.append({
+                "clients": n_clients,
+                "upload_rows": rows_per_upload,
+                "uploads": len(ok),
+                "rejected": len(timings) - len(ok),
+                "rows_per_sec": sum(timing[3] for timing in ok) / elapsed,
+                "first_result_p50_ms": float(np.percentile(first, 50)),
+                "first_result_p99_ms": float(np.percentile(first, 99)),
+                "upload_p50_ms": float(np.percentile(total, 50)),
+                "upload_p99_ms": float(np.percentile(total, 99)),
+            })
+
+        # Memory stays flat as uploads grow: sample RSS while each one streams through
+        memory = []
+        for n_rows in memory_rows:
+            big_path = _write_upload(folder, n_rows, seed=1)
+            baseline = peak = _rss_mb()
+            task = asyncio.create_task(upload(big_path, port=port))
+            while not task.done():
+                peak = max(peak, _rss_mb())
+                await asyncio.sleep(0.01)
+            status, _, seconds, n_scored = task.result()
+            memory.append({"upload_rows": n_rows, "upload_mb": os.path.getsize(big_path) / 2 ** 20,
+                           "rows_scored": n_scored, "seconds": seconds, "rss_growth_mb": peak - baseline})
+            os.remove(big_path)
+    return pd.DataFrame(results), pd.DataFrame(memory)
+
+# Load test of the service in this process: `uploads` uploads of rows_per_upload records from
+# 1..N concurrent clients (rows/sec, p50/p99 time to first result and per upload), then the
+# memory growth while single uploads of memory_rows records stream through
+def load_test(clients=(1, 4, 16), uploads=32, rows_per_upload=20_000, memory_rows=(100_000, 1_000_000), max_concurrent=MAX_CONCURRENT):
+    with tempfile.TemporaryDirectory(prefix="scoring-") as folder:
+        return asyncio.run(_load_test(folder, clients, uploads, rows_per_upload, memory_rows, max_concurrent))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["serve"]:
+        # python scoring_service.py serve [port]
+        asyncio.run(serve(port=int(sys.argv[2]) if len(sys.argv) > 2 else PORT))
+    elif sys.argv[1:2] == ["score"] and len(sys.argv) in (3, 4):
+        # python scoring_service.py score <records.csv|records.jsonl> [results file]
+        n_rows, n_scored = asyncio.run(score_file(sys.argv[2], sys.argv[3] if len(sys.argv) == 4 else None))
+        print(f"Scored {n_scored} of {n_rows} rows", file=sys.stderr)
+    else:
+        throughput, memory = load_test()
+        print(f"{os.cpu_count()} CPU core(s)")
+        print(throughput.to_string(index=False, float_format="%.2f"))
+        print(memory.to_string(index=False, float_format="%.2f"))
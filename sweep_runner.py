@@ -0,0 +1,287 @@
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import ingestion
+import preprocessing
+
+# Every finished task is appended to results.jsonl; the ranked leaderboard is rebuilt from it
+SWEEP_DIR = "Sweep_Results"
+RESULTS_FILE = "results.jsonl"
+LEADERBOARD_FILE = "leaderboard.csv"
+
+# Model families and their hyperparameter grids: the linear SVC of the SL notebooks and the
+# Dense/BatchNorm/Dropout network of the optimization notebook (short runs, early stopping)
+DEFAULT_GRID = {
+    "svc": {"C": [0.1, 1.0, 10.0]},
+    "nn": {"units": [[40, 20, 20], [80, 40, 20]], "dropout": [0.2], "epochs": [30]},
+}
+# Resampling of the training fold, as in the OverSample / UnderSample notebooks
+SAMPLERS = ["none", "over", "under"]
+N_FOLDS = 5
+
+
+# Unscaled training rows of the notebooks' split (random_state=42); the sweep only ever sees
+# the training part, the test part stays held out
+def load_training_matrix(data_path=preprocessing.CLEANED_ORBITS_PATH):
+    matrix = ingestion.feature_matrix(data_path)
+    return np.ascontiguousarray(matrix.raw[matrix.train_rows]), np.ascontiguousarray(matrix.y[matrix.train_rows])
+
+# Every (family, params) combination of a grid
+def expand_grid(grid):
+    configs = []
+    for family, params in grid.items():
+        names = sorted(params)
+        for values in itertools.product(*(params[name] for name in names)):
+            configs.append((family, dict(zip(names, values))))
+    return configs
+
+# One task per (family, sampler, params, fold); the key identifies it across restarts
+def make_tasks(grid=DEFAULT_GRID, samplers=SAMPLERS, n_folds=N_FOLDS):
+    tasks = []
+    for (family, params), sampler in itertools.product(expand_grid(grid), samplers):
+        for fold in range(n_folds):
+            task = {"family": family, "sampler": sampler, "params": params, "fold": fold, "n_folds": n_folds}
+            task["key"] = json.dumps(task, sort_keys=True)
+            tasks.append(task)
+    return tasks
+
+
+# The training matrix lives in one shared-memory block; workers map it instead of receiving
+# a pickled copy with every task
+class SharedMatrix:
+    def __init__(self, X, y):
+        self.shape = X.shape
+        self._block = shared_memory.SharedMemory(create=True, size=X.nbytes + y.nbytes)
+        self.X = np.ndarray(X.shape, dtype=np.float32, buffer=self._block.buf)
+        self.y = np.ndarray(y.shape, dtype=np.float32, buffer=self._block.buf, offset=X.nbytes)
+        self.X[:] = X
+        self.y[:] = y
+
+    @property
+    def name(self):
+        return self._block.name
+
+    def release(self):
+        del self.X, self.y
+        self._block.close()
+        self._block.unlink()
+
+
+_worker_data = {}
+
+# Pool initializer: attach to the shared block once per worker process
+def _attach(name, shape):
+    block = shared_memory.SharedMemory(name=name)
+    n_values = shape[0] * shape[1]
+    _worker_data["block"] = block
+    _worker_data["X"] = np.ndarray(shape, dtype=np.float32, buffer=block.buf)
+    _worker_data["y"] = np.ndarray((shape[0],), dtype=np.float32, buffer=block.buf, offset=n_values * 4)
+    # One TensorFlow thread per worker (set before its first network fit): the pool provides the parallelism
+    _worker_data["single_thread"] = True
+
+def _resample(X, y, sampler):
+    if sampler == "over":
+        from imblearn.over_sampling import RandomOverSampler
+
+        return RandomOverSampler(random_state=1).fit_resample(X, y)
+    if sampler == "under":
+        from imblearn.under_sampling import RandomUnderSampler
+
+        return RandomUnderSampler(random_state=1).fit_resample(X, y)
+    return X, y
+
+def _fit_svc(params, X_train, y_train, X_valid):
+    from sklearn.svm import SVC
+
+    model = SVC(kernel="linear", C=params["C"])
+    model.fit(X_train, y_train)
+    return model.predict(X_valid)
+
+def _fit_nn(params, X_train, y_train, X_valid, y_valid):
+    import tensorflow as tf
+
+    import training
+
+    if _worker_data.pop("single_thread", False):
+        tf.config.threading.set_intra_op_parallelism_threads(1)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    config = dict(training.DEFAULT_CONFIG, **params)
+    tf.keras.utils.set_random_seed(config["seed"])
+    model = training.build_model(X_train.shape[1], config)
+    valid_data = training.make_dataset(X_valid, y_valid, config["batch_size"])
+    model.fit(
+        training.make_dataset(X_train, y_train, config["batch_size"], shuffle=True, seed=config["seed"]),
+        epochs=config["epochs"],
+        validation_data=valid_data,
+        callbacks=[
+            tf.keras.callbacks.EarlyStopping(monitor="val_loss", patience=config["patience"]),
+            tf.keras.callbacks.LearningRateScheduler(training.lr_schedule(config["lr_decay_start"])),
+        ],
+        shuffle=False,
+        verbose=0,
+    )
+    return (model.predict(valid_data, verbose=0).reshape(-1) >= 0.5).astype(np.float32)
+
+# Hazard-class metrics from predicted and true 0/1 labels
+def classification_metrics(y_true, y_pred):
+    y_true = y_true.astype(bool)
+    y_pred = y_pred.astype(bool)
+    true_positives = int((y_true & y_pred).sum())
+    precision = true_positives / max(int(y_pred.sum()), 1)
+    recall = true_positives / max(int(y_true.sum()), 1)
+    return {
+        "accuracy": float((y_true == y_pred).mean()),
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+    }
+
+# Run one task on the fold it names: stratified split of the shared matrix, scaler fit on the
+# training fold, resampling of the training fold only, fit, score on the validation fold
+def run_task(task, X=None, y=None):
+    from sklearn.model_selection import StratifiedKFold
+
+    X = _worker_data["X"] if X is None else X
+    y = _worker_data["y"] if y is None else y
+    started = time.perf_counter()
+    folds = StratifiedKFold(n_splits=task["n_folds"], shuffle=True, random_state=42)
+    train_rows, valid_rows = list(folds.split(X, y))[task["fold"]]
+    mean, scale = preprocessing.scaling_params(X[train_rows])
+    X_train = ((X[train_rows] - mean) / scale).astype(np.float32)
+    X_valid = ((X[valid_rows] - mean) / scale).astype(np.float32)
+    X_train, y_train = _resample(X_train, y[train_rows], task["sampler"])
+
+    if task["family"] == "svc":
+        predictions = _fit_svc(task["params"], X_train, y_train, X_valid)
+    elif task["family"] == "nn":
+        predictions = _fit_nn(task["params"], X_train, y_train, X_valid, y[valid_rows])
+    else:
+        raise ValueError(f"Unknown model family: {task['family']}")
+
+    result = {name: task[name] for name in ("key", "family", "sampler", "params", "fold", "n_folds")}
+    result.update(classification_metrics(y[valid_rows], predictions))
+    result["train_rows"] = len(X_train)
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+# Keys of tasks already in the results file (a torn last line from a crash is ignored)
+def finished_keys(results_path):
+    keys = set()
+    if os.path.exists(results_path):
+        with open(results_path) as f:
+            for line in f:
+                try:
+                    keys.add(json.loads(line)["key"])
+                except (ValueError, KeyError):
+                    continue
+    return keys
+
+def load_results(results_path):
+    rows = []
+    with open(results_path) as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                continue
+    return pd.DataFrame(rows)
+
+# Mean/std over folds per configuration, ranked by hazard F1 (only fully cross-validated configs)
+def build_leaderboard(results):
+    if results.empty:
+        return pd.DataFrame()
+    results = results.assign(config=results["params"].map(lambda params: json.dumps(params, sort_keys=True)))
+    grouped = results.groupby(["family", "sampler", "config"])
+    leaderboard = grouped[["f1", "recall", "precision", "accuracy"]].agg(["mean", "std"])
+    leaderboard.columns = [f"{metric}_{stat}" for metric, stat in leaderboard.columns]
+    leaderboard["folds"] = grouped["fold"].nunique()
+    leaderboard["fit_seconds"] = grouped["seconds"].sum()
+    leaderboard = leaderboard[leaderboard["folds"] == grouped["n_folds"].max()]
+    leaderboard = leaderboard.sort_values(["f1_mean", "recall_mean"], ascending=False).reset_index()
+    leaderboard.index = leaderboard.index + 1
+    leaderboard.index.name = "rank"
+    return leaderboard
+
+# Run every task not yet in output_dir/results.jsonl, with `workers` processes (1 = in this
+# process), then write the leaderboard. Returns (leaderboard, wall-clock seconds, tasks run).
+def run_sweep(grid=DEFAULT_GRID, samplers=SAMPLERS, n_folds=N_FOLDS, workers=None, output_dir=SWEEP_DIR, on_result=None):
+    workers = workers or os.cpu_count()
+    os.makedirs(output_dir, exist_ok=True)
+    results_path = os.path.join(output_dir, RESULTS_FILE)
+    done = finished_keys(results_path)
+    tasks = [task for task in make_tasks(grid, samplers, n_folds) if task["key"] not in done]
+    # Slow tasks first so the pool doesn't end waiting on one long network fit
+    tasks.sort(key=lambda task: task["family"] != "nn")
+
+    started = time.perf_counter()
+    if tasks:
+        X, y = load_training_matrix()
+        with open(results_path, "a") as results_file:
+            def record(result):
+                results_file.write(json.dumps(result) + "\n")
+                results_file.flush()
+                if on_result is not None:
+                    on_result(result)
+
+            if workers == 1:
+                for task in tasks:
+                    record(run_task(task, X, y))
+            else:
+                shared = SharedMatrix(X, y)
+                try:
+                    # Spawned (not forked) workers, so a parent with TensorFlow loaded is safe
+                    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_attach, initargs=(shared.name, shared.shape)) as pool:
+                        futures = [pool.submit(run_task, task) for task in tasks]
+                        for future in as_completed(futures):
+                            record(future.result())
+                finally:
+                    shared.release()
+    elapsed = time.perf_counter() - started
+
+    leaderboard = build_leaderboard(load_results(results_path)) if os.path.exists(results_path) else pd.DataFrame()
+    leaderboard.to_csv(os.path.join(output_dir, LEADERBOARD_FILE))
+    return leaderboard, elapsed, len(tasks)
+
+# Wall-clock time of the same small sweep run serially and on a process pool
+def benchmark(grid=None, samplers=SAMPLERS, n_folds=3, workers=None):
+    grid = grid or {"svc": {"C": [0.1, 1.0]}, "nn": {"units": [[40, 20, 20]], "dropout": [0.2], "epochs": [5]}}
+    # At least two workers, so the pool path (spawn, shared memory) is what gets timed
+    workers = workers or max(os.cpu_count(), 2)
+    timings = {}
+    for mode, n_workers in (("serial", 1), ("pool", workers)):
+        output_dir = tempfile.mkdtemp(prefix="sweep-")
+        try:
+            _, timings[mode], n_tasks = run_sweep(grid, samplers, n_folds, n_workers, output_dir)
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+    return pd.DataFrame([{
+        "tasks": n_tasks,
+        "workers": workers,
+        "serial_seconds": timings["serial"],
+        "pool_seconds": timings["pool"],
+        "speedup": timings["serial"] / timings["pool"],
+    }])
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["benchmark"]:
+        print(benchmark().to_string(index=False, float_format="%.2f"))
+    else:
+        leaderboard, elapsed, n_tasks = run_sweep(on_result=lambda result: print(
+            f"{result['family']:>4} {result['sampler']:>5} fold {result['fold']} {json.dumps(result['params'])}"
+            f" f1 {result['f1']:.3f} ({result['seconds']:.1f}s)"))
+        print(f"Ran {n_tasks} tasks in {elapsed:.1f}s")
+        print(leaderboard.to_string(float_format="%.4f"))
@@ -0,0 +1,73 @@
+import hashlib
+import json
+
+import pytest
+
+import credential_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Few PBKDF2 iterations keep the tests fast; the scheme is the same
+    monkeypatch.setattr(credential_store, "PBKDF2_ITERATIONS", 1_000)
+    store = credential_store.CredentialStore(str(tmp_path / "users.db"))
+    yield store
+    store.close()
+
+
+def _stored_hash(store, username):
+    return store._connection().execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()[0]
+
+
+def test_verify_checks_the_password(store):
+    assert store.create_user("ceres", "correct horse")
+    assert store.verify("ceres", "correct horse")
+    assert not store.verify("ceres", "wrong horse")
+    assert not store.verify("vesta", "correct horse")
+    assert _stored_hash(store, "ceres").startswith("pbkdf2_sha256$1000$")
+
+
+def test_create_user_rejects_duplicates(store):
+    assert store.create_user("pallas", "first")
+    assert not store.create_user("pallas", "second")
+    assert store.user_count() == 1
+    assert store.verify("pallas", "first")
+    assert not store.verify("pallas", "second")
+
+    # A second process sees the row but not this one's cache; the primary key still refuses it
+    other = credential_store.CredentialStore(store.path)
+    try:
+        assert not other.create_user("pallas", "third")
+    finally:
+        other.close()
+
+
+def test_legacy_users_json_import(store, tmp_path):
+    legacy_path = tmp_path / "Users.json"
+    legacy_path.write_text(json.dumps({
+        "juno": hashlib.sha256(b"hunter2").hexdigest().upper(),
+        "hygiea": "not a sha256 digest",
+        "eros": 42,
+    }))
+
+    assert store.migrate_users_json(str(legacy_path)) == 1
+    assert store.user_count() == 1
+    assert _stored_hash(store, "juno") == "sha256$" + hashlib.sha256(b"hunter2").hexdigest()
+    # The same file is not imported twice
+    assert store.migrate_users_json(str(legacy_path)) == 0
+
+    # A failed login leaves the legacy hash; a successful one upgrades it to a salted hash
+    assert not store.verify("juno", "hunter3")
+    assert _stored_hash(store, "juno").startswith("sha256$")
+    assert store.verify("juno", "hunter2")
+    assert _stored_hash(store, "juno").startswith("pbkdf2_sha256$")
+    assert store.verify("juno", "hunter2")
+    assert not store.verify("juno", "hunter3")
+
+
+def test_legacy_import_of_a_missing_or_malformed_file(store, tmp_path):
+    assert store.migrate_users_json(str(tmp_path / "missing.json")) == 0
+    legacy_path = tmp_path / "Users.json"
+    legacy_path.write_text("[1, 2, 3]")
+    assert store.migrate_users_json(str(legacy_path)) == 0
+    assert store.user_count() == 0
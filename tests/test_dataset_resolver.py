@@ -0,0 +1,101 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import dataset_resolver
+
+CSV = b"Object Name,Asteroid Magnitude\n2006 WP1,28.3\n2013 YB,31.4\n"
+ETAG = '"%s"' % hashlib.sha256(CSV).hexdigest()[:16]
+
+
+# Local stand-in for the GitHub raw server: serves one CSV with an ETag and answers conditional
+# requests with 304, recording the status of every request
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rsplit("/", 1)[-1] != "impacts.csv":
+            self.send_response(404)
+            self.end_headers()
+            self.server.statuses.append(404)
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            self.server.statuses.append(304)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(CSV)))
+        self.send_header("ETag", ETAG)
+        self.end_headers()
+        self.wfile.write(CSV)
+        self.server.statuses.append(200)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.statuses = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _resolver(tmp_path, server, lifetime=dataset_resolver.CACHE_LIFETIME):
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/Original_Datasets"
+    resolver = dataset_resolver.build_resolver(
+        local_dir=str(tmp_path / "local"), cache_dir=str(tmp_path / "cache"), base_url=base_url,
+        lifetime=lifetime, timeout=(1, 5),
+    )
+    return resolver, resolver.resolvers[-1]
+
+
+def test_concurrent_resolves_fetch_once(tmp_path, server):
+    resolver, remote = _resolver(tmp_path, server)
+    paths = []
+    threads = [threading.Thread(target=lambda: paths.append(resolver.resolve("impacts.csv"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(paths)) == 1
+    with open(paths[0], "rb") as file:
+        assert file.read() == CSV
+    assert remote.fetch_count == 1
+    assert server.statuses == [200]
+
+
+def test_stale_copy_is_revalidated_with_304(tmp_path, server):
+    resolver, remote = _resolver(tmp_path, server, lifetime=0)
+    first = resolver.resolve("impacts.csv")
+    second = resolver.resolve("impacts.csv")
+
+    assert first == second
+    assert remote.fetch_count == 2
+    assert server.statuses == [200, 304]
+
+
+def test_cached_copy_is_served_offline(tmp_path, server):
+    resolver, remote = _resolver(tmp_path, server, lifetime=0)
+    cached = resolver.resolve("impacts.csv")
+    server.shutdown()
+    server.server_close()
+
+    assert resolver.resolve("impacts.csv") == cached
+    with open(cached, "rb") as file:
+        assert file.read() == CSV
+    assert server.statuses == [200]
+
+
+def test_missing_dataset_raises(tmp_path, server):
+    resolver, _ = _resolver(tmp_path, server)
+    with pytest.raises(dataset_resolver.DatasetNotFoundError):
+        resolver.resolve("unknown.csv")
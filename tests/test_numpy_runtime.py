@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+import numpy_runtime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOLERANCE = 1e-5
+N_RANDOM = 5_000
+
+
+# Both shipped models on the scaled dataset rows plus wide random rows, through Keras and through
+# the NumPy runtime
+@pytest.mark.parametrize("h5_path", numpy_runtime.MODEL_PATHS, ids=os.path.basename)
+def test_matches_keras_predict(h5_path, monkeypatch):
+    pytest.importorskip("tensorflow")
+    import preprocessing
+
+    monkeypatch.chdir(ROOT)
+    result = numpy_runtime.check_equivalence(h5_path, n_random=N_RANDOM)
+
+    assert result["model"] == os.path.basename(h5_path)
+    assert result["rows"] == len(preprocessing.feature_matrix().X) + N_RANDOM
+    assert result["max_abs_diff"] < TOLERANCE
+    assert result["same_decisions"]
@@ -0,0 +1,307 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+import dataset_cache
+import ingestion
+import preprocessing
+
+# Finished models go to Trained_Models/v<N>/ (next to h5_Files); unfinished runs keep their
+# latest checkpoint under Trained_Models/.checkpoints/ so they can be resumed
+TRAINED_MODELS_DIR = "Trained_Models"
+CHECKPOINTS_DIR = os.path.join(TRAINED_MODELS_DIR, ".checkpoints")
+MODEL_FILE = "model.h5"
+PIPELINE_FILE = "pipeline.json"
+METRICS_FILE = "metrics.json"
+
+# Settings of Asteroid_Predictions_Optimization_Colab.ipynb
+DEFAULT_CONFIG = {
+    "epochs": 100,
+    "batch_size": 32,
+    "units": [40, 20, 20],
+    "dropout": 0.2,
+    "l2": 0.001,
+    "patience": 10,
+    "lr_decay_start": 10,
+    "seed": 42,
+}
+
+
+# Scaled train/test split exactly as the notebook made it (train_test_split, random_state=42),
+# from the cached feature matrix, plus the fitted pipeline that produced it
+def prepare_data(data_path=preprocessing.CLEANED_ORBITS_PATH):
+    matrix = ingestion.feature_matrix(data_path)
+    X_train, X_test, y_train, y_test = matrix.split()
+    return X_train, X_test, y_train, y_test, matrix.pipeline
+
+# tf.data input pipeline: the scaled arrays are cached once, reshuffled every epoch, batched
+# and prefetched so the next batch is ready while the current step runs
+def make_dataset(X, y, batch_size, shuffle=False, seed=None):
+    import tensorflow as tf
+
+    dataset = tf.data.Dataset.from_tensor_slices((X, y)).cache()
+    if shuffle:
+        dataset = dataset.shuffle(len(X), seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+# Dense 40/20/20 with BatchNormalization, Dropout and L2, as in the optimization notebook
+def build_model(n_features, config):
+    import tensorflow as tf
+    from tensorflow.keras.layers import BatchNormalization, Dense, Dropout, Input
+    from tensorflow.keras.regularizers import l2
+
+    # Layers are named explicitly (as in the saved h5 files): Keras' automatic names are
+    # per-thread, and can repeat when a model is built in a background worker
+    model = tf.keras.models.Sequential([Input(shape=(n_features,))])
+    for i, units in enumerate(config["units"]):
+        suffix = f"_{i}" if i else ""
+        model.add(Dense(units=units, activation="relu", kernel_regularizer=l2(config["l2"]), name=f"dense{suffix}"))
+        model.add(BatchNormalization(name=f"batch_normalization{suffix}"))
+        model.add(Dropout(config["dropout"], name=f"dropout{suffix}"))
+    model.add(Dense(units=1, activation="sigmoid", name=f"dense_{len(config['units'])}"))
+    model.compile(optimizer="adam", loss="binary_crossentropy", metrics=["accuracy"])
+    return model
+
+# Keep the learning rate for the first epochs, then decay it by exp(-0.1) every epoch
+def lr_schedule(decay_start):
+    def scheduler(epoch, lr):
+        if epoch < decay_start:
+            return lr
+        return float(lr * np.exp(-0.1))
+    return scheduler
+
+# Checkpoints are keyed by the training data (CSV hash and ingested records) and config, so a
+# resumed run never mixes weights from a different dataset or architecture
+def run_key(data_path, config):
+    data_hash, n_ingested = ingestion.dataset_key(data_path)
+    payload = json.dumps({"data": data_hash, "ingested": n_ingested, "config": config}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def checkpoint_dir(data_path, config):
+    return os.path.join(CHECKPOINTS_DIR, run_key(data_path, config))
+
+# Version numbers already used in Trained_Models
+def list_versions(models_dir=TRAINED_MODELS_DIR):
+    if not os.path.isdir(models_dir):
+        return []
+    versions = [name[1:] for name in os.listdir(models_dir) if name.startswith("v")]
+    return sorted(int(version) for version in versions if version.isdigit())
+
+def version_dir(version, models_dir=TRAINED_MODELS_DIR):
+    return os.path.join(models_dir, f"v{version}")
+
+def latest_version(models_dir=TRAINED_MODELS_DIR):
+    versions = list_versions(models_dir)
+    return versions[-1] if versions else None
+
+# Metrics of a finished version (test loss/accuracy, per-epoch history, config)
+def load_metrics(version, models_dir=TRAINED_MODELS_DIR):
+    with open(os.path.join(version_dir(version, models_dir), METRICS_FILE)) as f:
+        return json.load(f)
+
+# Feature pipeline (encoder + scaler) a version was trained with
+def load_pipeline(version, models_dir=TRAINED_MODELS_DIR):
+    return preprocessing.FeaturePipeline.load(os.path.join(version_dir(version, models_dir), PIPELINE_FILE))
+
+# Write model, pipeline and metrics to a temporary folder, then rename it to the next free
+# v<N>; the rename is atomic, so a version folder is never seen half-written
+def _publish(model, pipeline, metrics, models_dir):
+    os.makedirs(models_dir, exist_ok=True)
+    staging = os.path.join(models_dir, f".staging-{os.getpid()}-{threading.get_ident()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    model.save(os.path.join(staging, MODEL_FILE))
+    pipeline.save(os.path.join(staging, PIPELINE_FILE))
+    while True:
+        version = (latest_version(models_dir) or 0) + 1
+        metrics["version"] = version
+        with open(os.path.join(staging, METRICS_FILE), "w") as f:
+            json.dump(metrics, f, indent=2)
+        try:
+            os.rename(staging, version_dir(version, models_dir))
+            return version
+        except OSError:
+            if not os.path.isdir(version_dir(version, models_dir)):
+                raise
+
+
+# Per-epoch callback: saves a full checkpoint (weights, optimizer state and learning rate,
+# early-stopping counters, history) and reports progress
+def _make_callback(job, checkpoint_path, state_path, early_stopping):
+    import tensorflow as tf
+
+    class TrainingCallback(tf.keras.callbacks.Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            logs = {name: float(value) for name, value in (logs or {}).items()}
+            logs["learning_rate"] = float(self.model.optimizer.learning_rate.numpy())
+            job.history.append(logs)
+            self.model.save(checkpoint_path)
+            state = {
+                "epoch": epoch + 1,
+                "history": job.history,
+                "early_stopping": {"wait": early_stopping.wait, "best": float(early_stopping.best)},
+            }
+            with open(state_path + ".tmp", "w") as f:
+                json.dump(state, f)
+            os.replace(state_path + ".tmp", state_path)
+            job.epoch = epoch + 1
+            if job.on_epoch is not None:
+                job.on_epoch(job)
+            if job.cancelled:
+                self.model.stop_training = True
+
+    return TrainingCallback()
+
+# EarlyStopping whose counters survive a resume (Keras resets them when fit() starts)
+def _make_early_stopping(patience, resume_state):
+    import tensorflow as tf
+
+    class ResumableEarlyStopping(tf.keras.callbacks.EarlyStopping):
+        def on_train_begin(self, logs=None):
+            super().on_train_begin(logs)
+            if resume_state:
+                self.wait = resume_state["wait"]
+                self.best = resume_state["best"]
+
+    return ResumableEarlyStopping(monitor="val_loss", patience=patience)
+
+
+# One training run. Call run() directly, or start() to train in a background thread and
+# poll epoch / history / status from another thread (e.g. the Streamlit script).
+class TrainingJob:
+    def __init__(self, config=None, data_path=preprocessing.CLEANED_ORBITS_PATH, models_dir=TRAINED_MODELS_DIR, resume=True, on_epoch=None):
+        self.config = dict(DEFAULT_CONFIG, **(config or {}))
+        self.data_path = data_path
+        self.models_dir = models_dir
+        self.resume = resume
+        self.on_epoch = on_epoch
+        self.status = "pending"
+        self.epoch = 0
+        self.resumed_from = 0
+        self.history = []
+        self.version = None
+        self.metrics = None
+        self.error = None
+        self.cancelled = False
+        self._thread = None
+
+    @property
+    def epochs(self):
+        return self.config["epochs"]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run_safely, name="training-job", daemon=True)
+        self._thread.start()
+        return self
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # Stop after the current epoch; the checkpoint is kept so the run can be resumed
+    def cancel(self):
+        self.cancelled = True
+
+    def _run_safely(self):
+        try:
+            self.run()
+        except Exception as e:
+            self.error = e
+            self.status = "failed"
+
+    def run(self):
+        import tensorflow as tf
+
+        self.status = "running"
+        started = time.perf_counter()
+        config = self.config
+        tf.keras.utils.set_random_seed(config["seed"])
+        X_train, X_test, y_train, y_test, pipeline = prepare_data(self.data_path)
+        train_data = make_dataset(X_train, y_train, config["batch_size"], shuffle=True, seed=config["seed"])
+        test_data = make_dataset(X_test, y_test, config["batch_size"])
+
+        run_dir = checkpoint_dir(self.data_path, config)
+        checkpoint_path = os.path.join(run_dir, "checkpoint.keras")
+        state_path = os.path.join(run_dir, "state.json")
+        state = None
+        if self.resume and os.path.exists(state_path) and os.path.exists(checkpoint_path):
+            with open(state_path) as f:
+                state = json.load(f)
+            model = tf.keras.models.load_model(checkpoint_path)
+            self.history = state["history"]
+            self.resumed_from = self.epoch = state["epoch"]
+        else:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            model = build_model(X_train.shape[1], config)
+        os.makedirs(run_dir, exist_ok=True)
+
+        early_stopping = _make_early_stopping(config["patience"], state and state["early_stopping"])
+        callbacks = [
+            early_stopping,
+            tf.keras.callbacks.LearningRateScheduler(lr_schedule(config["lr_decay_start"])),
+            _make_callback(self, checkpoint_path, state_path, early_stopping),
+        ]
+        model.fit(train_data, epochs=config["epochs"], initial_epoch=self.epoch, validation_data=test_data,
+                  callbacks=callbacks, shuffle=False, verbose=0)
+        if self.cancelled:
+            self.status = "cancelled"
+            return None
+
+        test_loss, test_accuracy = model.evaluate(test_data, verbose=0)
+        self.metrics = {
+            "test_loss": float(test_loss),
+            "test_accuracy": float(test_accuracy),
+            "epochs_run": self.epoch,
+            "resumed_from_epoch": self.resumed_from,
+            "stopped_early": self.epoch < config["epochs"],
+            "train_rows": len(X_train),
+            "test_rows": len(X_test),
+            "data_path": self.data_path,
+            "data_hash": dataset_cache.dataset_hash(self.data_path),
+            "ingested_records": ingestion.dataset_key(self.data_path)[1],
+            "pipeline_fingerprint": pipeline.fingerprint,
+            "config": config,
+            "history": self.history,
+            "trained_at": datetime.now().isoformat(timespec="seconds"),
+            "training_seconds": time.perf_counter() - started,
+        }
+        self.version = _publish(model, pipeline, self.metrics, self.models_dir)
+        shutil.rmtree(run_dir, ignore_errors=True)
+        self.status = "finished"
+        return self.version
+
+
+_job = None
+_job_lock = threading.Lock()
+
+# Process-wide background training: starts a job unless one is already running, so every
+# session (and every rerun) sees the same job
+def start_training(config=None, resume=True):
+    global _job
+    with _job_lock:
+        if _job is None or not _job.is_running():
+            _job = TrainingJob(config, resume=resume).start()
+        return _job
+
+def current_job():
+    return _job
+
+
+if __name__ == "__main__":
+    def report(job):
+        logs = job.history[-1]
+        print(f"Epoch {job.epoch}/{job.epochs} - loss {logs['loss']:.4f} - accuracy {logs['accuracy']:.4f}"
+              f" - val_loss {logs['val_loss']:.4f} - val_accuracy {logs['val_accuracy']:.4f}")
+
+    job = TrainingJob(on_epoch=report)
+    version = job.run()
+    print(f"Saved {version_dir(version)} (test accuracy {job.metrics['test_accuracy']:.4f})")